@@ -0,0 +1,94 @@
+"""
+Admission control per kelas request di satu worker eventlet.
+
+Kelas berurutan prioritas (kiri = paling tinggi). Tiap kelas punya batas request
+yang jalan bersamaan, panjang antrean, dan lama maksimal menunggu. Kelas rendah
+tidak masuk selama ada kelas lebih tinggi yang mengantre, jadi laporan admin
+yang berat menyingkir saat petugas sedang tap bayar. Antrean penuh / kelamaan
+menunggu -> Shed (dijawab 503 + Retry-After oleh app).
+"""
+import threading
+import time
+
+
+class Shed(Exception):
+    def __init__(self, cls: str, retry_after: int, reason: str):
+        super().__init__(f"{cls}: {reason}")
+        self.cls = cls
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Gate:
+    def __init__(self, classes: dict):
+        """classes: {nama: {"limit", "queue", "wait", "retry_after"}}, urut prioritas."""
+        self.classes = classes
+        self.order = list(classes)
+        self._cv = threading.Condition()
+        self.active = {c: 0 for c in classes}
+        self.waiting = {c: 0 for c in classes}
+        self.counters = {c: {"admitted": 0, "queued": 0, "shed_full": 0, "shed_timeout": 0,
+                             "wait_ms_total": 0.0, "wait_ms_max": 0.0, "active_max": 0}
+                         for c in classes}
+
+    def _higher_waiting(self, cls: str) -> bool:
+        return any(self.waiting[c] for c in self.order[:self.order.index(cls)])
+
+    def _can_enter(self, cls: str) -> bool:
+        return self.active[cls] < self.classes[cls]["limit"] and not self._higher_waiting(cls)
+
+    def enter(self, cls: str) -> None:
+        conf, n = self.classes[cls], self.counters[cls]
+        with self._cv:
+            if self._can_enter(cls):
+                self._admit(cls, 0.0)
+                return
+            if self.waiting[cls] >= conf["queue"]:
+                n["shed_full"] += 1
+                raise Shed(cls, conf["retry_after"], "antrean penuh")
+
+            n["queued"] += 1
+            self.waiting[cls] += 1
+            t0 = time.monotonic()
+            deadline = t0 + conf["wait"]
+            try:
+                while not self._can_enter(cls):
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        n["shed_timeout"] += 1
+                        raise Shed(cls, conf["retry_after"], "terlalu lama menunggu")
+                    self._cv.wait(left)
+            finally:
+                self.waiting[cls] -= 1
+                # kelas di bawah mungkin sedang menunggu kita selesai antre
+                self._cv.notify_all()
+            self._admit(cls, (time.monotonic() - t0) * 1000)
+
+    def _admit(self, cls: str, waited_ms: float) -> None:
+        n = self.counters[cls]
+        self.active[cls] += 1
+        n["admitted"] += 1
+        n["wait_ms_total"] += waited_ms
+        n["wait_ms_max"] = max(n["wait_ms_max"], waited_ms)
+        n["active_max"] = max(n["active_max"], self.active[cls])
+
+    def leave(self, cls: str) -> None:
+        with self._cv:
+            self.active[cls] -= 1
+            self._cv.notify_all()
+
+    def stats(self) -> dict:
+        with self._cv:
+            out = {}
+            for c in self.order:
+                n = self.counters[c]
+                out[c] = {
+                    **self.classes[c],
+                    "active": self.active[c],
+                    "waiting": self.waiting[c],
+                    **n,
+                    "wait_ms_total": round(n["wait_ms_total"], 1),
+                    "wait_ms_max": round(n["wait_ms_max"], 1),
+                    "wait_ms_avg": round(n["wait_ms_total"] / n["admitted"], 1) if n["admitted"] else 0,
+                }
+            return out
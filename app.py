@@ -1,38 +1,331 @@
-from flask import Flask, g, request, redirect, url_for, render_template_string, abort
+import time
+_BOOT = time.perf_counter()  # awal import modul, untuk STARTUP["import_ms"]
+
+from flask import Flask, g, request, redirect, url_for, render_template, abort, Response, stream_with_context, jsonify, send_from_directory
+from jinja2 import DictLoader
 import sqlite3
+import threading
+import atexit
+import base64
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import io
+import random
+import zlib
 from datetime import date
 from collections import OrderedDict
+from itertools import groupby
+
+import admission
+import archive
+import arrears
+import assignments
+import audit
+import backup
+import customer_import
+import escpos
+import export
+import maintenance
+import plans
+import profiler
+import qrimg
+import reconcile
+import reports
+import rollover
+import tenants
+import writer
+from snapshot import Snapshot
 
 app = Flask(__name__)
-DB_PATH = "wifi.db"
+DB_PATH = "wifi.db"             # DB mode satu tenant (tanpa tenants.json)
+
+# multi-tenant: satu file DB per desa (lihat tenants.py), dipilih dari subdomain / prefix path
+TENANT_ROUTING, TENANTS = tenants.load(default_db=DB_PATH)
+OPEN_TENANTS = 8                # tenant yang boleh memegang koneksi terbuka (pool, pemantau versi, penulis)
+_open_tenants = tenants.LRU(OPEN_TENANTS)
+
+# snapshot read-only untuk laporan admin (opt-in pakai ?snap=1), satu per tenant
+_snapshots = {}                 # nama tenant -> Snapshot
+_snapshots_lock = threading.Lock()
+SNAPSHOT_INTERVAL = 60          # detik antar refresh (hanya tenant yang sedang dibuka)
+ADMIN_SNAPSHOT_DEFAULT = False  # True -> /admin pakai snapshot kalau tidak ada ?snap=
+
+BACKUP_INTERVAL = 6 * 3600      # detik antar backup online (0 = mati)
+ROLLOVER_INTERVAL = 3600        # detik antar generate invoice di background (0 = mati)
+MAINTENANCE_INTERVAL = 900      # detik antar cek jadwal perawatan DB (jam sepi: maintenance.QUIET_HOURS, 0 = mati)
+
+# kunci HMAC kode verifikasi di QR struk, hanya dari env (tidak ada default:
+# kunci yang ikut di repo bisa dipakai siapa saja memalsukan struk).
+# Kosong = struk tanpa kode/QR verifikasi dan /verify menolak semua kode.
+RECEIPT_SECRET = os.environ.get("RECEIPT_SECRET", "")
+
+RECEIPT_CACHE_MAX = 2000        # jumlah struk locked yang disimpan di memori
+RECEIPT_MAX_AGE = 86400         # detik struk locked boleh dipakai dari cache browser tanpa cek ETag
+_receipt_cache = OrderedDict()
+_receipt_lock = threading.Lock()
+
+# cache hasil query agregat (opt-in: query(..., cache=True)), dibuang tiap ada commit
+QUERY_CACHE_MAX = 256           # jumlah hasil query
+QUERY_CACHE_ROWS = 1000         # hasil lebih besar dari ini tidak di-cache
+_qcache = OrderedDict()
+_qcache_lock = threading.Lock()
+_qcache_state = {"versions": {}, "hits": 0, "misses": 0, "flushes": 0}
+_version_conns = {}             # db_path -> koneksi pemantau PRAGMA data_version
+
+# group commit /pay + /undo (satu thread penulis per DB, jendela writer.WINDOW)
+_writers = {}
+_writers_lock = threading.Lock()
+
+# pool koneksi SQLite: request berikutnya tidak perlu connect + PRAGMA lagi
+POOL_SIZE = 8
+_pool = {}                      # db_path -> [koneksi nganggur]
+_pool_lock = threading.Lock()
+
+# status startup (warmup) untuk /healthz/ready
+STARTUP = {"ready": False, "import_ms": None, "steps": {}, "total_ms": None, "ready_at": None}
+_startup_lock = threading.Lock()
+
+# profil per request (cProfile): header X-Profile / ?_profile= berisi PROFILE_KEY,
+# atau acak sebagian request (PROFILE_SAMPLE 0..1). Kunci kosong = on-demand mati.
+PROFILE_KEY = os.environ.get("PROFILE_KEY", "")
+PROFILE_SAMPLE = float(os.environ.get("PROFILE_SAMPLE", "0"))
+PROFILE_DIR = "profiles"
+
+# admission control: batas request bersamaan per kelas, urut prioritas
+# (limit = jalan bersamaan, queue = maks antre, wait = detik maks antre)
+ADMISSION_CLASSES = {
+    "write":  {"limit": 16, "queue": 64, "wait": 10, "retry_after": 1},  # bayar / undo / setor + aksi admin
+    "read":   {"limit": 8,  "queue": 32, "wait": 5,  "retry_after": 2},  # daftar, struk, halaman admin ringan
+    "report": {"limit": 2,  "queue": 4,  "wait": 3,  "retry_after": 5},  # laporan + export
+}
+GATE = admission.Gate(ADMISSION_CLASSES)
+# POST yang mengubah data: petugas dan admin (approve setoran jangan kalah antre dengan laporan)
+WRITES = (
+    "/pay", "/undo", "/submit_cash_batch",
+    "/admin/approve", "/admin/rekon/import", "/admin/rekon/resolve",
+    "/admin/routes/add", "/admin/routes/delete", "/admin/customers/import",
+    "/admin/plans/set", "/admin/plans/delete",
+)
+# GET berat (agregasi seluruh periode / file besar) -> kelas report
+REPORTS = ("/admin", "/admin/arrears", "/admin/events", "/admin/rekon", "/admin/profiles")
+
+# CSS hasil build_assets.py (tanpa manifest -> fallback Tailwind CDN)
+ASSET_DIR = "assets"
+_asset_manifest = None
+
+# kompresi response dinamis
+COMPRESS_TYPES = ("text/html", "application/json", "text/csv")
+COMPRESS_MIN = 500              # byte; lebih kecil dari ini tidak dikompres
 
 # =========================
 # Helpers (irit koding)
 # =========================
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+def db_path():
+    """File DB tenant request ini (g.tenant dari TenantRouter, atau with_tenant di job/warmup)."""
+    return g.tenant.db_path
+
 def db():
     if "db" not in g:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        g.db = conn
+        path = db_path()
+        use_tenant(path)
+        with _pool_lock:
+            free = _pool.get(path)
+            conn = free.pop() if free else None
+        g.db = conn or connect(path)
+        g.db_path = path
     return g.db
 
+def release(path, conn):
+    """Kembalikan koneksi ke pool (transaksi yang masih terbuka di-rollback)."""
+    if conn.in_transaction:
+        conn.rollback()
+    # tenant yang sudah keluar LRU tidak dapat pool lagi
+    if path in _open_tenants:
+        with _pool_lock:
+            free = _pool.setdefault(path, [])
+            if len(free) < POOL_SIZE:
+                free.append(conn)
+                return
+    conn.close()
+
+def use_tenant(path):
+    """Tandai tenant ini baru dipakai; tenant yang terdorong keluar LRU ditutup koneksinya."""
+    for old in _open_tenants.touch(path):
+        close_tenant(old)
+
+def close_tenant(path):
+    """Tutup koneksi nganggur, pemantau versi (+ cache query-nya), dan thread penulis satu tenant."""
+    with _pool_lock:
+        idle = _pool.pop(path, [])
+    with _qcache_lock:
+        watcher = _version_conns.pop(path, None)
+        _qcache_state["versions"].pop(path, None)
+        for key in [k for k in _qcache if k[0] == path]:
+            del _qcache[key]
+    with _writers_lock:
+        w = _writers.get(path)
+    for conn in idle:
+        conn.close()
+    if watcher:
+        watcher.close()
+    if w:
+        w.close()
+
+def with_tenant(t, fn):
+    """fn() di app context dengan g.tenant = t (job / warmup, di luar request)."""
+    with app.app_context():
+        g.tenant = t
+        return fn()
+
+def snapshot(t=None):
+    t = t or g.tenant
+    with _snapshots_lock:
+        snap = _snapshots.get(t.name)
+        if snap is None:
+            snap = _snapshots[t.name] = Snapshot(t.db_path, t.snapshot_path)
+    return snap
+
+def wants_snapshot():
+    default = "1" if ADMIN_SNAPSHOT_DEFAULT else "0"
+    return (request.args.get("snap") or default) == "1"
+
+def report_db():
+    """
+    Koneksi untuk query laporan. Kalau request minta snapshot (?snap=1),
+    baca dari salinan read-only supaya tidak rebutan lock dengan /pay.
+    g.snap_as_of = waktu snapshot (None kalau data live).
+    """
+    if not wants_snapshot():
+        g.snap_as_of = None
+        return db()
+    if "snap_db" not in g:
+        g.snap_db, g.snap_as_of = snapshot().connect()
+    return g.snap_db
+
 @app.teardown_appcontext
 def close_db(_exc):
     conn = g.pop("db", None)
     if conn:
-        conn.close()
+        release(g.pop("db_path"), conn)
+    snap = g.pop("snap_db", None)
+    if snap:
+        snap.close()
 
 def exec1(sql, params=()):
     cur = db().execute(sql, params)
     db().commit()
     return cur
 
-def query(sql, params=()):
-    return db().execute(sql, params).fetchall()
+def query(sql, params=(), con=None, cache=False):
+    if cache and (con is None or con is g.get("db")):
+        return cached_query(sql, params)
+    return (con or db()).execute(sql, params).fetchall()
 
-def query_one(sql, params=()):
-    return db().execute(sql, params).fetchone()
+def query_one(sql, params=(), con=None, cache=False):
+    if cache and (con is None or con is g.get("db")):
+        rows = cached_query(sql, params)
+        return rows[0] if rows else None
+    return (con or db()).execute(sql, params).fetchone()
+
+def db_version(path):
+    """
+    PRAGMA data_version dari satu koneksi per DB yang hidup terus: berubah setiap ada
+    commit dari koneksi LAIN (request, sinkron.py, CLI arsip/backup), jadi cukup
+    jadi penanda "data sudah berubah" tanpa hook di setiap tempat yang menulis.
+    """
+    with _qcache_lock:
+        conn = _version_conns.get(path)
+        if conn is None:
+            conn = _version_conns[path] = sqlite3.connect(path, check_same_thread=False)
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def cached_query(sql, params=()):
+    """Hasil query live dari LRU; cache satu tenant dibuang begitu data_version DB-nya berubah."""
+    path = db_path()
+    key = (path, sql, tuple(params))
+    version = db_version(path)
+    with _qcache_lock:
+        st = _qcache_state
+        if st["versions"].get(path) != version:
+            stale = [k for k in _qcache if k[0] == path]
+            if stale:
+                st["flushes"] += 1
+            for k in stale:
+                del _qcache[k]
+            st["versions"][path] = version
+        rows = _qcache.get(key)
+        if rows is not None:
+            _qcache.move_to_end(key)
+            st["hits"] += 1
+            return rows
+        st["misses"] += 1
+
+    # dibaca SETELAH versi dicatat: paling buruk datanya lebih baru dari versinya,
+    # dan commit berikutnya tetap membuang entri ini
+    rows = db().execute(sql, params).fetchall()
+    if len(rows) <= QUERY_CACHE_ROWS:
+        with _qcache_lock:
+            if _qcache_state["versions"].get(path) == version:
+                _qcache[key] = rows
+                while len(_qcache) > QUERY_CACHE_MAX:
+                    _qcache.popitem(last=False)
+    return rows
+
+def query_cache_stats():
+    with _qcache_lock:
+        st = {k: v for k, v in _qcache_state.items() if k != "versions"}
+        st["entries"] = len(_qcache)
+        st["tenants"] = len(_qcache_state["versions"])
+    total = st["hits"] + st["misses"]
+    st["hit_rate"] = round(st["hits"] / total, 3) if total else None
+    return st
+
+def archived_year(period, con=None):
+    r = query_one("SELECT year FROM archived_periods WHERE period=?", (period,), con=con)
+    return r["year"] if r else None
+
+def period_schema(period, con=None):
+    """
+    Nama schema tempat invoice/cash_batches periode ini berada:
+    "main" untuk periode aktif, atau archive_YYYY.db yang di-ATTACH sekali per koneksi.
+    """
+    con = con or db()
+    year = archived_year(period, con)
+    if not year:
+        return "main"
+    schema = archive.schema_name(year)
+    attached = {r["name"] for r in con.execute("PRAGMA database_list")}
+    if schema not in attached:
+        con.execute(f"ATTACH DATABASE ? AS {schema}", (archive.archive_path(db_path(), year),))
+    return schema
+
+def add_column(table, column, ddl, con=None):
+    """Migrasi kecil: ALTER TABLE ADD COLUMN kalau kolomnya belum ada."""
+    con = con or db()
+    cols = {r[1] for r in con.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        con.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        con.commit()
+
+def stream_page(name, **context):
+    """
+    Seperti render_template, tapi HTML dikirim bertahap: header + ringkasan
+    langsung keluar, baris dari generator menyusul. Buffer kecil supaya tidak
+    satu write per potongan template.
+    """
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(name).stream(context)
+    stream.enable_buffering(20)
+    return Response(stream_with_context(stream), mimetype="text/html")
 
 def today_ym():
     return date.today().strftime("%Y-%m")
@@ -98,7 +391,25 @@ def init_db():
     CREATE INDEX IF NOT EXISTS idx_invoices_period_status ON invoices(period, status);
     CREATE INDEX IF NOT EXISTS idx_invoices_paid_at ON invoices(paid_at);
     CREATE INDEX IF NOT EXISTS idx_batches_period_date ON cash_batches(period, batch_date);
+    -- covering index untuk laporan tunggakan lintas periode (window function)
+    CREATE INDEX IF NOT EXISTS idx_invoices_customer_period ON invoices(customer_id, period, status, amount);
+    -- keyset paging: daftar "Belum" urut customer_id, detail tarikan urut paid_at
+    CREATE INDEX IF NOT EXISTS idx_invoices_period_status_customer ON invoices(period, status, customer_id);
+    CREATE INDEX IF NOT EXISTS idx_invoices_batch_paid ON invoices(cash_batch_id, paid_at);
     """)
+    # kolom yang ditambahkan setelah DB produksi sudah ada
+    add_column("invoices", "arrears", "INTEGER NOT NULL DEFAULT 0")  # bulan nunggak sebelum periode ini
+    add_column("customers", "plan", "TEXT")  # nama paket (plans.name); NULL = pakai monthly_fee
+
+    # tabel milik modul lain (DDL-nya di modul, dipakai juga oleh CLI-nya)
+    archive.ensure_schema(db())
+    archive.adopt_legacy(db(), db_path())  # archive_YYYY.db lama -> <stem>_archive_YYYY.db
+    assignments.ensure_schema(db())
+    plans.ensure_schema(db())
+    reconcile.ensure_schema(db())
+    reports.ensure_schema(db())
+    audit.ensure_schema(db())
+    maintenance.ensure_schema(db())
 
 def seed_demo_if_empty():
     c = query_one("SELECT COUNT(*) AS n FROM customers")
@@ -113,12 +424,288 @@ def seed_demo_if_empty():
         db().commit()
 
 def ensure_invoices(period: str):
-    exec1("""
-      INSERT OR IGNORE INTO invoices(period, customer_id, amount)
-      SELECT ?, c.id, c.monthly_fee
-      FROM customers c
+    # tanpa jalan pintas "baru di-rollover": pelanggan baru (import CSV / sinkron)
+    # harus langsung dapat invoice; probe NOT EXISTS di bawah sudah murah
+    if archived_year(period):
+        return  # periode arsip read-only
+    if period < today_ym() and reports.is_frozen(db(), period):
+        return  # laporan sudah dibekukan, pelanggan baru tidak boleh masuk periode lama
+    # cek dulu (read-only): INSERT OR IGNORE yang tidak menyisipkan apa pun tetap
+    # dihitung commit dan membuang cache query
+    missing = query_one("""
+      SELECT 1 FROM customers c
       WHERE c.active = 1
+        AND NOT EXISTS (SELECT 1 FROM invoices i WHERE i.period = ? AND i.customer_id = c.id)
+      LIMIT 1
     """, (period,))
+    if missing:
+        exec1(rollover.insert_sql(), {
+            "period": period,
+            "prev": rollover.prev_period(period),
+            "fees": plans.fees_for(db(), db_path(), period),
+        })
+
+CASH_DATE_WHERE = """
+      WHERE i.period = ?
+        AND i.status = 'PAID'
+        AND date(i.paid_at,'localtime') = date(?)
+        AND (
+        i.method = 'TRANSFER'
+        OR (i.method = 'CASH' AND i.cash_verified = 1)
+        )
+"""
+
+def cash_date_sql(s, paged=False):
+    """
+    Detail transaksi per tanggal (CASH approved + TRANSFER). Dipakai admin & export.
+    paged=True: + i.id dan syarat keyset (paid_at, id) > (?, ?), param tambahan (paid_at, id, limit).
+    """
+    return f"""
+      SELECT
+        date(i.paid_at,'localtime') AS trx_date,
+        cb.id AS batch_id,
+        cb.collector,
+        c.id AS customer_id,
+        c.name,
+        i.method,
+        i.amount,
+        i.paid_at{", i.id" if paged else ""}
+      FROM {s}.invoices i
+      JOIN customers c ON c.id = i.customer_id
+      LEFT JOIN {s}.cash_batches cb ON cb.id = i.cash_batch_id
+      {CASH_DATE_WHERE}
+      {"AND (i.paid_at, i.id) > (?, ?)" if paged else ""}
+      ORDER BY i.paid_at, i.id
+      {"LIMIT ?" if paged else ""}
+      """
+
+# =========================
+# Paging (keyset / seek)
+# =========================
+PAGE_SIZE = 50  # baris per halaman; sisanya dimuat saat discroll
+
+def take_page(rows, cursor):
+    """
+    rows = hasil query dengan LIMIT PAGE_SIZE + 1.
+    Return (baris dict, cursor halaman berikut atau None kalau sudah habis).
+    """
+    rows = [dict(r) for r in rows]
+    if len(rows) <= PAGE_SIZE:
+        return rows, None
+    rows = rows[:PAGE_SIZE]
+    return rows, cursor(rows[-1])
+
+def paid_cursor(after):
+    """Cursor "paid_at|id" -> (paid_at, id); kosong -> awal."""
+    if not after:
+        return "", 0
+    paid_at, _, inv_id = after.rpartition("|")
+    return paid_at, int(inv_id or 0)
+
+def unpaid_source(s, period, collector, q, on_route):
+    """
+    FROM/WHERE daftar "Belum" + param, dipakai untuk COUNT dan halaman.
+    Urutan keyset: (route_order, id) kalau petugas punya rute, else customer_id
+    (index invoices(period, status, customer_id) -> seek langsung, tanpa sort).
+    """
+    arrears_col = "i.arrears" if s == "main" else "0"
+    cols = f"c.id, c.name, c.address, i.amount, {arrears_col} AS arrears"
+    if on_route:
+        params = [collector, collector, period]
+        sql = f"""
+          FROM ({assignments.SLICE_SQL}) r
+          JOIN customers c ON c.id = r.customer_id
+          JOIN {s}.invoices i ON i.customer_id = c.id AND i.period = ?
+          WHERE i.status = 'UNPAID'
+            AND c.active = 1
+        """
+        cols += ", r.route_order"
+    else:
+        params = [period]
+        sql = f"""
+          FROM {s}.invoices i
+          JOIN customers c ON c.id = i.customer_id
+          WHERE i.period = ?
+            AND i.status = 'UNPAID'
+            AND c.active = 1
+        """
+    if q:
+        like = f"%{q}%"
+        sql += " AND (c.id LIKE ? OR c.name LIKE ?) "
+        params.extend([like, like])
+    return cols, sql, params
+
+def unpaid_page(s, period, collector, q, on_route, after=""):
+    cols, sql, params = unpaid_source(s, period, collector, q, on_route)
+    params = list(params)
+    if on_route:
+        if after:
+            order, _, cid = after.partition(":")
+            sql += " AND (r.route_order, c.id) > (?, ?) "
+            params.extend([int(order), cid])
+        sql += " ORDER BY r.route_order, c.id LIMIT ?"
+        cursor = lambda r: f"{r['route_order']}:{r['id']}"
+    else:
+        if after:
+            sql += " AND i.customer_id > ? "
+            params.append(after)
+        sql += " ORDER BY i.customer_id LIMIT ?"
+        cursor = lambda r: r["id"]
+    params.append(PAGE_SIZE + 1)
+    rows, nxt = take_page(query(f"SELECT {cols} {sql}", params), cursor)
+    for r in rows:
+        r["amount_fmt"] = money(r["amount"])
+    return rows, nxt
+
+def batch_page(s, batch_id, after="", con=None):
+    paid_at, inv_id = paid_cursor(after)
+    rows, nxt = take_page(query(f"""
+      SELECT c.id, c.name, i.amount, i.paid_at, i.id AS invoice_id
+      FROM {s}.invoices i JOIN customers c ON c.id=i.customer_id
+      WHERE i.cash_batch_id=?
+        AND (i.paid_at, i.id) > (?, ?)
+      ORDER BY i.paid_at, i.id
+      LIMIT ?
+    """, (batch_id, paid_at, inv_id, PAGE_SIZE + 1), con=con), lambda r: f"{r['paid_at']}|{r['invoice_id']}")
+    for r in rows:
+        r["amount_fmt"] = money(r["amount"])
+    return rows, nxt
+
+def cash_date_page(s, period, cash_date, after="", con=None, frozen=None):
+    """frozen = baris detail dari laporan beku (list dict urut paid_at, id), tanpa query."""
+    paid_at, inv_id = paid_cursor(after)
+    if frozen is not None:
+        found = [r for r in frozen if (r["paid_at"], r["id"]) > (paid_at, inv_id)][:PAGE_SIZE + 1]
+    else:
+        found = query(cash_date_sql(s, paged=True), (period, cash_date, paid_at, inv_id, PAGE_SIZE + 1), con=con)
+    rows, nxt = take_page(found, lambda r: f"{r['paid_at']}|{r['id']}")
+    for r in rows:
+        r["amount_fmt"] = money(r["amount"])
+    return rows, nxt
+
+# =========================
+# Penulis (group commit)
+# =========================
+def get_writer():
+    path = db_path()
+    use_tenant(path)
+    with _writers_lock:
+        w = _writers.get(path)
+        if w is None:
+            w = _writers[path] = writer.GroupWriter(
+                path, window=writer.WINDOW, commit=lambda conn: audit.commit(conn, path),
+            )
+    return w
+
+def pay_job(conn, sql, params, collector):
+    """Jalan di thread penulis. None = tidak ada invoice yang berubah (sudah lunas / terkunci)."""
+    rows = conn.execute(sql + audit.RETURNING, params).fetchall()
+    if len(rows) != 1:
+        return None
+    audit.write(conn, audit.from_rows("PAY", rows, collector))
+    return rows[0]["id"]
+
+def undo_job(conn, invoice_id, period, collector):
+    # nilai lama disimpan di log, karena UPDATE di bawah menghapusnya
+    old = conn.execute("SELECT method, paid_at, collector FROM invoices WHERE id=?", (invoice_id,)).fetchone()
+    rows = conn.execute("""
+      UPDATE invoices
+      SET status='UNPAID',
+          method=NULL,
+          paid_at=NULL,
+          collector=NULL,
+          cash_verified=0,
+          cash_batch_id=NULL,
+          locked=0
+      WHERE id=?
+        AND period=?
+        AND status='PAID'
+        AND locked=0
+        AND date(paid_at,'localtime') = date('now','localtime')
+        AND (
+          method='TRANSFER'
+          OR (method='CASH' AND cash_batch_id IS NULL)
+        )
+    """ + audit.RETURNING, (invoice_id, period)).fetchall()
+    if len(rows) != 1:
+        return False
+    audit.write(conn, audit.from_rows("UNDO", rows, collector, **dict(old)))
+    return True
+
+# =========================
+# Background jobs
+# =========================
+_jobs_started = False
+
+def every(seconds, fn, name):
+    """Jalankan fn tiap `seconds` detik di thread daemon (green thread di eventlet)."""
+    def loop():
+        while True:
+            time.sleep(seconds)
+            try:
+                fn()
+            except Exception:
+                app.logger.exception("job %s gagal", name)
+    threading.Thread(target=loop, name=name, daemon=True).start()
+
+def each_tenant(fn, name, only_open=False):
+    """fn(tenant) untuk semua tenant (atau yang koneksinya sedang terbuka); satu gagal, lanjut yang lain."""
+    def job():
+        for t in list(TENANTS.values()):
+            if only_open and t.db_path not in _open_tenants:
+                continue
+            try:
+                fn(t)
+            except Exception:
+                app.logger.exception("job %s tenant %s gagal", name, t.name)
+    return job
+
+def backup_dir(t):
+    # mode satu tenant tetap di backups/ seperti dulu
+    return backup.BACKUP_DIR if TENANT_ROUTING is None else os.path.join(backup.BACKUP_DIR, t.name)
+
+def run_backup(t):
+    r = backup.backup_once(t.db_path, backup_dir(t))
+    app.logger.info(
+        "backup [%s] %s: %s halaman, lock total %s ms (max %s ms), %d restart%s, %d arsip, hapus %d file lama",
+        t.name, r["file"], r["pages"], r["lock_total_ms"], r["lock_max_ms"], r["restarts"],
+        " (salin sekali jalan)" if r["fallback"] else "", len(r["archives"]), len(r["rotated"]),
+    )
+
+def run_rollover(t):
+    for st in rollover.run(t.db_path):
+        app.logger.info("rollover [%s] %s: %d/%d pelanggan, %d invoice baru, %d dibuang (nonaktif)",
+                        t.name, st["period"], st["done"], st["total"], st["inserted"], st["dropped"])
+    with_tenant(t, freeze_final)
+
+def run_maintenance(t):
+    r = maintenance.run(t.db_path)
+    if r:
+        app.logger.info("maintenance [%s]: %s", t.name, maintenance.describe(r))
+
+def flush_audit(t):
+    n = audit.flush(t.db_path)
+    if n:
+        app.logger.debug("audit [%s]: %d event ditulis", t.name, n)
+
+def start_jobs():
+    global _jobs_started
+    if _jobs_started:
+        return
+    _jobs_started = True
+    # snapshot hanya untuk tenant yang sedang dibuka; yang lain dibuat saat laporan pertama
+    every(SNAPSHOT_INTERVAL, each_tenant(lambda t: snapshot(t).refresh(), "snapshot", only_open=True), "snapshot")
+    if BACKUP_INTERVAL:
+        every(BACKUP_INTERVAL, each_tenant(run_backup, "backup"), "backup")
+    every(audit.FLUSH_INTERVAL, each_tenant(flush_audit, "audit"), "audit")
+    atexit.register(each_tenant(flush_audit, "audit"))
+    if ROLLOVER_INTERVAL:
+        # putaran pertama langsung, jangan tunggu satu interval
+        rollover_all = each_tenant(run_rollover, "rollover")
+        threading.Thread(target=rollover_all, name="rollover-init", daemon=True).start()
+        every(ROLLOVER_INTERVAL, rollover_all, "rollover")
+    if MAINTENANCE_INTERVAL:
+        every(MAINTENANCE_INTERVAL, each_tenant(run_maintenance, "maintenance"), "maintenance")
 
 # =========================
 # Templates (Tailwind)
@@ -130,7 +717,12 @@ BASE_HEAD = """
   <meta charset="utf-8">
   <title>{{title}}</title>
   <meta name="viewport" content="width=device-width, initial-scale=1, viewport-fit=cover">
+  {% set css = asset_url("app.css") %}
+  {% if css %}
+  <link rel="stylesheet" href="{{css}}">
+  {% else %}
   <script src="https://cdn.tailwindcss.com"></script>
+  {% endif %}
 </head>
 <body class="bg-slate-50 text-slate-900">
 <div class="min-h-screen">
@@ -138,10 +730,146 @@ BASE_HEAD = """
 
 BASE_FOOT = """
 </div>
+<script>
+  // infinite scroll: elemen [data-more] diganti halaman berikutnya saat mendekati layar
+  (function () {
+    if (!("IntersectionObserver" in window)) return;
+    const io = new IntersectionObserver((entries) => {
+      entries.forEach(async (e) => {
+        if (!e.isIntersecting) return;
+        const el = e.target, parent = el.parentNode;
+        io.unobserve(el);
+        try {
+          const res = await fetch(el.dataset.more, { headers: { "X-Requested-With": "fetch" } });
+          if (!res.ok) throw new Error(res.status);
+          el.insertAdjacentHTML("beforebegin", await res.text());
+          el.remove();
+          parent.querySelectorAll("[data-more]").forEach((m) => io.observe(m));
+        } catch (_) {
+          setTimeout(() => io.observe(el), 3000);  // coba lagi
+        }
+      });
+    }, { rootMargin: "600px" });
+    document.querySelectorAll("[data-more]").forEach((m) => io.observe(m));
+  })();
+</script>
 </body>
 </html>
 """
 
+# potongan baris untuk infinite scroll: dirender di halaman penuh DAN di endpoint /rows
+UNPAID_ROWS_HTML = r"""
+{% for r in rows %}
+            <button type="button"
+              onclick="openPayModal('{{r.id}}','{{r.name}}','{{r.amount_fmt}}')"
+              class="w-full py-3 text-left active:scale-[0.999]">
+              <div class="flex items-center justify-between gap-3">
+                <div class="flex items-center gap-3 min-w-0">
+                  <div class="flex h-11 w-11 items-center justify-center rounded-2xl bg-slate-950 text-sm font-black text-slate-200 border border-slate-800">
+                    {{ start + loop.index }}
+                  </div>
+                  <div class="min-w-0">
+                    <div class="truncate text-base font-black text-slate-50">{{r.name}}</div>
+                    <div class="truncate text-xs text-slate-400">{{r.address or "—"}}</div>
+                    {% if r.arrears %}
+                    <div class="mt-1 inline-flex items-center rounded-full bg-rose-500/15 px-2 py-0.5 text-xs font-bold text-rose-200 border border-rose-500/25">
+                      ⚠️ Nunggak {{r.arrears}} bln
+                    </div>
+                    {% endif %}
+                  </div>
+                </div>
+                <div class="shrink-0 text-right">
+                  <div class="text-base font-black text-slate-50">{{r.amount_fmt}}</div>
+                  <div class="mt-1 inline-flex items-center rounded-full bg-indigo-500/15 px-2 py-0.5 text-xs font-bold text-indigo-200 border border-indigo-500/25">
+                    👉 Tap untuk bayar
+                  </div>
+                </div>
+              </div>
+            </button>
+{% endfor %}
+{% if next_url %}
+<div data-more="{{next_url}}" class="py-4 text-center text-xs font-bold text-slate-500">⏳ Memuat…</div>
+{% endif %}
+"""
+
+BATCH_ROWS_HTML = r"""
+{% for r in rows %}
+{% if view == "cards" %}
+          <div class="rounded-2xl border border-slate-800 bg-slate-950 p-3">
+            <div class="flex items-start justify-between gap-3">
+              <div class="min-w-0">
+                <div class="text-sm font-black text-slate-50">{{r.id}} • {{r.name}}</div>
+                <div class="mt-1 text-xs text-slate-400">⏱️ {{r.paid_at}}</div>
+              </div>
+              <div class="shrink-0 text-right text-sm font-black text-amber-200">{{r.amount_fmt}}</div>
+            </div>
+          </div>
+{% else %}
+              <tr class="text-sm">
+                <td class="py-3 pr-4 font-black text-slate-50">{{r.id}}</td>
+                <td class="py-3 pr-4 text-slate-200">{{r.name}}</td>
+                <td class="py-3 pr-4 font-black text-amber-200">{{r.amount_fmt}}</td>
+                <td class="py-3 pr-4 text-slate-300">{{r.paid_at}}</td>
+              </tr>
+{% endif %}
+{% endfor %}
+{% if next_url %}
+{% if view == "cards" %}
+<div data-more="{{next_url}}" class="py-3 text-center text-xs font-bold text-slate-500">⏳ Memuat…</div>
+{% else %}
+<tr data-more="{{next_url}}"><td colspan="4" class="py-3 text-center text-xs font-bold text-slate-500">⏳ Memuat…</td></tr>
+{% endif %}
+{% endif %}
+"""
+
+CASH_DATE_ROWS_HTML = r"""
+{% for r in rows %}
+{% if view == "cards" %}
+          <div class="rounded-2xl border border-slate-800 bg-slate-950 p-3">
+            <div class="flex items-start justify-between gap-3">
+              <div class="min-w-0">
+                <div class="text-sm font-black text-slate-50">{{r.customer_id}} • {{r.name}}</div>
+                <div class="mt-1 flex flex-wrap items-center gap-2 text-xs text-slate-300">
+                  {% if r.method == 'CASH' %}
+                    <span class="rounded-full bg-amber-500/15 px-2 py-1 font-black text-amber-200 border border-amber-500/25">💵 CASH</span>
+                  {% else %}
+                    <span class="rounded-full bg-emerald-500/15 px-2 py-1 font-black text-emerald-200 border border-emerald-500/25">🏦 TRANSFER</span>
+                  {% endif %}
+                  <span class="rounded-full bg-slate-900 px-2 py-1 font-semibold border border-slate-800">🧾 {% if r.batch_id %}#{{r.batch_id}}{% else %}-{% endif %}</span>
+                  <span class="rounded-full bg-slate-900 px-2 py-1 font-semibold border border-slate-800">👤 {{r.collector or "-"}}</span>
+                </div>
+                <div class="mt-1 text-xs text-slate-400">⏱️ {{r.paid_at}}</div>
+              </div>
+              <div class="shrink-0 text-right text-sm font-black text-slate-50">{{r.amount_fmt}}</div>
+            </div>
+          </div>
+{% else %}
+              <tr class="text-sm">
+                <td class="py-3 pr-4">
+                  {% if r.method == 'CASH' %}
+                    <span class="inline-flex items-center rounded-full bg-amber-500/15 px-2 py-1 font-black text-amber-200 border border-amber-500/25">💵 CASH</span>
+                  {% else %}
+                    <span class="inline-flex items-center rounded-full bg-emerald-500/15 px-2 py-1 font-black text-emerald-200 border border-emerald-500/25">🏦 TRANSFER</span>
+                  {% endif %}
+                </td>
+                <td class="py-3 pr-4 font-black text-slate-200">{% if r.batch_id %}#{{r.batch_id}}{% else %}-{% endif %}</td>
+                <td class="py-3 pr-4 text-slate-200">{{r.collector or "-"}}</td>
+                <td class="py-3 pr-4 font-black text-slate-50">{{r.customer_id}}</td>
+                <td class="py-3 pr-4 text-slate-200">{{r.name}}</td>
+                <td class="py-3 pr-4 font-black text-slate-50">{{r.amount_fmt}}</td>
+                <td class="py-3 pr-4 text-slate-300">{{r.paid_at}}</td>
+              </tr>
+{% endif %}
+{% endfor %}
+{% if next_url %}
+{% if view == "cards" %}
+<div data-more="{{next_url}}" class="py-3 text-center text-xs font-bold text-slate-500">⏳ Memuat…</div>
+{% else %}
+<tr data-more="{{next_url}}"><td colspan="7" class="py-3 text-center text-xs font-bold text-slate-500">⏳ Memuat…</td></tr>
+{% endif %}
+{% endif %}
+"""
+
 PETUGAS_HTML = BASE_HEAD + r"""
 <style>
   /* minor: improve tap highlight on mobile */  
@@ -167,6 +895,17 @@ PETUGAS_HTML = BASE_HEAD + r"""
             <div class="mt-1 text-sm text-slate-300 truncate">
               👤 Petugas: <b class="font-extrabold text-slate-100">{{collector}}</b>
             </div>
+            {% if has_route %}
+            <div class="mt-1 flex items-center gap-2 text-xs font-bold">
+              {% if show_all %}
+              <span class="rounded-full bg-slate-900 px-2 py-0.5 text-slate-300 border border-slate-800">🌐 Semua pelanggan</span>
+              <a class="text-indigo-300 underline" href="{{ request.script_root }}/?period={{period}}&collector={{collector|urlencode}}">🗺️ Rute saya</a>
+              {% else %}
+              <span class="rounded-full bg-indigo-500/15 px-2 py-0.5 text-indigo-200 border border-indigo-500/25">🗺️ Rute saya</span>
+              <a class="text-indigo-300 underline" href="{{ request.script_root }}/?period={{period}}&collector={{collector|urlencode}}&all=1">🌐 Semua</a>
+              {% endif %}
+            </div>
+            {% endif %}
           </div>
 
           <div class="flex items-center gap-2">
@@ -177,7 +916,7 @@ PETUGAS_HTML = BASE_HEAD + r"""
             </button>
 
             <a class="rounded-xl bg-slate-100 px-3 py-2 text-sm font-black text-slate-950 shadow-sm active:scale-[0.99]"
-               href="/">
+               href="{{ request.script_root }}/">
               🏠 <span class="sm:inline">Home</span>
             </a>
           </div>
@@ -193,9 +932,10 @@ PETUGAS_HTML = BASE_HEAD + r"""
         {% endif %}
 
         <!-- Search -->
-        <form method="get" action="/" class="mt-3 flex gap-2">
+        <form method="get" action="{{ request.script_root }}/" class="mt-3 flex gap-2">
           <input type="hidden" name="period" value="{{period}}">
           <input type="hidden" name="collector" value="{{collector}}">
+          {% if show_all %}<input type="hidden" name="all" value="1">{% endif %}
           <input name="q" value="{{q}}" placeholder="🔎 Cari ID / Nama…"
             class="w-full rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-base font-semibold text-slate-100 outline-none placeholder:text-slate-500 focus:border-slate-600">
           <button class="shrink-0 rounded-2xl bg-indigo-500 px-4 py-3 text-base font-black text-white shadow-sm active:scale-[0.99]">
@@ -207,11 +947,11 @@ PETUGAS_HTML = BASE_HEAD + r"""
         <div class="mt-3 grid grid-cols-3 gap-2">
           <div class="rounded-2xl border border-slate-800 bg-slate-900 p-3">
             <div class="text-xs text-slate-400 font-semibold">🟠 Belum</div>
-            <div class="mt-1 text-lg font-black">{{rows|length}}</div>
+            <div class="mt-1 text-lg font-black">{{unpaid_total}}</div>
           </div>
           <div class="rounded-2xl border border-slate-800 bg-slate-900 p-3">
             <div class="text-xs text-slate-400 font-semibold">🟢 Hari ini</div>
-            <div class="mt-1 text-lg font-black">{{marked_today|length}}</div>
+            <div class="mt-1 text-lg font-black">{{today_stats.cash_cnt + today_stats.tr_cnt}}</div>
           </div>
           <div class="rounded-2xl border border-slate-800 bg-slate-900 p-3">
             <div class="text-xs text-slate-400 font-semibold">🧺 CASH siap setor</div>
@@ -246,42 +986,20 @@ PETUGAS_HTML = BASE_HEAD + r"""
               <div class="mt-1 text-sm text-slate-300">Tap pelanggan → pilih 💵 CASH atau 🏦 TRANSFER.</div>
             </div>
             <span class="rounded-full bg-slate-950 px-3 py-1 text-sm font-black text-slate-200 border border-slate-800">
-              {{rows|length}} 👥
+              {{unpaid_total}} 👥
             </span>
           </div>
 
           <div class="mt-3 divide-y divide-slate-800">
-            {% for r in rows %}
-            <button type="button"
-              onclick="openPayModal('{{r.id}}','{{r.name}}','{{r.amount_fmt}}')"
-              class="w-full py-3 text-left active:scale-[0.999]">
-              <div class="flex items-center justify-between gap-3">
-                <div class="flex items-center gap-3 min-w-0">
-                  <div class="flex h-11 w-11 items-center justify-center rounded-2xl bg-slate-950 text-sm font-black text-slate-200 border border-slate-800">
-                    {{ loop.index }}
-                  </div>
-                  <div class="min-w-0">
-                    <div class="truncate text-base font-black text-slate-50">{{r.name}}</div>
-                    <div class="truncate text-xs text-slate-400">{{r.address or "—"}}</div>
-                  </div>
-                </div>
-                <div class="shrink-0 text-right">
-                  <div class="text-base font-black text-slate-50">{{r.amount_fmt}}</div>
-                  <div class="mt-1 inline-flex items-center rounded-full bg-indigo-500/15 px-2 py-0.5 text-xs font-bold text-indigo-200 border border-indigo-500/25">
-                    👉 Tap untuk bayar
-                  </div>
-                </div>
-              </div>
-            </button>
-            {% endfor %}
+            {{unpaid_rows|safe}}
 
-            {% if rows|length == 0 %}
+            {% if unpaid_total == 0 %}
             <div class="py-10 text-center">
               <div class="text-3xl">🎉</div>
               <div class="mt-2 text-base font-black">Tidak ada data</div>
               <div class="mt-1 text-sm text-slate-300">Semua lunas atau hasil pencarian kosong.</div>
               <a class="inline-flex mt-4 rounded-2xl border border-slate-800 bg-slate-950 px-4 py-3 text-sm font-black text-slate-100"
-                 href="/?period={{period}}&collector={{collector}}">♻️ Reset</a>
+                 href="{{ request.script_root }}/?period={{period}}&collector={{collector}}">♻️ Reset</a>
             </div>
             {% endif %}
           </div>
@@ -290,17 +1008,8 @@ PETUGAS_HTML = BASE_HEAD + r"""
 
       <!-- TAB: HARI INI -->
       <section id="tab-today" class="tabPanel hidden">
-        {# hitung total cash/transfer hari ini #}
-        {% set ns = namespace(cash_cnt=0, cash_sum=0, tr_cnt=0, tr_sum=0) %}
-        {% for m in marked_today %}
-          {% if m.method == 'CASH' %}
-            {% set ns.cash_cnt = ns.cash_cnt + 1 %}
-            {% set ns.cash_sum = ns.cash_sum + (m.amount or 0) %}
-          {% else %}
-            {% set ns.tr_cnt = ns.tr_cnt + 1 %}
-            {% set ns.tr_sum = ns.tr_sum + (m.amount or 0) %}
-          {% endif %}
-        {% endfor %}
+        {# total cash/transfer hari ini dihitung di SQL (today_stats) #}
+        {% set ns = today_stats %}
 
         <div class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
           <div class="flex items-start justify-between gap-3">
@@ -309,7 +1018,7 @@ PETUGAS_HTML = BASE_HEAD + r"""
               <div class="mt-1 text-sm text-slate-300">Ringkasan + daftar transaksi yang bisa di-print / dibatalkan.</div>
             </div>
             <span class="rounded-full bg-slate-950 px-3 py-1 text-sm font-black text-slate-200 border border-slate-800">
-              {{marked_today|length}} 🧾
+              {{today_stats.cash_cnt + today_stats.tr_cnt}} 🧾
             </span>
           </div>
 
@@ -358,6 +1067,13 @@ PETUGAS_HTML = BASE_HEAD + r"""
       </div>
     </summary>
 
+    <div class="mt-3">
+      <a class="inline-flex items-center justify-center gap-2 rounded-2xl border border-slate-800 bg-slate-900 px-4 py-2 text-xs font-black text-slate-100 active:scale-[0.99]"
+         href="{{ request.script_root }}/receipts?period={{period}}&collector={{collector | urlencode}}&date={{g.date}}">
+        🖨️ Print semua struk tanggal ini
+      </a>
+    </div>
+
     <div class="mt-3 divide-y divide-slate-800">
       {% for m in g['items'] %}
       <div class="py-3">
@@ -390,12 +1106,12 @@ PETUGAS_HTML = BASE_HEAD + r"""
 
         <div class="mt-3 flex flex-wrap gap-2">
           <a class="inline-flex items-center justify-center gap-2 rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-black text-slate-100 active:scale-[0.99]"
-             href="/receipt/{{m.id}}?back={{back_url | urlencode}}">
+             href="{{ request.script_root }}/receipt/{{m.id}}?back={{back_url | urlencode}}">
             🧾 Print
           </a>
 
           {% if m.can_undo %}
-          <form method="post" action="/undo" onsubmit="return confirm('Batalkan pembayaran ini?')">
+          <form method="post" action="{{ request.script_root }}/undo" onsubmit="return confirm('Batalkan pembayaran ini?')">
             <input type="hidden" name="period" value="{{period}}">
             <input type="hidden" name="collector" value="{{collector}}">
             <input type="hidden" name="invoice_id" value="{{m.id}}">
@@ -415,7 +1131,7 @@ PETUGAS_HTML = BASE_HEAD + r"""
   </details>
   {% endfor %}
 
-  {% if tx_groups|length == 0 %}
+  {% if tx_days == 0 %}
   <div class="py-10 text-center rounded-2xl border border-slate-800 bg-slate-950">
     <div class="text-3xl">🕊️</div>
     <div class="mt-2 text-base font-black">Belum ada transaksi</div>
@@ -480,7 +1196,7 @@ PETUGAS_HTML = BASE_HEAD + r"""
             </div>
           </div>
 
-          <form method="post" action="/submit_cash_batch" class="mt-4"
+          <form method="post" action="{{ request.script_root }}/submit_cash_batch" class="mt-4"
                 onsubmit="return confirm('Kirim / Update setoran CASH hari ini?')">
             <input type="hidden" name="period" value="{{period}}">
             <input type="hidden" name="collector" value="{{collector}}">
@@ -509,12 +1225,12 @@ PETUGAS_HTML = BASE_HEAD + r"""
           <button type="button" onclick="showTab('tab-unpaid')"
             class="tabNav rounded-2xl px-3 py-3 text-sm font-black active:scale-[0.99]" data-tab="tab-unpaid">
             🟠 Belum
-            <div class="text-xs text-slate-400 font-bold">{{rows|length}}</div>
+            <div class="text-xs text-slate-400 font-bold">{{unpaid_total}}</div>
           </button>
           <button type="button" onclick="showTab('tab-today')"
             class="tabNav rounded-2xl px-3 py-3 text-sm font-black active:scale-[0.99]" data-tab="tab-today">
             🟢 Hari ini
-            <div class="text-xs text-slate-400 font-bold">{{marked_today|length}}</div>
+            <div class="text-xs text-slate-400 font-bold">{{today_stats.cash_cnt + today_stats.tr_cnt}}</div>
           </button>
           <button type="button" onclick="showTab('tab-cash')"
             class="tabNav rounded-2xl px-3 py-3 text-sm font-black active:scale-[0.99]" data-tab="tab-cash">
@@ -549,7 +1265,7 @@ PETUGAS_HTML = BASE_HEAD + r"""
       <div class="mt-1 text-2xl font-black text-slate-50" id="mAmount">-</div>
     </div>
 
-    <form id="payForm" method="post" action="/pay" class="mt-4 grid gap-3">
+    <form id="payForm" method="post" action="{{ request.script_root }}/pay" class="mt-4 grid gap-3">
       <input type="hidden" name="period" value="{{period}}">
       <input type="hidden" name="collector" value="{{collector}}">
       <input type="hidden" name="customer_id" id="mCustomerId" value="">
@@ -689,12 +1405,56 @@ ADMIN_HTML = BASE_HEAD + r"""
             <div class="mt-1 text-xs text-slate-400">
               👤 Admin: <b class="font-extrabold text-slate-200">{{admin_name}}</b>
             </div>
+            <div class="mt-2 flex flex-wrap items-center gap-2 text-xs">
+              {% if archived %}
+                <span class="rounded-full bg-violet-500/15 px-2 py-1 font-black text-violet-200 border border-violet-500/25">🗄️ Arsip {{period[:4]}} (read-only)</span>
+              {% endif %}
+              {% if snap_as_of %}
+                <span class="rounded-full bg-sky-500/15 px-2 py-1 font-black text-sky-200 border border-sky-500/25">📸 Data per {{snap_as_of}}</span>
+                <a class="rounded-full bg-slate-900 px-2 py-1 font-bold text-slate-200 border border-slate-800"
+                   href="{{ request.script_root }}/admin?period={{period}}&snap=0">⚡ Live</a>
+              {% else %}
+                <span class="rounded-full bg-emerald-500/15 px-2 py-1 font-black text-emerald-200 border border-emerald-500/25">⚡ Data live</span>
+                <a class="rounded-full bg-slate-900 px-2 py-1 font-bold text-slate-200 border border-slate-800"
+                   href="{{ request.script_root }}/admin?period={{period}}&snap=1">📸 Snapshot</a>
+              {% endif %}
+            </div>
           </div>
 
-          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
-             href="/?period={{period}}">
-            ↩️ Petugas
-          </a>
+          <div class="flex flex-col items-end gap-2">
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/?period={{period}}">
+              ↩️ Petugas
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/arrears?period={{period}}">
+              📉 Tunggakan
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/rekon?period={{period}}">
+              🏦 Rekon
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/routes?period={{period}}">
+              🗺️ Rute
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/customers?period={{period}}">
+              👥 Pelanggan
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/plans?period={{period}}">
+              💳 Paket
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/events?period={{period}}">
+              🧾 Log
+            </a>
+            <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+               href="{{ request.script_root }}/admin/profiles?period={{period}}">
+              ⏱️ Profil
+            </a>
+          </div>
         </div>
 
         {% if cash_date %}
@@ -721,9 +1481,15 @@ ADMIN_HTML = BASE_HEAD + r"""
               <div class="text-lg font-black">📊 Ringkasan Bulan</div>
               <div class="mt-1 text-sm text-slate-300">Rekap pembayaran pada periode ini.</div>
             </div>
-            <span class="rounded-full bg-slate-950 px-3 py-1 text-xs font-black text-slate-200 border border-slate-800">
-              🧾 Rekap
-            </span>
+            <div class="flex flex-col items-end gap-2">
+              <span class="rounded-full bg-slate-950 px-3 py-1 text-xs font-black text-slate-200 border border-slate-800">
+                🧾 Rekap
+              </span>
+              <div class="flex gap-1 text-xs font-bold">
+                <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/invoices?period={{period}}&fmt=csv{{snap_qs}}">⬇️ CSV</a>
+                <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/invoices?period={{period}}&fmt=xlsx{{snap_qs}}">⬇️ XLSX</a>
+              </div>
+            </div>
           </div>
 
           <div class="mt-4 grid grid-cols-2 gap-2">
@@ -770,11 +1536,11 @@ ADMIN_HTML = BASE_HEAD + r"""
 
                 <div class="shrink-0 flex flex-col gap-2">
                   <a class="rounded-2xl border border-slate-800 bg-slate-950 px-4 py-2 text-sm font-black text-slate-100 text-center active:scale-[0.99]"
-                     href="/admin?period={{period}}&batch={{b.id}}">
+                     href="{{ request.script_root }}/admin?period={{period}}&batch={{b.id}}{{snap_qs}}">
                     🔎 Detail
                   </a>
 
-                  <form method="post" action="/admin/approve"
+                  <form method="post" action="{{ request.script_root }}/admin/approve"
                         onsubmit="return confirm('Setujui tarikan ini?')">
                     <input type="hidden" name="period" value="{{period}}">
                     <input type="hidden" name="batch_id" value="{{b.id}}">
@@ -800,31 +1566,28 @@ ADMIN_HTML = BASE_HEAD + r"""
       </section>
 
       <!-- Batch detail -->
-      {% if batch_detail %}
+      {% if batch_detail_id and batch_detail_meta %}
       <section class="mt-4 rounded-2xl border border-slate-800 bg-slate-900 p-4">
         <div class="flex items-start justify-between gap-3 flex-wrap">
           <div>
             <div class="text-lg font-black">🧾 Detail Tarikan #{{batch_detail_id}}</div>
             <div class="mt-1 text-sm text-slate-300">Cek daftar pelanggan + nominal.</div>
           </div>
-          <span class="rounded-2xl bg-slate-950 border border-slate-800 px-3 py-2 text-xs font-black text-slate-200">
-            {{batch_detail_meta}}
-          </span>
+          <div class="flex flex-col items-end gap-2">
+            <span class="rounded-2xl bg-slate-950 border border-slate-800 px-3 py-2 text-xs font-black text-slate-200">
+              {{batch_detail_meta}}
+            </span>
+            <div class="flex gap-1 text-xs font-bold">
+              <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/batch/{{batch_detail_id}}?period={{period}}&fmt=csv{{snap_qs}}">⬇️ CSV</a>
+              <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/batch/{{batch_detail_id}}?period={{period}}&fmt=xlsx{{snap_qs}}">⬇️ XLSX</a>
+              <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/receipts?period={{period}}&batch={{batch_detail_id}}">🖨️ Struk</a>
+            </div>
+          </div>
         </div>
 
         <!-- Mobile card list -->
         <div class="mt-4 grid gap-2 sm:hidden">
-          {% for r in batch_detail %}
-          <div class="rounded-2xl border border-slate-800 bg-slate-950 p-3">
-            <div class="flex items-start justify-between gap-3">
-              <div class="min-w-0">
-                <div class="text-sm font-black text-slate-50">{{r.id}} • {{r.name}}</div>
-                <div class="mt-1 text-xs text-slate-400">⏱️ {{r.paid_at}}</div>
-              </div>
-              <div class="shrink-0 text-right text-sm font-black text-amber-200">{{r.amount_fmt}}</div>
-            </div>
-          </div>
-          {% endfor %}
+          {{batch_cards|safe}}
         </div>
 
         <!-- Desktop table -->
@@ -839,14 +1602,7 @@ ADMIN_HTML = BASE_HEAD + r"""
               </tr>
             </thead>
             <tbody class="divide-y divide-slate-800">
-              {% for r in batch_detail %}
-              <tr class="text-sm">
-                <td class="py-3 pr-4 font-black text-slate-50">{{r.id}}</td>
-                <td class="py-3 pr-4 text-slate-200">{{r.name}}</td>
-                <td class="py-3 pr-4 font-black text-amber-200">{{r.amount_fmt}}</td>
-                <td class="py-3 pr-4 text-slate-300">{{r.paid_at}}</td>
-              </tr>
-              {% endfor %}
+              {{batch_table|safe}}
             </tbody>
           </table>
         </div>
@@ -868,7 +1624,7 @@ ADMIN_HTML = BASE_HEAD + r"""
         <div class="mt-4 divide-y divide-slate-800">
           {% for g in cash_grouped %}
           <a class="block py-3 active:scale-[0.999]"
-             href="/admin?period={{period}}&cash_date={{g.batch_date}}">
+             href="{{ request.script_root }}/admin?period={{period}}&cash_date={{g.batch_date}}{{snap_qs}}">
             <div class="flex items-center justify-between gap-3">
               <div class="font-black text-slate-50">📌 {{g.batch_date}}</div>
               <div class="text-sm font-black text-slate-200">{{g.jumlah}} org • <span class="text-amber-200">{{g.total_fmt}}</span></div>
@@ -888,40 +1644,27 @@ ADMIN_HTML = BASE_HEAD + r"""
       </section>
 
       <!-- Detail by date -->
-      {% if cash_date_detail %}
+      {% if cash_date %}
       <section class="mt-4 rounded-2xl border border-slate-800 bg-slate-900 p-4">
         <div class="flex items-start justify-between gap-3 flex-wrap">
           <div>
             <div class="text-lg font-black">🧾 Detail Tanggal</div>
             <div class="mt-1 text-sm text-slate-300">CASH yang tampil di sini hanya yang <b>approved</b>.</div>
           </div>
-          <span class="rounded-2xl bg-slate-950 border border-slate-800 px-3 py-2 text-xs font-black text-slate-200">
-            {{cash_date_meta}}
-          </span>
+          <div class="flex flex-col items-end gap-2">
+            <span class="rounded-2xl bg-slate-950 border border-slate-800 px-3 py-2 text-xs font-black text-slate-200">
+              {{cash_date_meta}}
+            </span>
+            <div class="flex gap-1 text-xs font-bold">
+              <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/cash_date?period={{period}}&date={{cash_date}}&fmt=csv{{snap_qs}}">⬇️ CSV</a>
+              <a class="rounded-lg border border-slate-800 bg-slate-950 px-2 py-1 text-slate-200" href="{{ request.script_root }}/export/cash_date?period={{period}}&date={{cash_date}}&fmt=xlsx{{snap_qs}}">⬇️ XLSX</a>
+            </div>
+          </div>
         </div>
 
         <!-- Mobile cards -->
         <div class="mt-4 grid gap-2 sm:hidden">
-          {% for r in cash_date_detail %}
-          <div class="rounded-2xl border border-slate-800 bg-slate-950 p-3">
-            <div class="flex items-start justify-between gap-3">
-              <div class="min-w-0">
-                <div class="text-sm font-black text-slate-50">{{r.customer_id}} • {{r.name}}</div>
-                <div class="mt-1 flex flex-wrap items-center gap-2 text-xs text-slate-300">
-                  {% if r.method == 'CASH' %}
-                    <span class="rounded-full bg-amber-500/15 px-2 py-1 font-black text-amber-200 border border-amber-500/25">💵 CASH</span>
-                  {% else %}
-                    <span class="rounded-full bg-emerald-500/15 px-2 py-1 font-black text-emerald-200 border border-emerald-500/25">🏦 TRANSFER</span>
-                  {% endif %}
-                  <span class="rounded-full bg-slate-900 px-2 py-1 font-semibold border border-slate-800">🧾 {% if r.batch_id %}#{{r.batch_id}}{% else %}-{% endif %}</span>
-                  <span class="rounded-full bg-slate-900 px-2 py-1 font-semibold border border-slate-800">👤 {{r.collector or "-"}}</span>
-                </div>
-                <div class="mt-1 text-xs text-slate-400">⏱️ {{r.paid_at}}</div>
-              </div>
-              <div class="shrink-0 text-right text-sm font-black text-slate-50">{{r.amount_fmt}}</div>
-            </div>
-          </div>
-          {% endfor %}
+          {{cash_date_cards|safe}}
         </div>
 
         <!-- Desktop table -->
@@ -939,23 +1682,7 @@ ADMIN_HTML = BASE_HEAD + r"""
               </tr>
             </thead>
             <tbody class="divide-y divide-slate-800">
-              {% for r in cash_date_detail %}
-              <tr class="text-sm">
-                <td class="py-3 pr-4">
-                  {% if r.method == 'CASH' %}
-                    <span class="inline-flex items-center rounded-full bg-amber-500/15 px-2 py-1 font-black text-amber-200 border border-amber-500/25">💵 CASH</span>
-                  {% else %}
-                    <span class="inline-flex items-center rounded-full bg-emerald-500/15 px-2 py-1 font-black text-emerald-200 border border-emerald-500/25">🏦 TRANSFER</span>
-                  {% endif %}
-                </td>
-                <td class="py-3 pr-4 font-black text-slate-200">{% if r.batch_id %}#{{r.batch_id}}{% else %}-{% endif %}</td>
-                <td class="py-3 pr-4 text-slate-200">{{r.collector or "-"}}</td>
-                <td class="py-3 pr-4 font-black text-slate-50">{{r.customer_id}}</td>
-                <td class="py-3 pr-4 text-slate-200">{{r.name}}</td>
-                <td class="py-3 pr-4 font-black text-slate-50">{{r.amount_fmt}}</td>
-                <td class="py-3 pr-4 text-slate-300">{{r.paid_at}}</td>
-              </tr>
-              {% endfor %}
+              {{cash_date_table|safe}}
             </tbody>
           </table>
         </div>
@@ -968,34 +1695,606 @@ ADMIN_HTML = BASE_HEAD + r"""
 """ + BASE_FOOT
 
 
-RECEIPT_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Struk</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1">
+ARREARS_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="flex items-center gap-2">
+              <div class="text-xl font-black tracking-tight">📉 Tunggakan</div>
+              <span class="inline-flex items-center rounded-full bg-slate-900 px-2.5 py-1 text-xs font-black text-slate-200 border border-slate-800">
+                📅 s/d {{period}}
+              </span>
+            </div>
+            <div class="mt-1 text-sm text-slate-300">
+              Pelanggan dengan ≥ {{min_streak}} bulan berturut-turut belum bayar.
+            </div>
+            {% if snap_as_of %}
+            <div class="mt-2 text-xs"><span class="rounded-full bg-sky-500/15 px-2 py-1 font-black text-sky-200 border border-sky-500/25">📸 Data per {{snap_as_of}}</span></div>
+            {% endif %}
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        <form method="get" action="{{ request.script_root }}/admin/arrears" class="mt-3 flex flex-wrap gap-2">
+          <input type="hidden" name="period" value="{{period}}">
+          <select name="min" class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-black text-slate-100">
+            {% for n in [1,2,3,4,6,12] %}
+            <option value="{{n}}" {% if n == min_streak %}selected{% endif %}>≥ {{n}} bulan</option>
+            {% endfor %}
+          </select>
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">Tampilkan</button>
+          <a class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-black text-slate-100"
+             href="{{ request.script_root }}/admin/arrears?period={{period}}&min={{min_streak}}&fmt=csv">⬇️ CSV</a>
+          <a class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-black text-slate-100"
+             href="{{ request.script_root }}/admin/arrears?period={{period}}&min={{min_streak}}&fmt=xlsx">⬇️ XLSX</a>
+        </form>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="flex items-start justify-between gap-3">
+          <div class="text-lg font-black">🧾 {{rows|length}} pelanggan</div>
+          <span class="rounded-full bg-slate-950 px-3 py-1 text-sm font-black text-amber-200 border border-slate-800">
+            {{total_fmt}}
+          </span>
+        </div>
+
+        <div class="mt-3 divide-y divide-slate-800">
+          {% for r in rows %}
+          <div class="py-3 flex items-start justify-between gap-3">
+            <div class="min-w-0">
+              <div class="truncate text-base font-black text-slate-50">{{r.customer_id}} • {{r.name}}</div>
+              <div class="truncate text-xs text-slate-400">{{r.address or "—"}}</div>
+              <div class="mt-1 text-xs text-slate-300">⏳ {{r.streak}} bulan sejak {{r.streak_from}} • total {{r.unpaid}} tagihan belum lunas</div>
+            </div>
+            <div class="shrink-0 text-right text-base font-black text-amber-200">{{r.outstanding_fmt}}</div>
+          </div>
+          {% endfor %}
+
+          {% if rows|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">🎉</div>
+            <div class="mt-2 text-base font-black">Tidak ada tunggakan</div>
+          </div>
+          {% endif %}
+        </div>
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+
+REKON_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="flex items-center gap-2">
+              <div class="text-xl font-black tracking-tight">🏦 Rekonsiliasi Transfer</div>
+              <span class="inline-flex items-center rounded-full bg-slate-900 px-2.5 py-1 text-xs font-black text-slate-200 border border-slate-800">
+                📅 {{period}}
+              </span>
+            </div>
+            <div class="mt-1 text-sm text-slate-300">
+              ✅ {{counts.MATCHED}} cocok otomatis • 🟡 {{counts.REVIEW}} perlu review • 🚫 {{counts.IGNORED}} diabaikan
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        {% if msg %}
+        <div class="mt-3 rounded-2xl border border-slate-800 bg-slate-900 p-3">
+          <div class="flex items-start gap-2">
+            <div class="mt-0.5">📣</div>
+            <div class="font-extrabold leading-snug text-slate-50">{{msg}}</div>
+          </div>
+        </div>
+        {% endif %}
+
+        <form method="post" action="{{ request.script_root }}/admin/rekon/import" enctype="multipart/form-data" class="mt-3 flex flex-wrap gap-2">
+          <input type="hidden" name="period" value="{{period}}">
+          <input type="file" name="file" accept=".csv,text/csv" required
+            class="w-full sm:w-auto rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">⬆️ Import CSV mutasi</button>
+        </form>
+        <div class="mt-2 text-xs text-slate-400">Kolom: tanggal, keterangan, jumlah (+ CR/DB opsional). Hanya baris kredit yang diproses; import ulang file sama aman.</div>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="text-lg font-black">🟡 Antrian Review</div>
+        <div class="mt-3 divide-y divide-slate-800">
+          {% for m in review %}
+          <div class="py-3">
+            <div class="flex items-start justify-between gap-3">
+              <div class="min-w-0">
+                <div class="text-sm font-black text-slate-50">📅 {{m.trx_date}} • {{m.description}}</div>
+                <div class="mt-1 text-xs text-slate-400">{{m.cands|length}} kandidat</div>
+              </div>
+              <div class="shrink-0 text-right text-base font-black text-emerald-200">{{m.amount_fmt}}</div>
+            </div>
+            <div class="mt-2 flex flex-wrap gap-2">
+              {% for c in m.cands %}
+              <form method="post" action="{{ request.script_root }}/admin/rekon/resolve">
+                <input type="hidden" name="period" value="{{period}}">
+                <input type="hidden" name="hash" value="{{m.hash}}">
+                <input type="hidden" name="invoice_id" value="{{c.id}}">
+                <button class="rounded-2xl border border-slate-800 bg-slate-950 px-3 py-2 text-xs font-black text-slate-100 active:scale-[0.99]">
+                  ✅ {{c.customer_id}} • {{c.name}} • {{c.amount_fmt}}
+                </button>
+              </form>
+              {% endfor %}
+              <form method="post" action="{{ request.script_root }}/admin/rekon/resolve">
+                <input type="hidden" name="period" value="{{period}}">
+                <input type="hidden" name="hash" value="{{m.hash}}">
+                <button class="rounded-2xl bg-rose-600 px-3 py-2 text-xs font-black text-white active:scale-[0.99]">🚫 Abaikan</button>
+              </form>
+            </div>
+          </div>
+          {% endfor %}
+
+          {% if review|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">🟢</div>
+            <div class="mt-2 text-base font-black">Tidak ada yang perlu direview</div>
+          </div>
+          {% endif %}
+        </div>
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+ROUTES_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="text-xl font-black tracking-tight">🗺️ Rute Petugas</div>
+            <div class="mt-1 text-sm text-slate-300">
+              Petugas tanpa rute tetap melihat semua pelanggan. Urutan kecil = dikunjungi duluan.
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        {% if msg %}
+        <div class="mt-3 rounded-2xl border border-slate-800 bg-slate-900 p-3">
+          <div class="flex items-start gap-2">
+            <div class="mt-0.5">📣</div>
+            <div class="font-extrabold leading-snug text-slate-50">{{msg}}</div>
+          </div>
+        </div>
+        {% endif %}
+
+        <form method="post" action="{{ request.script_root }}/admin/routes/add" class="mt-3 grid grid-cols-2 gap-2 sm:grid-cols-5">
+          <input type="hidden" name="period" value="{{period}}">
+          <input name="collector" placeholder="👤 Petugas" required
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <select name="kind"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+            <option value="ADDRESS">🏘️ Alamat</option>
+            <option value="CUSTOMER">👥 ID Pelanggan</option>
+          </select>
+          <input name="value" placeholder="mis. winduaji / 012" required list="addresses"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <datalist id="addresses">
+            {% for a in addresses %}<option value="{{a.address}}">{{a.n}} pelanggan</option>{% endfor %}
+          </datalist>
+          <input name="route_order" type="number" value="0"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">➕ Simpan</button>
+        </form>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="divide-y divide-slate-800">
+          {% for a in rows %}
+          <div class="flex items-center justify-between gap-3 py-3">
+            <div class="min-w-0">
+              <div class="text-sm font-black text-slate-50">👤 {{a.collector}}</div>
+              <div class="mt-1 text-xs text-slate-400">
+                #{{a.route_order}} • {{ "🏘️" if a.kind == "ADDRESS" else "👥" }} {{a.value}} • {{a.customers}} pelanggan aktif
+              </div>
+            </div>
+            <form method="post" action="{{ request.script_root }}/admin/routes/delete">
+              <input type="hidden" name="period" value="{{period}}">
+              <input type="hidden" name="id" value="{{a.id}}">
+              <button class="rounded-2xl bg-rose-600 px-3 py-2 text-xs font-black text-white active:scale-[0.99]">🗑️ Hapus</button>
+            </form>
+          </div>
+          {% endfor %}
+
+          {% if rows|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">🗺️</div>
+            <div class="mt-2 text-base font-black">Belum ada rute</div>
+          </div>
+          {% endif %}
+        </div>
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+CUSTOMERS_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="text-xl font-black tracking-tight">👥 Import Pelanggan</div>
+            <div class="mt-1 text-sm text-slate-300">
+              👥 {{counts.total}} pelanggan • ✅ {{counts.active}} aktif
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        {% if msg %}
+        <div class="mt-3 rounded-2xl border border-slate-800 bg-slate-900 p-3">
+          <div class="flex items-start gap-2">
+            <div class="mt-0.5">📣</div>
+            <div class="font-extrabold leading-snug text-slate-50">{{msg}}</div>
+          </div>
+        </div>
+        {% endif %}
+
+        <form method="post" action="{{ request.script_root }}/admin/customers/import" enctype="multipart/form-data" class="mt-3 flex flex-wrap gap-2">
+          <input type="hidden" name="period" value="{{period}}">
+          <input type="file" name="file" accept=".csv,text/csv" required
+            class="w-full sm:w-auto rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">⬆️ Import CSV pelanggan</button>
+        </form>
+        <div class="mt-2 text-xs text-slate-400">
+          Kolom: id, nama, alamat, tarif, aktif, paket (selain id boleh sebagian). Sel kosong = data lama tidak diubah;
+          pelanggan baru wajib punya nama + tarif atau paket. Tarif baru ikut ke tagihan mulai {{current}} yang belum dibayar.
+        </div>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      {% if result %}
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="text-lg font-black">📋 Hasil Import</div>
+        <div class="mt-2 text-sm text-slate-300">
+          {{result.rows}} baris • ➕ {{result.inserted}} baru • ✏️ {{result.updated}} diupdate •
+          💸 {{result.invoices_repriced}} tagihan ikut tarif baru • ❌ {{result.error_count}} error
+        </div>
+        <div class="mt-3 divide-y divide-slate-800">
+          {% for line, err in result.errors %}
+          <div class="flex items-start gap-3 py-2 text-sm">
+            <div class="shrink-0 font-black text-rose-200">Baris {{line}}</div>
+            <div class="min-w-0 text-slate-200">{{err}}</div>
+          </div>
+          {% endfor %}
+          {% if result.error_count > result.errors|length %}
+          <div class="py-2 text-xs text-slate-400">… {{result.error_count - result.errors|length}} error lain tidak ditampilkan.</div>
+          {% endif %}
+        </div>
+      </section>
+      {% endif %}
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+PLANS_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="text-xl font-black tracking-tight">💳 Paket Tarif</div>
+            <div class="mt-1 text-sm text-slate-300">
+              Tarif baru berlaku mulai periode yang dipilih; tagihan belum bayar (belum terkunci) ikut dihitung ulang.
+              Pelanggan tanpa paket tetap pakai tarif masing-masing.
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        {% if msg %}
+        <div class="mt-3 rounded-2xl border border-slate-800 bg-slate-900 p-3">
+          <div class="flex items-start gap-2">
+            <div class="mt-0.5">📣</div>
+            <div class="font-extrabold leading-snug text-slate-50">{{msg}}</div>
+          </div>
+        </div>
+        {% endif %}
+
+        <form method="post" action="{{ request.script_root }}/admin/plans/set" class="mt-3 grid grid-cols-2 gap-2 sm:grid-cols-4">
+          <input type="hidden" name="period" value="{{period}}">
+          <input name="name" placeholder="💳 Nama paket" required list="plan-names"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <datalist id="plan-names">
+            {% for n in names %}<option value="{{n}}">{% endfor %}
+          </datalist>
+          <input name="fee" placeholder="Tarif, mis. 150000" required inputmode="numeric"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <input name="effective_from" type="month" value="{{period}}" required
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">💾 Simpan tarif</button>
+        </form>
+        <div class="mt-2 text-xs text-slate-400">Pelanggan dimasukkan ke paket lewat kolom <b>paket</b> di 👥 Import Pelanggan.</div>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="divide-y divide-slate-800">
+          {% for p in rows %}
+          <div class="flex items-center justify-between gap-3 py-3">
+            <div class="min-w-0">
+              <div class="text-sm font-black text-slate-50">💳 {{p.name}} • {{p.fee_fmt}}</div>
+              <div class="mt-1 text-xs text-slate-400">
+                berlaku mulai {{p.effective_from}} • {{p.customers}} pelanggan aktif
+              </div>
+            </div>
+            <form method="post" action="{{ request.script_root }}/admin/plans/delete">
+              <input type="hidden" name="period" value="{{period}}">
+              <input type="hidden" name="id" value="{{p.id}}">
+              <button class="rounded-2xl bg-rose-600 px-3 py-2 text-xs font-black text-white active:scale-[0.99]">🗑️ Hapus</button>
+            </form>
+          </div>
+          {% endfor %}
+
+          {% if rows|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">💳</div>
+            <div class="mt-2 text-base font-black">Belum ada paket</div>
+          </div>
+          {% endif %}
+        </div>
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+EVENTS_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="text-xl font-black tracking-tight">🧾 Log Pembayaran</div>
+            <div class="mt-1 text-sm text-slate-300">
+              Riwayat bayar, undo, setor, approve, dan perubahan tarif. Tidak bisa diubah / dihapus.
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+
+        <form method="get" action="{{ request.script_root }}/admin/events" class="mt-3 grid grid-cols-2 gap-2 sm:grid-cols-4">
+          <input type="hidden" name="period" value="{{period}}">
+          <input name="invoice_id" value="{{f.invoice_id}}" placeholder="🧾 ID invoice" inputmode="numeric"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <input name="actor" value="{{f.actor}}" placeholder="👤 Petugas / admin"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <input name="day" type="date" value="{{f.day}}"
+            class="rounded-2xl border border-slate-800 bg-slate-900 px-4 py-3 text-sm font-semibold text-slate-100">
+          <button class="rounded-2xl bg-indigo-500 px-4 py-3 text-sm font-black text-white active:scale-[0.99]">🔎 Cari</button>
+        </form>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="divide-y divide-slate-800">
+          {% for e in rows %}
+          <div class="py-3">
+            <div class="flex items-start justify-between gap-3">
+              <div class="min-w-0">
+                <div class="text-sm font-black text-slate-50">
+                  {{ icons.get(e.kind, "•") }} {{e.kind}} • {{e.customer_id}} • {{e.period}}
+                </div>
+                <div class="mt-1 text-xs text-slate-400">
+                  🕒 {{e.at}} • 👤 {{e.actor or "-"}} • <a class="underline" href="{{ request.script_root }}/admin/events?period={{period}}&invoice_id={{e.invoice_id}}">#{{e.invoice_id}}</a>
+                  {% if e.method %} • {{e.method}}{% endif %}
+                </div>
+                {% if e.detail %}
+                <div class="mt-1 break-all text-xs text-slate-500">{{e.detail}}</div>
+                {% endif %}
+              </div>
+              <div class="shrink-0 text-right text-sm font-black text-slate-100">{{e.amount_fmt}}</div>
+            </div>
+          </div>
+          {% endfor %}
+
+          {% if rows|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">🧾</div>
+            <div class="mt-2 text-base font-black">Tidak ada event</div>
+          </div>
+          {% endif %}
+        </div>
+
+        {% if more %}
+        <a class="mt-3 block rounded-2xl border border-slate-800 bg-slate-950 px-4 py-3 text-center text-sm font-black text-slate-100"
+           href="{{ request.script_root }}/admin/events?period={{period}}&invoice_id={{f.invoice_id}}&actor={{f.actor|urlencode}}&day={{f.day}}&before={{more}}">
+          ⬇️ Lebih lama
+        </a>
+        {% endif %}
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+PROFILES_HTML = BASE_HEAD + r"""
+<div class="min-h-screen bg-slate-950 text-slate-100">
+  <div class="mx-auto max-w-5xl">
+    <header class="sticky top-0 z-40 border-b border-slate-800 bg-slate-950/85 backdrop-blur">
+      <div class="px-4 pt-4 pb-3">
+        <div class="flex items-start justify-between gap-3">
+          <div class="min-w-0">
+            <div class="text-xl font-black tracking-tight">⏱️ Profil Request</div>
+            <div class="mt-1 text-sm text-slate-300">
+              {% if key_set %}Kirim header <b>X-Profile</b> atau tambah <b>?_profile=</b> berisi PROFILE_KEY.{% else %}PROFILE_KEY belum diset, profil on-demand mati.{% endif %}
+              Sampling: {{ (sample * 100)|round(2) }}% request. Disimpan {{keep}} profil terbaru.
+            </div>
+          </div>
+          <a class="rounded-xl border border-slate-800 bg-slate-900 px-3 py-2 text-sm font-black text-slate-100 active:scale-[0.99]"
+             href="{{ request.script_root }}/admin?period={{period}}">
+            ↩️ Admin
+          </a>
+        </div>
+      </div>
+    </header>
+
+    <main class="px-4 py-4 pb-8">
+      <section class="rounded-2xl border border-slate-800 bg-slate-900 p-4">
+        <div class="divide-y divide-slate-800">
+          {% for p in rows %}
+          <div class="py-3">
+            <div class="flex items-start justify-between gap-3">
+              <div class="min-w-0">
+                <div class="break-all text-sm font-black text-slate-50">{{p.method}} {{p.path}}</div>
+                <div class="mt-1 text-xs text-slate-400">
+                  🕒 {{p.at}} • {{p.status}} • 🗄️ SQL {{p.sql_ms}} ms ({{p.sql_calls}}x) • 🧩 template {{p.template_ms}} ms • 🐍 python {{p.python_ms}} ms
+                </div>
+              </div>
+              <div class="shrink-0 text-right">
+                <div class="text-base font-black text-slate-100">{{p.total_ms}} ms</div>
+                <div class="mt-1 text-xs">
+                  <a class="text-indigo-300 underline" href="{{ request.script_root }}/admin/profiles/{{p.name}}/top">📄 top</a> •
+                  <a class="text-indigo-300 underline" href="{{ request.script_root }}/admin/profiles/{{p.name}}.prof">⬇️ .prof</a>
+                </div>
+              </div>
+            </div>
+          </div>
+          {% endfor %}
+
+          {% if rows|length == 0 %}
+          <div class="py-10 text-center">
+            <div class="text-3xl">⏱️</div>
+            <div class="mt-2 text-base font-black">Belum ada profil</div>
+          </div>
+          {% endif %}
+        </div>
+      </section>
+    </main>
+  </div>
+</div>
+""" + BASE_FOOT
+
+
+RECEIPT_STYLE = """
   <style>
-    @media print { body { width: 58mm; } }
+    @media print { body { width: 58mm; } .r { page-break-after: always; } .noprint { display: none; } }
     body { font-family: monospace; margin: 8px; }
     .c { text-align:center; }
     .b { font-weight:700; }
+    .r + .r { margin-top: 16px; }
     hr { border:none; border-top:1px dashed #000; margin:8px 0; }
   </style>
-</head>
-<body>
+"""
+
+# potongan isi struk; untuk invoice locked hasil render di-cache (lihat receipt_body)
+RECEIPT_BODY = """
   <div class="c b">WIFI BULANAN</div>
   <div class="c">PEMBAYARAN</div>
   <hr>
   Periode : {{inv.period}}<br>
-  ID/Nama : {{cust.id}} - {{cust.name}}<br>
+  ID/Nama : {{inv.customer_id}} - {{inv.name}}<br>
   Metode  : {{inv.method}}<br>
   Waktu   : {{inv.paid_at}}<br>
   Petugas : {{inv.collector or "-"}}<br>
   <hr>
   Total   : <span class="b">{{amount}}</span><br>
   <hr>
+  {% if qr_enabled %}
+  <div class="c"><img src="{{ request.script_root }}/receipt/{{inv.id}}/qr.png" width="132" height="132" alt="QR verifikasi"></div>
+  {% endif %}
+  {% if code %}
+  <div class="c" style="font-size:9px;word-break:break-all">{{code}}</div>
+  {% endif %}
   <div class="c">Terima kasih</div>
+"""
+
+VERIFY_HTML = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Verifikasi Struk</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+""" + RECEIPT_STYLE + """
+</head>
+<body>
+  {% if not signing %}
+  <div class="c b">⚠️ VERIFIKASI TIDAK AKTIF</div>
+  <hr>
+  <div class="c">Server belum diberi RECEIPT_SECRET, keaslian struk tidak bisa dicek.</div>
+  {% elif info %}
+  <div class="c b">✅ STRUK ASLI</div>
+  <hr>
+  Invoice : #{{info.id}}<br>
+  Periode : {{info.period}}<br>
+  Total   : <span class="b">{{amount}}</span><br>
+  Waktu   : {{info.paid_at}}<br>
+  <hr>
+  <div class="c">Tanda tangan valid.</div>
+  {% else %}
+  <div class="c b">❌ STRUK TIDAK VALID</div>
+  <hr>
+  <div class="c">Kode tidak cocok / sudah diubah.</div>
+  {% endif %}
+</body>
+</html>
+"""
+
+RECEIPT_HTML = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Struk</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+""" + RECEIPT_STYLE + """
+</head>
+<body>
+  <div class="noprint c">
+    <a href="{{rawbt}}">🖨️ Thermal (RawBT)</a> •
+    <a href="{{ request.script_root }}/receipt/{{inv.id}}/escpos">⬇️ ESC/POS</a>
+  </div>
+  {{body|safe}}
   <script>
     // manual print: user klik print dari browser kalau perlu.
   </script>
@@ -1003,131 +2302,429 @@ RECEIPT_HTML = """
 </html>
 """
 
+RECEIPTS_HTML = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Struk ({{bodies|length}})</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+""" + RECEIPT_STYLE + """
+</head>
+<body>
+  <div class="noprint c">
+    🧾 {{title_meta}} • {{bodies|length}} struk
+    <button onclick="window.print()">🖨️ Print semua</button>
+    <a href="{{rawbt}}">🖨️ Thermal (RawBT)</a> •
+    <a href="{{escpos_url}}">⬇️ ESC/POS</a>
+  </div>
+  {% for body in bodies %}
+  <div class="r">{{body|safe}}</div>
+  {% endfor %}
+  {% if bodies|length == 0 %}
+  <div class="c">Tidak ada struk.</div>
+  {% endif %}
+</body>
+</html>
+"""
+
+# semua template lewat satu loader: dikompilasi sekali lalu di-cache Jinja,
+# bukan from_string() tiap request
+TEMPLATES = {
+    "petugas.html": PETUGAS_HTML,
+    "admin.html": ADMIN_HTML,
+    "arrears.html": ARREARS_HTML,
+    "rekon.html": REKON_HTML,
+    "routes.html": ROUTES_HTML,
+    "customers.html": CUSTOMERS_HTML,
+    "plans.html": PLANS_HTML,
+    "events.html": EVENTS_HTML,
+    "profiles.html": PROFILES_HTML,
+    "rows_unpaid.html": UNPAID_ROWS_HTML,
+    "rows_batch.html": BATCH_ROWS_HTML,
+    "rows_cash_date.html": CASH_DATE_ROWS_HTML,
+    "receipt_body.html": RECEIPT_BODY,
+    "receipt.html": RECEIPT_HTML,
+    "receipts.html": RECEIPTS_HTML,
+    "verify.html": VERIFY_HTML,
+}
+app.jinja_loader = DictLoader(TEMPLATES)
+
 # =========================
 # Setup
 # =========================
+def prime_pool(n=2):
+    path = db_path()
+    use_tenant(path)
+    conns = [connect(path) for _ in range(n)]
+    for conn in conns:
+        release(path, conn)
+    return n
+
+def migrate():
+    init_db()
+    if TENANT_ROUTING is None:
+        seed_demo_if_empty()  # demo hanya untuk wifi.db lokal, bukan DB desa baru
+
+def prime_page_cache():
+    """Baca halaman tabel + index yang dipakai halaman petugas periode ini (page cache OS)."""
+    period = today_ym()
+    con = db()
+    customers = con.execute("SELECT COUNT(*), SUM(length(name)), SUM(monthly_fee) FROM customers").fetchone()[0]
+    invoices = con.execute("""
+      SELECT COUNT(*), SUM(amount), SUM(length(collector)) FROM invoices WHERE period = ?
+    """, (period,)).fetchone()[0]
+    con.execute("SELECT COUNT(*) FROM invoices WHERE period = ? AND status = 'UNPAID'", (period,)).fetchone()
+    return {"customers": customers, "invoices": invoices}
+
+def warmup():
+    """
+    Sekali per proses, sebelum terima trafik (gunicorn post_worker_init):
+    migrasi, kompilasi template, isi pool + page cache, start job. Waktu tiap
+    langkah dicatat di STARTUP (/healthz/ready). Migrasi + invoice untuk semua
+    tenant; pool + page cache hanya untuk OPEN_TENANTS pertama.
+    """
+    with _startup_lock:
+        if STARTUP["ready"]:
+            return STARTUP
+        t0 = time.perf_counter()
+        steps = STARTUP["steps"]
+
+        def step(name, fn):
+            t = time.perf_counter()
+            out = fn()
+            steps[name] = {"ms": round((time.perf_counter() - t) * 1000, 1)}
+            if isinstance(out, dict):
+                steps[name].update(out)
+
+        all_t = list(TENANTS.values())
+        warm = all_t[:OPEN_TENANTS]
+        step("migrate", lambda: {"tenants": len([with_tenant(t, migrate) for t in all_t])})
+        with app.app_context():
+            step("templates", lambda: {"count": len([app.jinja_env.get_template(n) for n in TEMPLATES])})
+        step("pool", lambda: {"connections": sum(with_tenant(t, prime_pool) for t in warm)})
+        step("invoices", lambda: {"tenants": len([with_tenant(t, lambda: ensure_invoices(today_ym())) for t in all_t])})
+        step("page_cache", lambda: {t.name: with_tenant(t, prime_page_cache) for t in warm})
+        step("jobs", start_jobs)
+
+        if not RECEIPT_SECRET:
+            app.logger.warning("RECEIPT_SECRET belum di-set: struk dicetak tanpa kode/QR verifikasi")
+        STARTUP["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        STARTUP["ready_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        STARTUP["ready"] = True
+        app.logger.info("warmup selesai %.1f ms (import %.1f ms): %s",
+                        STARTUP["total_ms"], STARTUP["import_ms"] or 0, steps)
+    return STARTUP
+
+class TenantRouter:
+    """
+    WSGI di depan Flask: pilih tenant dari subdomain / prefix path (tenants.resolve).
+    Mode path: /<tenant> dipindah ke SCRIPT_NAME, jadi routing Flask tidak berubah
+    dan url_for / request.script_root otomatis ikut prefix.
+    """
+    TENANT_FREE = ("/healthz/", "/assets/")   # per proses, tidak butuh tenant
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        t, prefix = tenants.resolve(environ, TENANT_ROUTING, TENANTS)
+        if t is None:
+            if not environ.get("PATH_INFO", "").startswith(self.TENANT_FREE):
+                start_response("404 Not Found", [("Content-Type", "text/plain; charset=utf-8")])
+                return ["Tenant tidak dikenal.\n".encode("utf-8")]
+        elif prefix:
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + prefix
+            environ["PATH_INFO"] = environ["PATH_INFO"][len(prefix):] or "/"
+        environ["wifi.tenant"] = t
+        return self.wsgi_app(environ, start_response)
+
+app.wsgi_app = TenantRouter(app.wsgi_app)
+
+@app.before_request
+def bind_tenant():
+    g.tenant = request.environ.get("wifi.tenant")
+
 @app.before_request
 def setup():
-    init_db()
-    seed_demo_if_empty()
+    # tanpa gunicorn (python app.py / flask run) warmup jalan di request pertama
+    if not STARTUP["ready"] and not request.path.startswith("/healthz/"):
+        warmup()
+
+def request_class():
+    """Kelas admission request ini; None = tidak dibatasi (health, asset, metrik)."""
+    p = request.path
+    if p.startswith(("/healthz/", "/assets/")) or p == "/admin/admission":
+        return None
+    if request.method == "POST" and p in WRITES:
+        return "write"
+    if p in REPORTS or p.startswith(("/export/", "/admin/profiles/")):
+        return "report"
+    return "read"
+
+@app.before_request
+def admit():
+    cls = request_class()
+    if cls is None:
+        return None
+    try:
+        GATE.enter(cls)
+    except admission.Shed as e:
+        app.logger.warning("shed %s %s: %s", request.method, request.path, e.reason)
+        return Response(
+            f"Server sedang sibuk ({e.reason}). Coba lagi dalam {e.retry_after} detik.\n",
+            status=503, mimetype="text/plain", headers={"Retry-After": str(e.retry_after)},
+        )
+    g.admitted = cls
+    return None
+
+@app.teardown_request
+def admit_release(_exc):
+    # teardown jalan setelah streaming selesai, jadi slot dipegang sampai chunk terakhir
+    cls = g.pop("admitted", None)
+    if cls:
+        GATE.leave(cls)
+
+def wants_profile():
+    if request.path.startswith(("/assets/", "/healthz/", "/admin/profiles")):
+        return False
+    key = request.headers.get("X-Profile") or request.args.get("_profile")
+    if PROFILE_KEY and key and hmac.compare_digest(key, PROFILE_KEY):
+        return True
+    return PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE
+
+@app.before_request
+def profile_start():
+    if wants_profile():
+        p = profiler.start(PROFILE_DIR, {"method": request.method, "path": request.full_path.rstrip("?")})
+        if p:
+            g.profile = p
+
+@app.after_request
+def profile_finish(resp):
+    p = g.pop("profile", None)
+    if p is None:
+        return resp
+    p.pause()
+    p.meta["status"] = resp.status_code
+    resp.headers["X-Profile-Id"] = p.name
+    if resp.is_streamed:
+        resp.response = p.wrap(resp.response)  # disimpan setelah chunk terakhir
+    else:
+        p.save()
+    return resp
+
+@app.teardown_request
+def profile_abort(_exc):
+    # view error sebelum after_request: lepaskan profiler tanpa menyimpan
+    p = g.pop("profile", None)
+    if p is not None:
+        p.discard()
+
+@app.get("/healthz/live")
+def healthz_live():
+    return jsonify({"ok": True})
+
+@app.get("/healthz/ready")
+def healthz_ready():
+    """200 kalau warmup sudah selesai; 503 selama masih dingin (healthcheck Docker)."""
+    resp = jsonify({**STARTUP, "pid": os.getpid()})
+    if not STARTUP["ready"]:
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "1"
+    return resp
+
+# =========================
+# Static assets + kompresi
+# =========================
+def asset_url(name):
+    """URL ber-hash dari assets/manifest.json (dibaca sekali), atau None kalau belum di-build."""
+    global _asset_manifest
+    if _asset_manifest is None:
+        try:
+            with open(os.path.join(ASSET_DIR, "manifest.json")) as f:
+                _asset_manifest = json.load(f)
+        except FileNotFoundError:
+            _asset_manifest = {}
+    hashed = _asset_manifest.get(name)
+    return url_for("asset", name=hashed) if hashed else None
+
+app.jinja_env.globals["asset_url"] = asset_url
+
+@app.get("/assets/<name>")
+def asset(name):
+    """File ber-hash: cache selamanya, kirim varian .br/.gz yang sudah dikompres saat build."""
+    if name == "manifest.json":
+        abort(404)
+    mimetype = "text/css" if name.endswith(".css") else None
+    path = os.path.join(ASSET_DIR, name)
+    served, encoding = name, None
+    for enc, ext in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[enc] and os.path.exists(path + ext):
+            served, encoding = name + ext, enc
+            break
+    # abspath: relatif ke cwd seperti DB_PATH, bukan ke app.root_path
+    resp = send_from_directory(os.path.abspath(ASSET_DIR), served, mimetype=mimetype, max_age=31536000)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resp.vary.add("Accept-Encoding")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+def gzip_stream(chunks):
+    """gzip bertahap: tiap potongan di-flush supaya HTML streaming tetap sampai duluan."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = format gzip
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield z.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+@app.after_request
+def compress(resp):
+    if (
+        resp.status_code in (204, 304) or resp.status_code < 200
+        or resp.direct_passthrough
+        or "Content-Encoding" in resp.headers
+        or resp.mimetype not in COMPRESS_TYPES
+        or not request.accept_encodings["gzip"]
+    ):
+        return resp
+    if not resp.is_streamed:
+        data = resp.get_data()
+        if len(data) < COMPRESS_MIN:
+            return resp
+        resp.set_data(gzip.compress(data, 6))
+    else:
+        resp.response = gzip_stream(resp.response)
+        resp.headers.pop("Content-Length", None)
+    resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    # representasi lain dari isi yang sama -> ETag jadi weak
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
 
 # =========================
 # Routes: Petugas
 # =========================
     
+def tx_group_stream(s, period, collector, today):
+    """
+    Transaksi petugas dikelompokkan per tanggal setoran (fallback tanggal bayar).
+    Total per tanggal dari satu query agregat (kecil: satu baris per hari),
+    item tiap grup dibaca langsung dari cursor saat template me-render-nya.
+    Return (jumlah hari, generator grup).
+    """
+    group_date = "COALESCE(cb.batch_date, date(i.paid_at,'localtime'))"
+    src = f"""
+      FROM {s}.invoices i
+      JOIN customers c ON c.id = i.customer_id
+      LEFT JOIN {s}.cash_batches cb ON cb.id = i.cash_batch_id
+      WHERE i.period = ?
+        AND i.status = 'PAID'
+        AND i.collector = ?
+    """
+    heads = {}
+    for r in query(f"""
+      SELECT {group_date} AS group_date,
+             SUM(i.method = 'CASH') AS cash_cnt,
+             SUM(CASE WHEN i.method = 'CASH' THEN i.amount ELSE 0 END) AS cash_sum,
+             SUM(i.method <> 'CASH') AS tr_cnt,
+             SUM(CASE WHEN i.method <> 'CASH' THEN i.amount ELSE 0 END) AS tr_sum
+      {src}
+      GROUP BY group_date
+    """, (period, collector), cache=True):
+        heads[r["group_date"]] = dict(r)
+
+    def items(rows):
+        for m in rows:
+            mm = dict(m)
+            mm["amount_fmt"] = money(mm["amount"])
+            mm["can_undo"] = (mm["locked"] == 0) and (
+                (mm["method"] == "TRANSFER") or
+                (mm["method"] == "CASH" and mm["cash_batch_id"] is None)
+            )
+            yield mm
+
+    def groups():
+        cur = db().execute(f"""
+          SELECT
+            i.id, i.customer_id, c.name, i.amount, i.paid_at, i.method, i.cash_batch_id, i.locked,
+            {group_date} AS group_date,
+            cb.status AS batch_status
+          {src}
+          ORDER BY group_date DESC, i.paid_at DESC
+        """, (period, collector))
+        for gd, rows in groupby(cur, key=lambda r: r["group_date"]):
+            h = heads.get(gd) or {"cash_cnt": 0, "cash_sum": 0, "tr_cnt": 0, "tr_sum": 0}
+            cash_sum, tr_sum = int(h["cash_sum"] or 0), int(h["tr_sum"] or 0)
+            yield {
+                "date": gd,
+                "is_today": (gd == today),
+                "cash_cnt": h["cash_cnt"], "tr_cnt": h["tr_cnt"],
+                "total_cnt": h["cash_cnt"] + h["tr_cnt"],
+                "cash_sum_fmt": money(cash_sum),
+                "tr_sum_fmt": money(tr_sum),
+                "total_sum_fmt": money(cash_sum + tr_sum),
+                "items": items(rows),
+            }
+
+    return len(heads), groups()
+
 @app.get("/")
 def petugas():
     period = request.args.get("period") or today_ym()
     collector = request.args.get("collector") or "Petugas"
     q = (request.args.get("q") or "").strip()
     msg = request.args.get("msg") or ""
+    show_all = request.args.get("all") == "1"
 
     # IMPORTANT: dipakai di banyak tempat (grouping + batch status)
     today = today_ymd()
 
+    s = period_schema(period)  # "main" atau arsip tahunan
     ensure_invoices(period)
 
-    # ---------- UNPAID list ----------
-    params = [period]
-    sql = """
-      SELECT c.id, c.name, c.address, i.amount
-      FROM invoices i
-      JOIN customers c ON c.id = i.customer_id
-      WHERE i.period = ?
-        AND i.status = 'UNPAID'
-        AND c.active = 1
-    """
-    if q:
-        like = f"%{q}%"
-        sql += " AND (c.id LIKE ? OR c.name LIKE ?) "
-        params.extend([like, like])
-    sql += " ORDER BY c.id"
-
-    rows = [dict(r) for r in query(sql, params)]
-    for r in rows:
-        r["amount_fmt"] = money(r["amount"])
-
-    # ---------- Marked TODAY (localtime) ----------
-    marked = query("""
-      SELECT i.id, i.customer_id, c.name, i.amount, i.paid_at, i.method, i.cash_batch_id, i.locked
-      FROM invoices i
-      JOIN customers c ON c.id = i.customer_id
+    # ---------- UNPAID list (halaman pertama; sisanya lewat /rows/unpaid) ----------
+    # petugas yang punya rute cuma lihat irisannya (kecuali ?all=1)
+    has_route = assignments.has_route(db(), collector)
+    on_route = has_route and not show_all
+    _, src, src_params = unpaid_source(s, period, collector, q, on_route)
+    unpaid_total = query_one(f"SELECT COUNT(*) AS n {src}", src_params, cache=True)["n"]
+    rows, nxt = unpaid_page(s, period, collector, q, on_route)
+    unpaid_rows = render_unpaid_rows(rows, nxt, 0, period, collector, q, show_all)
+
+    # ---------- Marked TODAY (localtime): cukup agregat ----------
+    today_stats = {"cash_cnt": 0, "cash_sum": 0, "tr_cnt": 0, "tr_sum": 0}
+    for r in query(f"""
+      SELECT i.method, COUNT(*) AS n, COALESCE(SUM(i.amount),0) AS total
+      FROM {s}.invoices i
       WHERE i.period = ?
         AND i.status = 'PAID'
         AND i.collector = ?
         AND date(i.paid_at,'localtime') = date('now','localtime')
-      ORDER BY i.paid_at DESC
-    """, (period, collector))
-
-    marked_today = []
-    for m in marked:
-        mm = dict(m)
-        mm["amount_fmt"] = money(mm["amount"])
-        can_undo = (mm["locked"] == 0) and (
-            (mm["method"] == "TRANSFER") or
-            (mm["method"] == "CASH" and mm["cash_batch_id"] is None)
-        )
-        mm["can_undo"] = can_undo
-        marked_today.append(mm)
+      GROUP BY i.method
+    """, (period, collector)):
+        key = "cash" if r["method"] == "CASH" else "tr"
+        today_stats[f"{key}_cnt"] = r["n"]
+        today_stats[f"{key}_sum"] = r["total"]
 
     # ---------- Marked GROUPED by batch_date (fallback paid_at date) ----------
-    marked_all = query("""
-      SELECT
-        i.id, i.customer_id, c.name, i.amount, i.paid_at, i.method, i.cash_batch_id, i.locked,
-        COALESCE(cb.batch_date, date(i.paid_at,'localtime')) AS group_date,
-        cb.status AS batch_status
-      FROM invoices i
-      JOIN customers c ON c.id = i.customer_id
-      LEFT JOIN cash_batches cb ON cb.id = i.cash_batch_id
-      WHERE i.period = ?
-        AND i.status = 'PAID'
-        AND i.collector = ?
-      ORDER BY group_date DESC, i.paid_at DESC
-    """, (period, collector))
-
-    groups = OrderedDict()
-    for m in marked_all:
-        mm = dict(m)
-        mm["amount_fmt"] = money(mm["amount"])
-
-        can_undo = (mm["locked"] == 0) and (
-            (mm["method"] == "TRANSFER") or
-            (mm["method"] == "CASH" and mm["cash_batch_id"] is None)
-        )
-        mm["can_undo"] = can_undo
-
-        gd = mm.get("group_date")  # string YYYY-MM-DD
-        if gd not in groups:
-            groups[gd] = {
-                "date": gd,
-                "is_today": (gd == today),
-                "cash_cnt": 0, "cash_sum": 0,
-                "tr_cnt": 0, "tr_sum": 0,
-                "items": []
-            }
-
-        if mm["method"] == "CASH":
-            groups[gd]["cash_cnt"] += 1
-            groups[gd]["cash_sum"] += int(mm["amount"] or 0)
-        else:
-            groups[gd]["tr_cnt"] += 1
-            groups[gd]["tr_sum"] += int(mm["amount"] or 0)
-
-        groups[gd]["items"].append(mm)
-
-    tx_groups = list(groups.values())  # ✅ wajib list, jangan .values tanpa ()
-
-    for g in tx_groups:
-        g["total_cnt"] = g["cash_cnt"] + g["tr_cnt"]
-        g["total_sum"] = g["cash_sum"] + g["tr_sum"]
-        g["cash_sum_fmt"] = money(g["cash_sum"])
-        g["tr_sum_fmt"] = money(g["tr_sum"])
-        g["total_sum_fmt"] = money(g["total_sum"])
+    # generator: baris dibaca dari cursor sambil template di-stream
+    tx_days, tx_groups = tx_group_stream(s, period, collector, today)
 
     # ---------- CASH pending TODAY (for batch) localtime ----------
-    cash_today = query_one("""
+    cash_today = query_one(f"""
       SELECT COUNT(*) AS jumlah, COALESCE(SUM(amount),0) AS total
-      FROM invoices
+      FROM {s}.invoices
       WHERE period = ?
         AND method = 'CASH'
         AND status = 'PAID'
@@ -1142,17 +2739,17 @@ def petugas():
 
 
     # ---------- Batch status TODAY (PENDING / APPROVED) ----------
-    pending_batch = query_one("""
+    pending_batch = query_one(f"""
       SELECT id, count, total_cash
-      FROM cash_batches
+      FROM {s}.cash_batches
       WHERE period=? AND batch_date=? AND collector=? AND status='PENDING'
       ORDER BY id DESC
       LIMIT 1
     """, (period, today, collector))
 
-    approved_batch = query_one("""
+    approved_batch = query_one(f"""
       SELECT id, count, total_cash
-      FROM cash_batches
+      FROM {s}.cash_batches
       WHERE period=? AND batch_date=? AND collector=? AND status='APPROVED'
       ORDER BY id DESC
       LIMIT 1
@@ -1174,21 +2771,25 @@ def petugas():
             f"{approved_batch['count']} org • {money(approved_batch['total_cash'])}"
         )
 
-    back_url = f"/?period={period}&collector={collector}"
+    back_url = url_for("petugas", period=period, collector=collector)
 
-    return render_template_string(
-        PETUGAS_HTML,
+    return stream_page(
+        "petugas.html",
         title="Petugas",
         period=period,
         collector=collector,
         q=q,
         msg=msg,
-        rows=rows,
+        unpaid_rows=unpaid_rows,
+        unpaid_total=unpaid_total,
+        has_route=has_route,
+        show_all=show_all,
 
-        # tab "hari ini" lama (ringkasan hari ini masih pakai ini)
-        marked_today=marked_today,
+        # ringkasan hari ini (agregat SQL)
+        today_stats=today_stats,
 
-        # tab "hari ini" baru: list grouped by batch_date (fallback)
+        # tab "hari ini": list grouped by batch_date (fallback), generator
+        tx_days=tx_days,
         tx_groups=tx_groups,
 
         cash_today_count=cash_today_count,
@@ -1203,6 +2804,27 @@ def petugas():
         cash_batch_approved_meta=cash_batch_approved_meta,
     )
 
+def render_unpaid_rows(rows, nxt, start, period, collector, q, show_all):
+    next_url = None
+    if nxt is not None:
+        next_url = url_for("unpaid_rows", period=period, collector=collector, q=q or None,
+                           all="1" if show_all else None, after=nxt, start=start + len(rows))
+    return render_template("rows_unpaid.html", rows=rows, start=start, next_url=next_url)
+
+@app.get("/rows/unpaid")
+def unpaid_rows():
+    """Halaman berikut daftar "Belum" (potongan HTML untuk infinite scroll)."""
+    period = request.args.get("period") or today_ym()
+    collector = request.args.get("collector") or "Petugas"
+    q = (request.args.get("q") or "").strip()
+    show_all = request.args.get("all") == "1"
+    start = request.args.get("start", 0, type=int)
+
+    s = period_schema(period)
+    on_route = not show_all and assignments.has_route(db(), collector)
+    rows, nxt = unpaid_page(s, period, collector, q, on_route, request.args.get("after") or "")
+    return render_unpaid_rows(rows, nxt, start, period, collector, q, show_all)
+
 @app.post("/pay")
 def pay():
     period = request.form.get("period") or today_ym()
@@ -1234,28 +2856,30 @@ def pay():
 
     # Catatan: TRANSFER tidak langsung locked agar bisa undo sebelum penutupan
     if method == "TRANSFER":
-        cur = exec1("""
+        sql = """
           UPDATE invoices
           SET status='PAID', method='TRANSFER', paid_at=datetime('now','localtime'),
               collector=?, cash_verified=1, locked=0, cash_batch_id=NULL
           WHERE period=? AND customer_id=? AND status='UNPAID' AND locked=0
-        """, (collector, period, customer_id))
+        """
     else:
-        cur = exec1("""
+        sql = """
           UPDATE invoices
           SET status='PAID', method='CASH', paid_at=datetime('now','localtime'),
               collector=?, cash_verified=0, locked=0
           WHERE period=? AND customer_id=? AND status='UNPAID' AND locked=0
-        """, (collector, period, customer_id))
+        """
 
-    if cur.rowcount != 1:
+    # tap yang bersamaan digabung satu transaksi oleh thread penulis
+    invoice_id = get_writer().submit(pay_job, sql, (collector, period, customer_id), collector)
+    if invoice_id is None:
         return redirect(url_for("petugas", period=period, collector=collector, msg="SUDAH LUNAS / TIDAK BISA."))
+    if period < today_ym():
+        arrears.invalidate()
 
     if do_print:
-        inv = query_one("SELECT id FROM invoices WHERE period=? AND customer_id=?", (period, customer_id))
-        if inv:
-            back = f"/?period={period}&collector={collector}"
-            return redirect(url_for("receipt", invoice_id=inv["id"], back=back))
+        back = url_for("petugas", period=period, collector=collector)
+        return redirect(url_for("receipt", invoice_id=invoice_id, back=back))
 
     return redirect(url_for("petugas", period=period, collector=collector, msg="Berhasil dicentang."))
 
@@ -1272,31 +2896,14 @@ def undo():
             msg="Gagal: invoice tidak ada."
         ))
 
-    cur = exec1("""
-      UPDATE invoices
-      SET status='UNPAID',
-          method=NULL,
-          paid_at=NULL,
-          collector=NULL,
-          cash_verified=0,
-          cash_batch_id=NULL,
-          locked=0
-      WHERE id=?
-        AND period=?
-        AND status='PAID'
-        AND locked=0
-        AND date(paid_at,'localtime') = date('now','localtime')
-        AND (
-          method='TRANSFER'
-          OR (method='CASH' AND cash_batch_id IS NULL)
-        )
-    """, (invoice_id, period))
-
-    if cur.rowcount != 1:
+    if not get_writer().submit(undo_job, invoice_id, period, collector):
         return redirect(url_for(
             "petugas", period=period, collector=collector,
             msg="Tidak bisa dibatalkan (mungkin sudah dikirim/terkunci)."
         ))
+    if period < today_ym():
+        arrears.invalidate()
+        reports.thaw(db(), period)  # periode lama berubah lagi -> laporan beku tidak berlaku
 
     return redirect(url_for(
         "petugas", period=period, collector=collector,
@@ -1341,7 +2948,7 @@ def submit_cash_batch():
             batch_id = pending["id"]
 
             # 2a) Masukkan CASH baru (yang belum punya cash_batch_id) ke batch pending ini
-            con.execute("""
+            attached = con.execute("""
                 UPDATE invoices
                 SET cash_batch_id=?, locked=1
                 WHERE period=?
@@ -1350,7 +2957,7 @@ def submit_cash_batch():
                   AND cash_verified=0
                   AND cash_batch_id IS NULL
                   AND date(paid_at,'localtime') = date(?)
-            """, (batch_id, period, batch_date))
+            """ + audit.RETURNING, (batch_id, period, batch_date)).fetchall()
 
             # 2b) Rehitung ulang count & total_cash dari isi batch (paling aman)
             sums = query_one("""
@@ -1379,7 +2986,7 @@ def submit_cash_batch():
                   AND date(paid_at,'localtime') = date(?)
             """, (period, batch_date))
 
-            con.commit()
+            audit.commit(con, db_path(), audit.from_rows("BATCH", attached, collector, batch_id=batch_id))
             return redirect(url_for(
                 "petugas",
                 period=period,
@@ -1417,7 +3024,7 @@ def submit_cash_batch():
         batch_id = cur.lastrowid
 
         # Attach + lock invoice CASH yang masuk batch baru
-        con.execute("""
+        attached = con.execute("""
             UPDATE invoices
             SET cash_batch_id=?, locked=1
             WHERE period=?
@@ -1426,7 +3033,7 @@ def submit_cash_batch():
               AND cash_verified=0
               AND cash_batch_id IS NULL
               AND date(paid_at,'localtime') = date(?)
-        """, (batch_id, period, batch_date))
+        """ + audit.RETURNING, (batch_id, period, batch_date)).fetchall()
 
         # (Opsional) Lock transfer hari itu juga
         con.execute("""
@@ -1439,7 +3046,7 @@ def submit_cash_batch():
               AND date(paid_at,'localtime') = date(?)
         """, (period, batch_date))
 
-        con.commit()
+        audit.commit(con, db_path(), audit.from_rows("BATCH", attached, collector, batch_id=batch_id))
         return redirect(url_for(
             "petugas",
             period=period,
@@ -1455,6 +3062,90 @@ def submit_cash_batch():
 # =========================
 # Routes: Admin
 # =========================
+def period_summary(s, period, con=None):
+    """Ringkasan bulan admin dalam bentuk angka mentah (bisa langsung dibekukan ke JSON)."""
+    unpaid = query_one(
+        f"SELECT COUNT(*) AS n FROM {s}.invoices WHERE period=? AND status='UNPAID'",
+        (period,), con=con, cache=True,
+    )
+    cash_ok = query_one(f"""
+      SELECT COUNT(*) AS n, COALESCE(SUM(amount),0) AS total
+      FROM {s}.invoices
+      WHERE period=? AND status='PAID' AND method='CASH' AND cash_verified=1
+    """, (period,), con=con, cache=True)
+    transfer = query_one(f"""
+      SELECT COUNT(*) AS n, COALESCE(SUM(amount),0) AS total
+      FROM {s}.invoices
+      WHERE period=? AND status='PAID' AND method='TRANSFER'
+    """, (period,), con=con, cache=True)
+    # grouping CASH approved per tanggal
+    grouped = query(f"""
+      SELECT batch_date, SUM(count) AS jumlah, SUM(total_cash) AS total
+      FROM {s}.cash_batches
+      WHERE period=? AND status='APPROVED'
+      GROUP BY batch_date
+      ORDER BY batch_date
+    """, (period,), con=con, cache=True)
+    return {
+        "unpaid": int(unpaid["n"] or 0),
+        "cash_ok": [int(cash_ok["n"] or 0), int(cash_ok["total"] or 0)],
+        "transfer": [int(transfer["n"] or 0), int(transfer["total"] or 0)],
+        "grouped": [dict(r) for r in grouped],
+    }
+
+def cash_date_sums(s, period, cash_date, con=None):
+    sums = {"CASH": [0, 0], "TRANSFER": [0, 0]}
+    for r in query(f"""
+      SELECT i.method, COUNT(*) AS n, COALESCE(SUM(i.amount),0) AS total
+      FROM {s}.invoices i
+      {CASH_DATE_WHERE}
+      GROUP BY i.method
+    """, (period, cash_date), con=con, cache=True):
+        sums[r["method"]] = [r["n"], r["total"]]
+    return sums
+
+def freeze_period(s, period):
+    """Bekukan ringkasan + detail setiap tanggal transaksi periode final."""
+    dates = {}
+    for r in query(f"""
+      SELECT DISTINCT date(paid_at,'localtime') AS d
+      FROM {s}.invoices WHERE period=? AND status='PAID'
+    """, (period,)):
+        rows = query(cash_date_sql(s, paged=True), (period, r["d"], "", 0, -1))
+        dates[r["d"]] = {"sums": cash_date_sums(s, period, r["d"]), "rows": [dict(x) for x in rows]}
+    reports.freeze(db(), period, period_summary(s, period), dates)
+    app.logger.info("laporan [%s] %s dibekukan (%d tanggal)", g.tenant.name, period, len(dates))
+
+def freeze_final():
+    """
+    Bekukan periode lampau yang sudah final tapi belum (atau tidak lagi) beku.
+    Dipanggil job rollover per tenant; GET /admin hanya membaca.
+    """
+    done = []
+    for r in query("""
+      SELECT period FROM (SELECT DISTINCT period FROM invoices UNION SELECT period FROM archived_periods)
+      WHERE period < ?
+        AND period NOT IN (SELECT period FROM period_reports WHERE kind = 'summary')
+      ORDER BY period
+    """, (today_ym(),)):
+        s = period_schema(r["period"])
+        if reports.is_final(db(), s, r["period"]):
+            freeze_period(s, r["period"])
+            done.append(r["period"])
+    return done
+
+def frozen_report(period):
+    """Laporan beku periode lampau, atau None (periode berjalan / belum dibekukan job)."""
+    if period >= today_ym():
+        return None
+    return reports.load(db(), period)
+
+def frozen_date(period, cash_date):
+    """Detail tanggal dari laporan beku; tanggal tanpa transaksi = kosong."""
+    if period >= today_ym() or not reports.is_frozen(db(), period):
+        return None
+    return reports.load(db(), period, "date", cash_date) or {"sums": {"CASH": [0, 0], "TRANSFER": [0, 0]}, "rows": []}
+
 @app.get("/admin")
 def admin():
     period = request.args.get("period") or today_ym()
@@ -1462,18 +3153,28 @@ def admin():
 
     ensure_invoices(period)
 
+    # laporan berat boleh baca dari snapshot (opt-in ?snap=1)
+    rq = report_db()
+    snap_qs = "&snap=1" if g.snap_as_of else ""
+
+    s = period_schema(period, rq)
+    archived = s != "main"
+
     # ---- init agar aman untuk template ----
     cash_date = request.args.get("cash_date")  # YYYY-MM-DD (opsional)
-    cash_date_detail = None
     cash_date_meta = ""
 
+    # periode lampau yang sudah final: semua angka dari laporan beku, tanpa agregat
+    frozen = frozen_report(period)
+
     # ---- pending batches (CASH yang perlu disetujui) ----
-    pending = query("""
+    # periode arsip / beku pasti tidak punya PENDING (syarat tutup buku)
+    pending = [] if (archived or frozen) else query("""
       SELECT id, batch_date, collector, count, total_cash, status
       FROM cash_batches
       WHERE period=? AND status='PENDING'
       ORDER BY batch_date, id
-    """, (period,))
+    """, (period,))  # selalu live: admin approve dari daftar ini
     pending2 = []
     for b in pending:
         bb = dict(b)
@@ -1481,116 +3182,55 @@ def admin():
         pending2.append(bb)
 
     # ---- ringkasan bulan ----
-    unpaid = query_one(
-        "SELECT COUNT(*) AS n FROM invoices WHERE period=? AND status='UNPAID'",
-        (period,),
-    )
-    unpaid_count = int(unpaid["n"] or 0)
-
-    cash_ok = query_one("""
-      SELECT COUNT(*) AS n, COALESCE(SUM(amount),0) AS total
-      FROM invoices
-      WHERE period=? AND status='PAID' AND method='CASH' AND cash_verified=1
-    """, (period,))
-    cash_ok_count = int(cash_ok["n"] or 0)
-    cash_ok_total = money(cash_ok["total"] or 0)
-
-    transfer = query_one("""
-      SELECT COUNT(*) AS n, COALESCE(SUM(amount),0) AS total
-      FROM invoices
-      WHERE period=? AND status='PAID' AND method='TRANSFER'
-    """, (period,))
-    transfer_count = int(transfer["n"] or 0)
-    transfer_total = money(transfer["total"] or 0)
+    summary = frozen or period_summary(s, period, con=rq)
+    unpaid_count = summary["unpaid"]
+    cash_ok_count, cash_ok_sum = summary["cash_ok"]
+    transfer_count, transfer_sum = summary["transfer"]
+    cash_ok_total = money(cash_ok_sum)
+    transfer_total = money(transfer_sum)
 
     total_paid_count = cash_ok_count + transfer_count
-    total_paid = money((cash_ok["total"] or 0) + (transfer["total"] or 0))
+    total_paid = money(cash_ok_sum + transfer_sum)
 
-    # ---- grouping CASH approved per tanggal ----
-    grouped = query("""
-      SELECT batch_date, SUM(count) AS jumlah, SUM(total_cash) AS total
-      FROM cash_batches
-      WHERE period=? AND status='APPROVED'
-      GROUP BY batch_date
-      ORDER BY batch_date
-    """, (period,))
     grouped2 = []
-    for g1 in grouped:
+    for g1 in summary["grouped"]:
         gg = dict(g1)
         gg["total_fmt"] = money(g1["total"])
         grouped2.append(gg)
 
     # ---- detail batch (PENDING/APPROVED) by id ----
+    # halaman pertama saja; sisanya lewat /admin/rows/* (infinite scroll)
     batch_id = request.args.get("batch")
-    batch_detail = None
+    batch_cards = batch_table = ""
     batch_meta = ""
     if batch_id:
-        meta = query_one("SELECT * FROM cash_batches WHERE id=? AND period=?", (batch_id, period))
+        meta = query_one(f"SELECT * FROM {s}.cash_batches WHERE id=? AND period=?", (batch_id, period), con=rq)
         if meta:
             batch_meta = f"{meta['batch_date']} • {meta['collector']} • {meta['count']} org • {money(meta['total_cash'])}"
-            detail = query("""
-              SELECT c.id, c.name, i.amount, i.paid_at
-              FROM invoices i JOIN customers c ON c.id=i.customer_id
-              WHERE i.cash_batch_id=?
-              ORDER BY i.paid_at
-            """, (batch_id,))
-            bd = []
-            for r in detail:
-                rr = dict(r)
-                rr["amount_fmt"] = money(r["amount"])
-                bd.append(rr)
-            batch_detail = bd
+            rows, nxt = batch_page(s, batch_id, con=rq)
+            batch_cards, batch_table = (
+                render_batch_rows(rows, nxt, view, period, batch_id, bool(snap_qs)) for view in ("cards", "table")
+            )
 
     # ---- detail transaksi per tanggal (CASH approved + TRANSFER) ----
+    cash_date_cards = cash_date_table = ""
     if cash_date:
-        detail = query("""
-        SELECT
-            date(i.paid_at,'localtime') AS trx_date,
-            cb.id AS batch_id,
-            cb.collector,
-            c.id AS customer_id,
-            c.name,
-            i.method,
-            i.amount,
-            i.paid_at
-        FROM invoices i
-        JOIN customers c ON c.id = i.customer_id
-        LEFT JOIN cash_batches cb ON cb.id = i.cash_batch_id
-        WHERE i.period = ?
-          AND i.status = 'PAID'
-          AND date(i.paid_at,'localtime') = date(?)
-          AND (
-            i.method = 'TRANSFER'
-            OR (i.method = 'CASH' AND i.cash_verified = 1)
-          )
-        ORDER BY i.method DESC, cb.id, i.paid_at
-        """, (period, cash_date))
-
-        cd = []
-        cash_cnt = cash_sum = 0
-        tr_cnt = tr_sum = 0
-
-        for r in detail:
-            rr = dict(r)
-            rr["amount_fmt"] = money(r["amount"])
-            cd.append(rr)
-
-            if rr["method"] == "CASH":
-                cash_cnt += 1
-                cash_sum += int(rr["amount"] or 0)
-            else:
-                tr_cnt += 1
-                tr_sum += int(rr["amount"] or 0)
-
-        cash_date_detail = cd
+        day = frozen_date(period, cash_date) if frozen else None
+        sums = day["sums"] if day else cash_date_sums(s, period, cash_date, con=rq)
+        (cash_cnt, cash_sum), (tr_cnt, tr_sum) = sums["CASH"], sums["TRANSFER"]
+
+        rows, nxt = cash_date_page(s, period, cash_date, con=rq, frozen=day["rows"] if day else None)
+        cash_date_cards, cash_date_table = (
+            render_cash_date_rows(rows, nxt, view, period, cash_date, bool(snap_qs)) for view in ("cards", "table")
+        )
         cash_date_meta = (
             f"{cash_date} • CASH {cash_cnt} ({money(cash_sum)}) • "
             f"TRANSFER {tr_cnt} ({money(tr_sum)}) • "
             f"TOTAL {cash_cnt + tr_cnt} ({money(cash_sum + tr_sum)})"
         )
 
-    return render_template_string(
-        ADMIN_HTML,
+    return stream_page(
+        "admin.html",
         title="Admin",
         period=period,
         admin_name=admin_name,
@@ -1603,16 +3243,58 @@ def admin():
         total_paid_count=total_paid_count,
         total_paid=total_paid,
         cash_grouped=grouped2,
-        batch_detail=batch_detail,
+        batch_cards=batch_cards,
+        batch_table=batch_table,
         batch_detail_id=batch_id,
         batch_detail_meta=batch_meta,
         cash_date=cash_date,
-        cash_date_detail=cash_date_detail,
+        cash_date_cards=cash_date_cards,
+        cash_date_table=cash_date_table,
         cash_date_meta=cash_date_meta,
+        snap_as_of=g.snap_as_of,
+        snap_qs=snap_qs,
+        archived=archived,
     )
 
 
 
+def render_batch_rows(rows, nxt, view, period, batch_id, snap):
+    next_url = None
+    if nxt is not None:
+        next_url = url_for("admin_batch_rows", batch_id=batch_id, period=period, view=view,
+                           after=nxt, snap="1" if snap else None)
+    return render_template("rows_batch.html", rows=rows, view=view, next_url=next_url)
+
+def render_cash_date_rows(rows, nxt, view, period, cash_date, snap):
+    next_url = None
+    if nxt is not None:
+        next_url = url_for("admin_cash_date_rows", period=period, date=cash_date, view=view,
+                           after=nxt, snap="1" if snap else None)
+    return render_template("rows_cash_date.html", rows=rows, view=view, next_url=next_url)
+
+@app.get("/admin/rows/batch/<int:batch_id>")
+def admin_batch_rows(batch_id: int):
+    period = request.args.get("period") or today_ym()
+    view = "table" if request.args.get("view") == "table" else "cards"
+    rq = report_db()
+    s = period_schema(period, rq)
+    rows, nxt = batch_page(s, batch_id, request.args.get("after") or "", con=rq)
+    return render_batch_rows(rows, nxt, view, period, batch_id, g.snap_as_of is not None)
+
+@app.get("/admin/rows/cash_date")
+def admin_cash_date_rows():
+    period = request.args.get("period") or today_ym()
+    cash_date = request.args.get("date")
+    if not cash_date:
+        abort(400)
+    view = "table" if request.args.get("view") == "table" else "cards"
+    rq = report_db()
+    s = period_schema(period, rq)
+    day = frozen_date(period, cash_date)
+    rows, nxt = cash_date_page(s, period, cash_date, request.args.get("after") or "", con=rq,
+                               frozen=day["rows"] if day else None)
+    return render_cash_date_rows(rows, nxt, view, period, cash_date, g.snap_as_of is not None)
+
 @app.post("/admin/approve")
 def admin_approve():
     period = request.form.get("period") or today_ym()
@@ -1624,43 +3306,643 @@ def admin_approve():
     con = db()
     try:
         con.execute("BEGIN;")
-        con.execute("""
+        cur = con.execute("""
           UPDATE cash_batches
           SET status='APPROVED', approved_by=?, approved_at=datetime('now','localtime')
           WHERE id=? AND period=? AND status='PENDING'
         """, (admin_name, batch_id, period))
+        if cur.rowcount != 1:
+            # sudah di-approve (klik ganda / POST ulang): jangan tulis event APPROVE palsu
+            con.rollback()
+            return redirect(url_for("admin", period=period))
 
         # lock invoices in that batch (CASH)
-        con.execute("""
+        rows = con.execute("""
           UPDATE invoices
           SET cash_verified=1, locked=1
           WHERE cash_batch_id=?
             AND method='CASH'
             AND status='PAID'
-        """, (batch_id,))
-        con.commit()
+            AND cash_verified=0
+        """ + audit.RETURNING, (batch_id,)).fetchall()
+        audit.commit(con, db_path(), audit.from_rows("APPROVE", rows, admin_name, batch_id=int(batch_id)))
     except Exception:
         con.rollback()
         raise
 
     return redirect(url_for("admin", period=period))
 
+@app.get("/admin/rekon")
+def admin_rekon():
+    period = request.args.get("period") or today_ym()
+    msg = request.args.get("msg") or ""
+
+    counts = {"MATCHED": 0, "REVIEW": 0, "IGNORED": 0}
+    for r in query("SELECT status, COUNT(*) AS n FROM bank_mutations WHERE period=? GROUP BY status", (period,)):
+        counts[r["status"]] = r["n"]
+
+    review = [dict(r) for r in query("""
+      SELECT hash, trx_date, description, amount, candidates
+      FROM bank_mutations
+      WHERE period=? AND status='REVIEW'
+      ORDER BY trx_date, hash
+    """, (period,))]
+
+    # detail kandidat (masih UNPAID) dalam satu query
+    ids = {i for m in review for i in json.loads(m["candidates"] or "[]")}
+    cands = {}
+    if ids:
+        for c in query("""
+          SELECT i.id, i.customer_id, c.name, i.amount
+          FROM invoices i JOIN customers c ON c.id = i.customer_id
+          WHERE i.id IN (SELECT value FROM json_each(?)) AND i.status='UNPAID' AND i.locked=0
+        """, (json.dumps(sorted(ids)),)):
+            cc = dict(c)
+            cc["amount_fmt"] = money(c["amount"])
+            cands[c["id"]] = cc
+    for m in review:
+        m["amount_fmt"] = money(m["amount"])
+        m["cands"] = [cands[i] for i in json.loads(m["candidates"] or "[]") if i in cands]
+
+    return render_template(
+        "rekon.html",
+        title="Rekonsiliasi",
+        period=period,
+        msg=msg,
+        counts=counts,
+        review=review,
+    )
+
+@app.post("/admin/rekon/import")
+def admin_rekon_import():
+    period = request.form.get("period") or today_ym()
+    f = request.files.get("file")
+    if not f:
+        return redirect(url_for("admin_rekon", period=period, msg="Gagal: file tidak ada."))
+
+    # dibaca baris per baris dari stream upload, tidak di-load utuh ke memori
+    lines = io.TextIOWrapper(f.stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        r = reconcile.import_csv(db(), lines, period)
+    except ValueError as e:
+        return redirect(url_for("admin_rekon", period=period, msg=f"Gagal: {e}"))
+
+    if r["matched"] and period < today_ym():
+        arrears.invalidate()
+    return redirect(url_for(
+        "admin_rekon", period=period,
+        msg=f"Import selesai: {r['matched']} cocok otomatis, {r['review']} masuk review, {r['skipped']} sudah pernah diimport.",
+    ))
+
+@app.post("/admin/rekon/resolve")
+def admin_rekon_resolve():
+    period = request.form.get("period") or today_ym()
+    h = request.form.get("hash")
+    invoice_id = request.form.get("invoice_id")
+
+    con = db()
+    try:
+        con.execute("BEGIN")
+        m = query_one("SELECT trx_date FROM bank_mutations WHERE hash=? AND status='REVIEW'", (h,))
+        if not m:
+            con.execute("ROLLBACK")
+            return redirect(url_for("admin_rekon", period=period, msg="Mutasi sudah diproses."))
+
+        if invoice_id:
+            if not reconcile.apply_payment(con, invoice_id, f"{m['trx_date']} 12:00:00"):
+                con.execute("ROLLBACK")
+                return redirect(url_for("admin_rekon", period=period, msg="Invoice sudah lunas / terkunci."))
+            con.execute("UPDATE bank_mutations SET status='MATCHED', invoice_id=? WHERE hash=?", (invoice_id, h))
+            msg = f"Transfer dicocokkan ke invoice #{invoice_id}."
+        else:
+            con.execute("UPDATE bank_mutations SET status='IGNORED' WHERE hash=?", (h,))
+            msg = "Mutasi diabaikan."
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+    if invoice_id and period < today_ym():
+        arrears.invalidate()
+    return redirect(url_for("admin_rekon", period=period, msg=msg))
+
+@app.get("/admin/routes")
+def admin_routes():
+    return render_template(
+        "routes.html",
+        title="Rute Petugas",
+        period=request.args.get("period") or today_ym(),
+        msg=request.args.get("msg") or "",
+        rows=assignments.listing(db()),
+        addresses=query("""
+          SELECT address, COUNT(*) AS n FROM customers
+          WHERE active = 1 AND address IS NOT NULL AND address <> ''
+          GROUP BY address ORDER BY address
+        """),
+    )
+
+@app.post("/admin/routes/add")
+def admin_routes_add():
+    period = request.form.get("period") or today_ym()
+    try:
+        order = int(request.form.get("route_order") or 0)
+        assignments.add(db(), request.form.get("collector") or "", request.form.get("kind") or "",
+                        request.form.get("value") or "", order)
+    except ValueError as e:
+        return redirect(url_for("admin_routes", period=period, msg=f"Gagal: {e}"))
+    return redirect(url_for("admin_routes", period=period, msg="Rute disimpan."))
+
+@app.post("/admin/routes/delete")
+def admin_routes_delete():
+    period = request.form.get("period") or today_ym()
+    assignments.remove(db(), request.form.get("id"))
+    return redirect(url_for("admin_routes", period=period, msg="Rute dihapus."))
+
+@app.get("/admin/customers")
+def admin_customers(result=None, msg=""):
+    return render_template(
+        "customers.html",
+        title="Import Pelanggan",
+        period=request.values.get("period") or today_ym(),
+        current=today_ym(),
+        msg=msg or request.args.get("msg") or "",
+        result=result,
+        counts=query_one("SELECT COUNT(*) AS total, COALESCE(SUM(active), 0) AS active FROM customers"),
+    )
+
+@app.post("/admin/customers/import")
+def admin_customers_import():
+    period = request.form.get("period") or today_ym()
+    f = request.files.get("file")
+    if not f:
+        return redirect(url_for("admin_customers", period=period, msg="Gagal: file tidak ada."))
+
+    # stream upload baris per baris; koneksi sendiri (autocommit) karena
+    # customer_import mengatur BEGIN IMMEDIATE per potongan
+    lines = io.TextIOWrapper(f.stream, encoding="utf-8-sig", errors="replace", newline="")
+    conn = sqlite3.connect(db_path(), isolation_level=None)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        r = customer_import.import_csv(conn, lines, today_ym())
+    except ValueError as e:
+        return admin_customers(msg=f"Gagal: {e}")
+    finally:
+        conn.close()
+    return admin_customers(result=r, msg="Import selesai." if not r["error_count"] else "Import selesai dengan error.")
+
+@app.get("/admin/plans")
+def admin_plans():
+    rows = [dict(r) for r in plans.listing(db())]
+    for r in rows:
+        r["fee_fmt"] = money(r["fee"])
+    return render_template(
+        "plans.html",
+        title="Paket Tarif",
+        period=request.args.get("period") or today_ym(),
+        msg=request.args.get("msg") or "",
+        rows=rows,
+        names=sorted({r["name"] for r in rows}),
+    )
+
+@app.post("/admin/plans/set")
+def admin_plans_set():
+    period = request.form.get("period") or today_ym()
+    effective_from = request.form.get("effective_from") or ""
+    fee = reconcile.parse_amount(request.form.get("fee") or "")
+    if fee is None:
+        return redirect(url_for("admin_plans", period=period, msg="Gagal: tarif tidak valid."))
+    name = (request.form.get("name") or "").strip()
+    try:
+        rows = plans.set_fee(db(), name, fee, effective_from)
+    except ValueError as e:
+        return redirect(url_for("admin_plans", period=period, msg=f"Gagal: {e}"))
+    audit.record(db_path(), audit.from_rows("REPRICE", rows, "Admin", plan=name, effective_from=effective_from))
+    if rows and effective_from < today_ym():
+        arrears.invalidate()
+    return redirect(url_for("admin_plans", period=period, msg=f"Tarif disimpan, {len(rows)} tagihan dihitung ulang."))
+
+@app.post("/admin/plans/delete")
+def admin_plans_delete():
+    period = request.form.get("period") or today_ym()
+    rows = plans.remove(db(), request.form.get("id"))
+    audit.record(db_path(), audit.from_rows("REPRICE", rows, "Admin", removed_plan_id=request.form.get("id")))
+    if rows:
+        arrears.invalidate()
+    return redirect(url_for("admin_plans", period=period, msg=f"Tarif dihapus, {len(rows)} tagihan dihitung ulang."))
+
+@app.get("/admin/events")
+def admin_events():
+    f = {k: (request.args.get(k) or "").strip() for k in ("invoice_id", "actor", "day")}
+    flush_audit(g.tenant)  # event di buffer ikut tampil
+    try:
+        rows = [dict(r) for r in audit.lookup(db(), f["invoice_id"], f["actor"], f["day"],
+                                              request.args.get("before"), PAGE_SIZE + 1)]
+    except ValueError:
+        abort(400)
+    more = rows[PAGE_SIZE - 1]["id"] if len(rows) > PAGE_SIZE else None
+    rows = rows[:PAGE_SIZE]
+    for r in rows:
+        r["amount_fmt"] = money(r["amount"]) if r["amount"] is not None else ""
+    return render_template(
+        "events.html",
+        title="Log Pembayaran",
+        period=request.args.get("period") or today_ym(),
+        f=f,
+        rows=rows,
+        more=more,
+        icons={"PAY": "✅", "UNDO": "↩️", "BATCH": "📦", "APPROVE": "🔒", "REPRICE": "💸"},
+    )
+
+@app.get("/admin/profiles")
+def admin_profiles():
+    return render_template(
+        "profiles.html",
+        title="Profil Request",
+        period=request.args.get("period") or today_ym(),
+        rows=profiler.listing(PROFILE_DIR),
+        key_set=bool(PROFILE_KEY),
+        sample=PROFILE_SAMPLE,
+        keep=profiler.KEEP,
+    )
+
+@app.get("/admin/profiles/<name>.prof")
+def admin_profile_download(name):
+    return send_from_directory(os.path.abspath(PROFILE_DIR), name + ".prof", as_attachment=True)
+
+@app.get("/admin/profiles/<name>/top")
+def admin_profile_top(name):
+    path = os.path.join(os.path.abspath(PROFILE_DIR), os.path.basename(name) + ".prof")
+    if not os.path.isfile(path):
+        abort(404)
+    return Response(profiler.report(path), mimetype="text/plain")
+
+@app.get("/admin/cache")
+def admin_cache():
+    """Statistik cache in-process (JSON)."""
+    with _receipt_lock:
+        receipts = len(_receipt_cache)
+    return jsonify({
+        "query": query_cache_stats(),
+        "receipts": receipts,
+        "audit_pending": audit.pending(),
+        # baca saja: get_writer() membuka tenant & menyalakan thread penulis
+        "writer": w.stats() if (w := _writers.get(db_path())) else None,
+        "tenants": {"routing": TENANT_ROUTING, "count": len(TENANTS),
+                    "open": [t.name for t in TENANTS.values() if t.db_path in _open_tenants],
+                    "max_open": OPEN_TENANTS},
+    })
+
+@app.get("/admin/admission")
+def admin_admission():
+    """Antrean / shed per kelas request (JSON)."""
+    return jsonify(GATE.stats())
+
+@app.get("/admin/rollover")
+def admin_rollover():
+    """Progress job rollover invoice (JSON, untuk dipantau/poll)."""
+    return jsonify({
+        "interval": ROLLOVER_INTERVAL,
+        "rollover_day": rollover.ROLLOVER_DAY,
+        "targets": rollover.targets(),
+        "periods": rollover.STATUS.get(db_path(), {}),
+    })
+
+@app.get("/admin/maintenance")
+def admin_maintenance():
+    """Jadwal + statistik halaman DB sekarang + riwayat perawatan (JSON). ?deep=1 ikut scan dbstat."""
+    return jsonify({
+        "interval": MAINTENANCE_INTERVAL,
+        "quiet_hours": maintenance.QUIET_HOURS,
+        "budget": maintenance.BUDGET,
+        "due": maintenance.due(db()),
+        "now": maintenance.page_stats(db(), deep=request.args.get("deep") == "1"),
+        "runs": maintenance.history(db()),
+    })
+
+@app.get("/admin/arrears")
+def admin_arrears():
+    period = request.args.get("period") or today_ym()
+    try:
+        min_streak = max(1, int(request.args.get("min") or 3))
+    except ValueError:
+        min_streak = 3
+
+    rq = report_db()
+    cache_key = snapshot().path if g.snap_as_of else db_path()
+    data = arrears.arrears(rq, cache_key, period)
+    hits = {cid: v for cid, v in data.items() if v[0] >= min_streak}
+
+    cust = {}
+    if hits:
+        for c in query(
+            "SELECT id, name, address FROM customers WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(hits)),), con=rq,
+        ):
+            cust[c["id"]] = c
+
+    rows = []
+    for cid, (streak, since, owed, unpaid) in hits.items():
+        c = cust.get(cid)
+        rows.append({
+            "customer_id": cid,
+            "name": c["name"] if c else "?",
+            "address": c["address"] if c else None,
+            "streak": streak,
+            "streak_from": since,
+            "outstanding": owed,
+            "outstanding_fmt": money(owed),
+            "unpaid": unpaid,
+        })
+    rows.sort(key=lambda r: (-r["streak"], -r["outstanding"], r["customer_id"]))
+
+    if request.args.get("fmt"):
+        header = ["customer_id", "nama", "alamat", "bulan_berturut", "sejak", "total_tunggakan", "jumlah_tagihan"]
+        body = ((r["customer_id"], r["name"], r["address"], r["streak"], r["streak_from"],
+                 r["outstanding"], r["unpaid"]) for r in rows)
+        return export_response(f"tunggakan-{period}", header, body)
+
+    return render_template(
+        "arrears.html",
+        title="Tunggakan",
+        period=period,
+        min_streak=min_streak,
+        rows=rows,
+        total_fmt=money(sum(r["outstanding"] for r in rows)),
+        snap_as_of=g.snap_as_of,
+    )
+
+# =========================
+# Routes: Export (CSV / XLSX, streaming)
+# =========================
+def export_response(name, header, cur):
+    """
+    Kirim hasil cursor sebagai CSV/XLSX (?fmt=). Baris dibaca langsung dari cursor
+    di dalam generator, stream_with_context menjaga koneksi g.db tetap hidup.
+    """
+    fmt = request.args.get("fmt") or "csv"
+    if fmt not in export.FORMATS:
+        abort(400)
+    mimetype, ext = export.FORMATS[fmt]
+    body = export.stream(fmt, name, header, cur)
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{ext}"'},
+    )
+
+@app.get("/export/invoices")
+def export_invoices():
+    period = request.args.get("period") or today_ym()
+    rq = report_db()
+    s = period_schema(period, rq)
+    cur = rq.execute(f"""
+      SELECT i.id, i.period, c.id, c.name, c.address, i.amount, i.status, i.method,
+             i.paid_at, i.collector, i.cash_batch_id, i.cash_verified, i.locked
+      FROM {s}.invoices i
+      JOIN customers c ON c.id = i.customer_id
+      WHERE i.period = ?
+      ORDER BY c.id
+    """, (period,))
+    header = ["invoice_id", "periode", "customer_id", "nama", "alamat", "nominal", "status",
+              "metode", "waktu_bayar", "petugas", "tarikan", "cash_verified", "locked"]
+    return export_response(f"tagihan-{period}", header, cur)
+
+@app.get("/export/batch/<int:batch_id>")
+def export_batch(batch_id: int):
+    period = request.args.get("period") or today_ym()
+    rq = report_db()
+    s = period_schema(period, rq)
+    if not query_one(f"SELECT id FROM {s}.cash_batches WHERE id=? AND period=?", (batch_id, period), con=rq):
+        abort(404)
+    cur = rq.execute(f"""
+      SELECT cb.id, cb.batch_date, cb.collector, cb.status, c.id, c.name, i.amount, i.paid_at
+      FROM {s}.invoices i
+      JOIN customers c ON c.id = i.customer_id
+      JOIN {s}.cash_batches cb ON cb.id = i.cash_batch_id
+      WHERE i.cash_batch_id = ?
+      ORDER BY i.paid_at
+    """, (batch_id,))
+    header = ["tarikan", "tanggal", "petugas", "status", "customer_id", "nama", "nominal", "waktu_bayar"]
+    return export_response(f"tarikan-{batch_id}", header, cur)
+
+@app.get("/export/cash_date")
+def export_cash_date():
+    period = request.args.get("period") or today_ym()
+    cash_date = request.args.get("date")
+    if not cash_date:
+        abort(400)
+    rq = report_db()
+    s = period_schema(period, rq)
+    cur = rq.execute(cash_date_sql(s), (period, cash_date))
+    header = ["tanggal", "tarikan", "petugas", "customer_id", "nama", "metode", "nominal", "waktu_bayar"]
+    return export_response(f"transaksi-{cash_date}", header, cur)
+
+# =========================
+# Routes: Struk
+# =========================
+RECEIPT_SQL = """
+  SELECT i.*, c.name
+  FROM {s}.invoices i
+  JOIN customers c ON c.id = i.customer_id
+"""
+
+def find_receipt(invoice_id):
+    """Invoice + nama pelanggan dalam satu join; cari juga di arsip tahunan."""
+    inv = query_one(RECEIPT_SQL.format(s="main") + " WHERE i.id=?", (invoice_id,))
+    if not inv:
+        for a in query("SELECT MIN(period) AS period FROM archived_periods GROUP BY year"):
+            s = period_schema(a["period"])
+            inv = query_one(RECEIPT_SQL.format(s=s) + " WHERE i.id=?", (invoice_id,))
+            if inv:
+                break
+    return inv
+
+def cached_receipt(inv, kind, render):
+    """
+    Hasil render struk (HTML / ESC/POS) + ETag. Invoice locked tidak berubah lagi,
+    jadi disimpan di LRU. Nama pelanggan (bisa diganti lewat import) dan host
+    (URL verifikasi _external) ikut di key, supaya struk tidak basi / salah host.
+    """
+    key = (db_path(), request.host, kind, inv["id"], inv["name"])
+    if inv["locked"]:
+        with _receipt_lock:
+            hit = _receipt_cache.get(key)
+            if hit:
+                _receipt_cache.move_to_end(key)
+                return hit
+
+    data = render(inv)
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    out = (data, hashlib.sha1(raw).hexdigest())
+    if inv["locked"]:
+        with _receipt_lock:
+            _receipt_cache[key] = out
+            while len(_receipt_cache) > RECEIPT_CACHE_MAX:
+                _receipt_cache.popitem(last=False)
+    return out
+
+def _sign(body: str) -> str:
+    mac = hmac.new(RECEIPT_SECRET.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:12]).decode("ascii")
+
+def receipt_code(inv):
+    """
+    Kode verifikasi struk: v1.<id>.<period>.<amount>.<paid_at>.<hmac>
+    paid_at dipadatkan jadi YYYYMMDDHHMMSS supaya QR tetap kecil.
+    None kalau RECEIPT_SECRET belum di-set.
+    """
+    if not RECEIPT_SECRET:
+        return None
+    paid = "".join(ch for ch in (inv["paid_at"] or "") if ch.isdigit()) or "0"
+    body = f"v1.{inv['id']}.{inv['period']}.{inv['amount']}.{paid}"
+    return f"{body}.{_sign(body)}"
+
+def parse_receipt_code(code):
+    """Cek tanda tangan tanpa DB. Return dict isi struk, atau None kalau palsu."""
+    if not RECEIPT_SECRET:
+        return None
+    parts = (code or "").split(".")
+    if len(parts) != 6 or parts[0] != "v1":
+        return None
+    body, sig = ".".join(parts[:5]), parts[5]
+    if not hmac.compare_digest(_sign(body), sig):
+        return None
+    _, inv_id, period, amount, paid = parts[:5]
+    if len(paid) == 14:
+        paid = f"{paid[:4]}-{paid[4:6]}-{paid[6:8]} {paid[8:10]}:{paid[10:12]}:{paid[12:]}"
+    return {"id": inv_id, "period": period, "amount": amount, "paid_at": paid}
+
+def receipt_qr_payload(inv):
+    code = receipt_code(inv)
+    return url_for("verify", code=code, _external=True) if code else None
+
+def receipt_body(inv):
+    return cached_receipt(inv, "html", lambda i: render_template(
+        "receipt_body.html", inv=i, amount=money(i["amount"]),
+        code=receipt_code(i), qr_enabled=qrimg.available() and bool(RECEIPT_SECRET)))
+
+def receipt_escpos(inv):
+    return cached_receipt(inv, "escpos", lambda i: escpos.receipt(
+        i, money(i["amount"]), receipt_qr_payload(i)))
+
+def rawbt_link(data: bytes):
+    """Link print bridge RawBT (Android): kirim byte ESC/POS langsung ke printer Bluetooth."""
+    return "rawbt:base64," + base64.b64encode(data).decode("ascii")
+
+def locked_response(resp, locked, etag):
+    """
+    Struk locked: ETag + cache browser saja (private: isinya nama & nominal
+    pelanggan), tanpa immutable karena nama / host bisa berubah.
+    """
+    if locked:
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = f"private, max-age={RECEIPT_MAX_AGE}"
+    else:
+        resp.headers["Cache-Control"] = "no-store"
+    return resp
+
 @app.get("/receipt/<int:invoice_id>")
 def receipt(invoice_id: int):
-    inv = query_one("SELECT * FROM invoices WHERE id=?", (invoice_id,))
+    inv = find_receipt(invoice_id)
     if not inv:
         abort(404)
-    cust = query_one("SELECT * FROM customers WHERE id=?", (inv["customer_id"],))
-    if not cust:
+
+    body, etag = receipt_body(inv)
+    if inv["locked"] and request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        raw, _ = receipt_escpos(inv)
+        resp = Response(render_template(
+            "receipt.html", body=body, inv=inv, rawbt=rawbt_link(escpos.job([raw])),
+        ), mimetype="text/html")
+    return locked_response(resp, inv["locked"], etag)
+
+@app.get("/receipt/<int:invoice_id>/escpos")
+def receipt_raw(invoice_id: int):
+    inv = find_receipt(invoice_id)
+    if not inv:
+        abort(404)
+
+    raw, etag = receipt_escpos(inv)
+    if inv["locked"] and request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(escpos.job([raw]), mimetype="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="struk-{invoice_id}.bin"',
+        })
+    return locked_response(resp, inv["locked"], etag)
+
+@app.get("/receipt/<int:invoice_id>/qr.png")
+def receipt_qr(invoice_id: int):
+    if not qrimg.available() or not RECEIPT_SECRET:
+        abort(404)
+    inv = find_receipt(invoice_id)
+    if not inv:
         abort(404)
 
-    return render_template_string(
-        RECEIPT_HTML,
-        inv=inv,
-        cust=cust,
-        amount=money(inv["amount"]),
+    # QR invoice locked tidak berubah: cache memori + disk, boleh di-cache browser
+    data = qrimg.png(receipt_qr_payload(inv), cache=bool(inv["locked"]))
+    resp = Response(data, mimetype="image/png")
+    return locked_response(resp, inv["locked"], hashlib.sha1(data).hexdigest())
+
+@app.get("/verify/<code>")
+def verify(code):
+    if not RECEIPT_SECRET:
+        return render_template("verify.html", signing=False, info=None, amount=""), 503
+    info = parse_receipt_code(code)
+    return render_template(
+        "verify.html",
+        signing=True,
+        info=info,
+        amount=money(info["amount"]) if info else "",
+    ), (200 if info else 400)
+
+def receipt_rows():
+    """
+    Invoice untuk print massal: ?batch=<id> (satu tarikan CASH)
+    atau ?collector=..&date=YYYY-MM-DD (semua transaksi petugas di hari itu).
+    Return (rows, judul).
+    """
+    period = request.args.get("period") or today_ym()
+    batch_id = request.args.get("batch")
+    collector = request.args.get("collector")
+    day = request.args.get("date") or today_ymd()
+    s = period_schema(period)
+
+    if batch_id:
+        rows = query(RECEIPT_SQL.format(s=s) + " WHERE i.cash_batch_id=? ORDER BY i.paid_at", (batch_id,))
+        return rows, f"Tarikan #{batch_id}"
+    if collector:
+        rows = query(RECEIPT_SQL.format(s=s) + """
+          WHERE i.period=? AND i.status='PAID' AND i.collector=?
+            AND date(i.paid_at,'localtime') = date(?)
+          ORDER BY i.paid_at
+        """, (period, collector, day))
+        return rows, f"{collector} • {day}"
+    abort(400)
+
+@app.get("/receipts")
+def receipts():
+    rows, title_meta = receipt_rows()
+    raw = escpos.job(receipt_escpos(inv)[0] for inv in rows)
+    return render_template(
+        "receipts.html",
+        bodies=[receipt_body(inv)[0] for inv in rows],
+        title_meta=title_meta,
+        escpos_url=url_for("receipts_raw") + "?" + request.query_string.decode("ascii", "replace"),
+        rawbt=rawbt_link(raw),
     )
 
+@app.get("/receipts/escpos")
+def receipts_raw():
+    rows, _ = receipt_rows()
+    raw = escpos.job(receipt_escpos(inv)[0] for inv in rows)
+    return Response(raw, mimetype="application/octet-stream", headers={
+        "Content-Disposition": 'attachment; filename="struk.bin"',
+    })
+
+STARTUP["import_ms"] = round((time.perf_counter() - _BOOT) * 1000, 1)
+
 if __name__ == "__main__":
     # host 0.0.0.0 agar bisa diakses HP dalam 1 WiFi/LAN
     app.run(host="0.0.0.0", port=5500, debug=True)
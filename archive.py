@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import sys
+from datetime import date
+
+DB_PATH = "wifi.db"     # ganti bila perlu
+
+# tabel yang dipindah per periode (urutan penting: batch dulu, invoice ikut)
+ARCHIVE_TABLES = ("cash_batches", "invoices")
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archived_periods (
+      period      TEXT PRIMARY KEY,       -- YYYY-MM
+      year        TEXT NOT NULL,          -- YYYY -> <stem>_archive_YYYY.db
+      invoices    INTEGER NOT NULL DEFAULT 0,
+      batches     INTEGER NOT NULL DEFAULT 0,
+      archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.commit()
+
+
+def archive_path(db_path: str, year: str) -> str:
+    """
+    <stem>_archive_YYYY.db di folder DB (wifi.db -> wifi_archive_2025.db), supaya
+    beberapa DB tenant di folder yang sama tidak berbagi satu file arsip.
+    """
+    path = os.path.abspath(db_path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path), f"{stem}_archive_{year}.db")
+
+
+def legacy_path(db_path: str, year: str) -> str:
+    """Nama lama (sebelum multi-tenant): archive_YYYY.db, satu per folder."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), f"archive_{year}.db")
+
+
+def adopt_legacy(conn: sqlite3.Connection, db_path: str) -> list[str]:
+    """
+    Rename archive_YYYY.db lama ke nama per-DB, hanya untuk tahun yang tercatat
+    di archived_periods DB ini. Return file yang dipindah.
+    """
+    moved = []
+    for (year,) in conn.execute("SELECT DISTINCT year FROM archived_periods"):
+        old, new = legacy_path(db_path, year), archive_path(db_path, year)
+        if os.path.exists(old) and not os.path.exists(new):
+            os.replace(old, new)
+            moved.append(new)
+    return moved
+
+
+def schema_name(year: str) -> str:
+    return f"arc_{year}"
+
+
+def is_closed(conn: sqlite3.Connection, period: str) -> bool:
+    """
+    Periode "tutup buku": semua invoice PAID (CASH sudah diverifikasi) atau locked,
+    dan tidak ada tarikan CASH yang masih PENDING.
+    """
+    open_inv = conn.execute("""
+      SELECT COUNT(*) FROM invoices
+      WHERE period = ?
+        AND locked = 0
+        AND (status <> 'PAID' OR (method = 'CASH' AND cash_verified = 0))
+    """, (period,)).fetchone()[0]
+    pending = conn.execute(
+        "SELECT COUNT(*) FROM cash_batches WHERE period = ? AND status <> 'APPROVED'",
+        (period,),
+    ).fetchone()[0]
+    return open_inv == 0 and pending == 0
+
+
+def closed_periods(conn: sqlite3.Connection, before: str) -> list[str]:
+    """Periode < `before` yang masih ada di DB utama dan sudah tutup buku."""
+    rows = conn.execute(
+        "SELECT DISTINCT period FROM invoices WHERE period < ? ORDER BY period", (before,)
+    ).fetchall()
+    return [r[0] for r in rows if is_closed(conn, r[0])]
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _sync_archive_schema(conn: sqlite3.Connection, schema: str) -> None:
+    """
+    Tabel arsip = salinan kolom tabel utama (tanpa FK ke customers).
+    Kolom yang ditambah belakangan di DB utama ikut ditambahkan di arsip.
+    """
+    for table in ARCHIVE_TABLES:
+        if not _columns(conn, schema, table):
+            conn.execute(f"CREATE TABLE {schema}.{table} AS SELECT * FROM main.{table} WHERE 0")
+        have = set(_columns(conn, schema, table))
+        for col in _columns(conn, "main", table):
+            if col not in have:
+                conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {col}")
+
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {schema}.ux_invoices_id ON invoices(id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_invoices_period_status ON invoices(period, status)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_invoices_batch ON invoices(cash_batch_id)")
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {schema}.ux_batches_id ON cash_batches(id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_batches_period_date ON cash_batches(period, batch_date)")
+
+
+def archive_period(db_path: str, period: str) -> dict:
+    """
+    Pindahkan satu periode tutup buku ke <stem>_archive_YYYY.db dalam satu transaksi
+    (DB utama + arsip commit bersama, jadi tidak ada baris dobel / hilang).
+    """
+    year = period[:4]
+    schema = schema_name(year)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        ensure_schema(conn)
+        adopt_legacy(conn, db_path)
+        conn.execute("ATTACH DATABASE ? AS " + schema, (archive_path(db_path, year),))
+        _sync_archive_schema(conn, schema)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not is_closed(conn, period):
+                raise ValueError(f"Periode {period} belum tutup buku.")
+
+            moved = {}
+            for table in ARCHIVE_TABLES:
+                cols = ", ".join(_columns(conn, "main", table))
+                cur = conn.execute(
+                    f"INSERT INTO {schema}.{table} ({cols}) SELECT {cols} FROM main.{table} WHERE period = ?",
+                    (period,),
+                )
+                moved[table] = cur.rowcount
+            # invoice dulu (FK cash_batch_id -> cash_batches)
+            conn.execute("DELETE FROM main.invoices WHERE period = ?", (period,))
+            conn.execute("DELETE FROM main.cash_batches WHERE period = ?", (period,))
+            conn.execute("""
+              INSERT OR REPLACE INTO main.archived_periods (period, year, invoices, batches)
+              VALUES (?, ?, ?, ?)
+            """, (period, year, moved["invoices"], moved["cash_batches"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        conn.execute("DETACH DATABASE " + schema)
+        return {"period": period, "year": year, **moved}
+    finally:
+        conn.close()
+
+
+def archive_closed(db_path: str = DB_PATH, before: str | None = None) -> list[dict]:
+    before = before or date.today().strftime("%Y-%m")
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)
+        periods = closed_periods(conn, before)
+    finally:
+        conn.close()
+    return [archive_period(db_path, p) for p in periods]
+
+
+def main(argv):
+    args = argv[1:]
+    db_path = args.pop(0) if args and args[0] not in ("list", "run") else DB_PATH
+    cmd = args[0] if args else "list"
+    if cmd == "list":
+        conn = sqlite3.connect(db_path)
+        try:
+            ensure_schema(conn)
+            for r in conn.execute("SELECT period, year, invoices, batches, archived_at FROM archived_periods ORDER BY period"):
+                print("\t".join(str(x) for x in r) + "\t" + archive_path(db_path, r[1]))
+        finally:
+            conn.close()
+    elif cmd == "run":
+        done = [archive_period(db_path, args[1])] if len(args) > 1 else archive_closed(db_path)
+        for r in done:
+            print(f"Periode {r['period']} -> {archive_path(db_path, r['year'])} "
+                  f"({r['invoices']} invoice, {r['cash_batches']} tarikan)")
+        if not done:
+            print("Tidak ada periode yang bisa diarsip.")
+    else:
+        print("Pakai: python archive.py [DB_PATH] [list | run [PERIOD]]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+import time
+
+CACHE_TTL = 3600     # detik; pengaman kalau ada perubahan periode lama di luar app
+
+# Satu pass di index (customer_id, period, status, amount):
+# paid_after = jumlah PAID dari periode ini sampai periode terakhir (< before).
+# Invoice UNPAID dengan paid_after = 0 -> bagian dari tunggakan berturut-turut terakhir.
+ARREARS_SQL = """
+  WITH w AS (
+    SELECT customer_id, period, status, amount,
+           SUM(status = 'PAID') OVER (
+             PARTITION BY customer_id ORDER BY period
+             ROWS BETWEEN CURRENT ROW AND UNBOUNDED FOLLOWING
+           ) AS paid_after
+    FROM invoices
+    WHERE period < ?
+  )
+  SELECT customer_id,
+         SUM(status = 'UNPAID' AND paid_after = 0)                     AS streak,
+         MIN(CASE WHEN status = 'UNPAID' AND paid_after = 0 THEN period END) AS streak_from,
+         SUM(CASE WHEN status = 'UNPAID' THEN amount ELSE 0 END)       AS outstanding,
+         SUM(status = 'UNPAID')                                        AS unpaid
+  FROM w
+  GROUP BY customer_id
+"""
+
+_cache = {}          # (db_path, before) -> (dibuat, {customer_id: (streak, from, outstanding, unpaid)})
+_cache_lock = threading.Lock()
+
+
+def invalidate():
+    """Panggil kalau invoice periode lama berubah (bayar/undo periode lalu)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def summarize(conn: sqlite3.Connection, before: str) -> dict:
+    """Ringkasan tunggakan semua pelanggan untuk periode < `before`."""
+    return {
+        r[0]: (int(r[1] or 0), r[2], int(r[3] or 0), int(r[4] or 0))
+        for r in conn.execute(ARREARS_SQL, (before,))
+    }
+
+
+def closed_summary(conn: sqlite3.Connection, db_path: str, before: str) -> dict:
+    """summarize() untuk periode yang sudah lewat, di-cache per (db, before)."""
+    key = (db_path, before)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit and time.time() - hit[0] < CACHE_TTL:
+            return hit[1]
+    data = summarize(conn, before)
+    with _cache_lock:
+        _cache[key] = (time.time(), data)
+    return data
+
+
+def arrears(conn: sqlite3.Connection, db_path: str, current: str) -> dict:
+    """
+    Tunggakan s/d periode `current`: bagian periode lama (< current) dari cache,
+    periode berjalan dibaca live lalu digabung.
+    """
+    closed = closed_summary(conn, db_path, current)
+    out = dict(closed)
+    for cid, status, amount in conn.execute(
+        "SELECT customer_id, status, amount FROM invoices WHERE period = ?", (current,)
+    ):
+        streak, since, owed, unpaid = closed.get(cid, (0, None, 0, 0))
+        if status == "UNPAID":
+            out[cid] = (streak + 1, since or current, owed + amount, unpaid + 1)
+        else:
+            out[cid] = (0, None, owed, unpaid)
+    return out
@@ -0,0 +1,77 @@
+"""
+Pembagian wilayah petugas: petugas -> alamat (mis. "winduaji") atau pelanggan
+tertentu, plus urutan rute. Daftar "Belum" petugas cuma menyentuh irisannya.
+Petugas tanpa assignment tetap melihat semua pelanggan (perilaku lama).
+"""
+
+KINDS = ("ADDRESS", "CUSTOMER")
+
+
+def ensure_schema(conn) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS collector_assignments (
+      id          INTEGER PRIMARY KEY AUTOINCREMENT,
+      collector   TEXT NOT NULL,
+      kind        TEXT NOT NULL CHECK(kind IN ('ADDRESS','CUSTOMER')),
+      value       TEXT NOT NULL,                    -- customers.address atau customers.id
+      route_order INTEGER NOT NULL DEFAULT 0,       -- kecil = dikunjungi duluan
+      UNIQUE(collector, kind, value)
+    )
+    """)
+    # UNIQUE di atas sekaligus index lookup per petugas; alamat butuh index di customers
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_address ON customers(address)")
+
+
+# pelanggan milik satu petugas + urutan rute (assignment CUSTOMER menang kalau dobel)
+SLICE_SQL = """
+  SELECT customer_id, MIN(route_order) AS route_order
+  FROM (
+    SELECT a.value AS customer_id, a.route_order
+    FROM collector_assignments a
+    WHERE a.collector = ? AND a.kind = 'CUSTOMER'
+    UNION ALL
+    SELECT c.id, a.route_order
+    FROM collector_assignments a
+    JOIN customers c ON c.address = a.value
+    WHERE a.collector = ? AND a.kind = 'ADDRESS'
+  )
+  GROUP BY customer_id
+"""
+
+
+def has_route(conn, collector: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM collector_assignments WHERE collector = ? LIMIT 1", (collector,)
+    ).fetchone() is not None
+
+
+def add(conn, collector: str, kind: str, value: str, route_order: int = 0) -> None:
+    if kind not in KINDS:
+        raise ValueError(f"Jenis assignment tidak dikenal: {kind}")
+    collector, value = collector.strip(), value.strip()
+    if not collector or not value:
+        raise ValueError("Petugas dan nilai wajib diisi.")
+    conn.execute("""
+      INSERT INTO collector_assignments (collector, kind, value, route_order)
+      VALUES (?, ?, ?, ?)
+      ON CONFLICT(collector, kind, value) DO UPDATE SET route_order = excluded.route_order
+    """, (collector, kind, value, route_order))
+    conn.commit()
+
+
+def remove(conn, assignment_id) -> None:
+    conn.execute("DELETE FROM collector_assignments WHERE id = ?", (assignment_id,))
+    conn.commit()
+
+
+def listing(conn):
+    """Semua assignment + jumlah pelanggan aktif yang tercakup, urut petugas/rute."""
+    return conn.execute("""
+      SELECT a.id, a.collector, a.kind, a.value, a.route_order,
+             CASE a.kind
+               WHEN 'ADDRESS' THEN (SELECT COUNT(*) FROM customers c WHERE c.address = a.value AND c.active = 1)
+               ELSE (SELECT COUNT(*) FROM customers c WHERE c.id = a.value AND c.active = 1)
+             END AS customers
+      FROM collector_assignments a
+      ORDER BY a.collector, a.route_order, a.kind, a.value
+    """).fetchall()
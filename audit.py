@@ -0,0 +1,144 @@
+"""
+Log audit invoice, append-only: siapa bayar / undo / setor / approve / reprice, kapan.
+
+Event ditulis tanpa commit sendiri:
+  - commit(conn, db_path, events) dipanggil di ujung transaksi bisnis (/pay, /undo,
+    setoran, approve) -> event + antrean buffer ikut COMMIT yang sama;
+  - record(db_path, events) untuk aksi yang transaksinya sudah selesai (reprice
+    paket) -> masuk buffer, ditulis batch saat buffer penuh (FLUSH_SIZE), oleh
+    job tiap FLUSH_INTERVAL detik, atau menumpang commit bisnis berikutnya.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+FLUSH_SIZE = 200        # event di buffer sebelum langsung di-flush
+FLUSH_INTERVAL = 5      # detik, job flush di background
+
+KINDS = ("PAY", "UNDO", "BATCH", "APPROVE", "REPRICE")
+
+# kolom invoice untuk from_rows(); tempel di UPDATE invoices ... RETURNING
+RETURNING = " RETURNING id, period, customer_id, method, amount"
+
+_buf = {}               # db_path -> [event, ...]
+_lock = threading.Lock()
+
+
+def ensure_schema(conn) -> None:
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS invoice_events (
+      id          INTEGER PRIMARY KEY,
+      at          TEXT NOT NULL,                      -- waktu aksi (localtime), bukan waktu flush
+      kind        TEXT NOT NULL CHECK(kind IN ('PAY','UNDO','BATCH','APPROVE','REPRICE')),
+      invoice_id  INTEGER NOT NULL,                   -- tanpa FK: log tetap ada walau invoice diarsip
+      period      TEXT NOT NULL,
+      customer_id TEXT NOT NULL,
+      actor       TEXT,                               -- petugas / admin / REKON / import
+      method      TEXT,
+      amount      INTEGER,
+      detail      TEXT                                -- JSON, mis. nilai lama saat UNDO
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_invoice ON invoice_events(invoice_id, id);
+    CREATE INDEX IF NOT EXISTS idx_events_actor_at ON invoice_events(actor, at);
+    CREATE INDEX IF NOT EXISTS idx_events_at ON invoice_events(at);
+
+    CREATE TRIGGER IF NOT EXISTS invoice_events_no_update BEFORE UPDATE ON invoice_events
+    BEGIN SELECT RAISE(ABORT, 'invoice_events append-only'); END;
+    CREATE TRIGGER IF NOT EXISTS invoice_events_no_delete BEFORE DELETE ON invoice_events
+    BEGIN SELECT RAISE(ABORT, 'invoice_events append-only'); END;
+    """)
+
+
+def from_rows(kind: str, rows, actor: str | None, **detail) -> list[tuple]:
+    """Baris (id, period, customer_id, method, amount) dari RETURNING -> event."""
+    at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    extra = json.dumps(detail, separators=(",", ":")) if detail else None
+    return [(at, kind, r[0], r[1], r[2], actor, r[3], r[4], extra) for r in rows]
+
+
+def write(conn, events) -> None:
+    """INSERT batch di transaksi yang sedang berjalan (tanpa commit)."""
+    if events:
+        conn.executemany("""
+          INSERT INTO invoice_events (at, kind, invoice_id, period, customer_id, actor, method, amount, detail)
+          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, events)
+
+
+def _drain(db_path: str) -> list:
+    with _lock:
+        return _buf.pop(db_path, [])
+
+
+def _requeue(db_path: str, events: list) -> None:
+    if events:
+        with _lock:
+            _buf[db_path] = events + _buf.get(db_path, [])
+
+
+def commit(conn, db_path: str, events=()) -> None:
+    """Tulis event aksi ini + antrean buffer, lalu commit transaksi bisnis sekali."""
+    pending = _drain(db_path)
+    try:
+        write(conn, list(events) + pending)
+        conn.commit()
+    except Exception:
+        _requeue(db_path, pending)   # rollback transaksi bisnis urusan pemanggil
+        raise
+
+
+def record(db_path: str, events) -> None:
+    """Write-behind: antre di memori, flush kalau buffer sudah FLUSH_SIZE."""
+    if not events:
+        return
+    with _lock:
+        buf = _buf.setdefault(db_path, [])
+        buf.extend(events)
+        full = len(buf) >= FLUSH_SIZE
+    if full:
+        flush(db_path)
+
+
+def flush(db_path: str) -> int:
+    """Tulis semua event antrean dalam satu transaksi (koneksi sendiri)."""
+    events = _drain(db_path)
+    if not events:
+        return 0
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        write(conn, events)
+        conn.commit()
+    except Exception:
+        _requeue(db_path, events)
+        raise
+    finally:
+        conn.close()
+    return len(events)
+
+
+def pending() -> int:
+    with _lock:
+        return sum(len(v) for v in _buf.values())
+
+
+def lookup(conn, invoice_id=None, actor=None, day=None, before=None, limit: int = 100):
+    """Event terbaru dulu, filter invoice / actor / tanggal; keyset `before` = id terakhir."""
+    where, params = [], []
+    if invoice_id:
+        where.append("invoice_id = ?")
+        params.append(int(invoice_id))
+    if actor:
+        where.append("actor = ?")
+        params.append(actor)
+    if day:
+        d = datetime.strptime(day, "%Y-%m-%d")
+        where.append("at >= ? AND at < ?")
+        params += [d.strftime("%Y-%m-%d"), (d + timedelta(days=1)).strftime("%Y-%m-%d")]
+    if before:
+        where.append("id < ?")
+        params.append(int(before))
+    sql = "SELECT * FROM invoice_events"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql + " ORDER BY id DESC LIMIT ?", (*params, limit)).fetchall()
@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import archive
+from snapshot import copy_online
+
+DB_PATH = "wifi.db"          # ganti bila perlu
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 14             # simpan N backup terakhir
+BACKUP_PAGES = 128           # halaman per langkah
+BACKUP_PAUSE = 0.05          # jeda antar langkah (detik)
+
+LAST_BACKUP = None           # hasil backup terakhir (dipakai app untuk laporan)
+
+# file arsip (<stem>_archive_YYYY.db) dibackup ke archive_YYYY-<waktu>.db di folder
+# yang sama, hanya kalau berubah sejak backup arsip terakhir tahun itu
+TS_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def verify_backup(path: str) -> str:
+    """
+    Cek file backup pakai PRAGMA integrity_check. Return "ok" kalau sehat,
+    selain itu pesan error pertama dari SQLite.
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return rows[0][0] if rows else "kosong"
+
+
+def list_backups(backup_dir: str = BACKUP_DIR) -> list[str]:
+    """File backup urut dari yang paling lama."""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(n for n in os.listdir(backup_dir) if n.startswith("wifi-") and n.endswith(".db"))
+    return [os.path.join(backup_dir, n) for n in names]
+
+
+def _stamp(path: str) -> str:
+    """wifi-20250101-020000.db / archive_2025-20250101-020000.db -> 20250101-020000"""
+    return os.path.basename(path)[:-3][-15:]
+
+
+def list_archive_backups(backup_dir: str = BACKUP_DIR) -> dict[str, list[str]]:
+    """{tahun: [file backup arsip, paling lama dulu]}"""
+    out = {}
+    if not os.path.isdir(backup_dir):
+        return out
+    for n in sorted(os.listdir(backup_dir)):
+        if n.startswith("archive_") and n.endswith(".db") and n[12:13] == "-":
+            out.setdefault(n[8:12], []).append(os.path.join(backup_dir, n))
+    return out
+
+
+def archive_backup_at(backups: list[str], stamp: str) -> str | None:
+    """Backup arsip terakhir yang dibuat sebelum / bersama backup utama `stamp`."""
+    older = [p for p in backups if _stamp(p) <= stamp]
+    return older[-1] if older else None
+
+
+def rotate(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP) -> list[str]:
+    """
+    Hapus backup utama lama, lalu backup arsip yang tidak lagi dibutuhkan
+    backup utama yang tersisa (yang terbaru per tahun selalu disimpan).
+    """
+    files = list_backups(backup_dir)
+    removed = files[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    stamps = [_stamp(p) for p in list_backups(backup_dir)]
+    for backups in list_archive_backups(backup_dir).values():
+        needed = {backups[-1]} | {archive_backup_at(backups, st) for st in stamps}
+        for path in backups:
+            if path not in needed:
+                os.remove(path)
+                removed.append(path)
+    return removed
+
+
+def _copy_verified(src: sqlite3.Connection, path: str) -> dict:
+    """copy_online ke path.tmp, integrity_check, baru rename ke path."""
+    tmp = path + ".tmp"
+    dst = sqlite3.connect(tmp)
+    try:
+        stats = copy_online(src, dst, pages=BACKUP_PAGES, pause=BACKUP_PAUSE)
+    finally:
+        dst.close()
+    check = verify_backup(tmp)
+    if check != "ok":
+        os.remove(tmp)
+        raise RuntimeError(f"Backup {os.path.basename(path)} rusak: {check}")
+    os.replace(tmp, path)
+    return stats
+
+
+def _archive_years(conn: sqlite3.Connection) -> list[str]:
+    try:
+        return [r[0] for r in conn.execute("SELECT DISTINCT year FROM archived_periods ORDER BY year")]
+    except sqlite3.OperationalError:
+        return []      # DB belum pernah diarsip (tabel belum ada)
+
+
+def _changed_since(path: str, backup: str | None) -> bool:
+    if backup is None:
+        return True
+    mtime = max(os.path.getmtime(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return mtime >= os.path.getmtime(backup)
+
+
+def backup_archives(db_path: str, backup_dir: str, stamp: str, years: list[str]) -> list[str]:
+    """Backup file arsip tahun `years` yang baru / berubah. Return file backup baru."""
+    have = list_archive_backups(backup_dir)
+    done = []
+    for year in years:
+        path = archive.archive_path(db_path, year)
+        if not os.path.exists(path):
+            continue
+        backups = have.get(year, [])
+        if not _changed_since(path, backups[-1] if backups else None):
+            continue
+        out = os.path.join(backup_dir, f"archive_{year}-{stamp}.db")
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            _copy_verified(src, out)
+        finally:
+            src.close()
+        done.append(out)
+    return done
+
+
+def backup_once(db_path: str = DB_PATH, backup_dir: str = BACKUP_DIR,
+                keep: int = BACKUP_KEEP) -> dict:
+    """
+    Backup online: salin bertahap ke file .tmp, verifikasi, baru di-rename.
+    File yang gagal integrity_check tidak pernah jadi backup "resmi".
+    Sesudah DB utama, file arsip yang baru / berubah ikut dibackup (waktu sama),
+    jadi satu backup utama + arsip terakhir per tahun = satu titik restore utuh.
+    """
+    global LAST_BACKUP
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime(TS_FORMAT)
+    path = os.path.join(backup_dir, f"wifi-{stamp}.db")
+
+    t0 = time.perf_counter()
+    src = sqlite3.connect(db_path)
+    try:
+        stats = _copy_verified(src, path)
+        years = _archive_years(src)
+    finally:
+        src.close()
+    archives = backup_archives(db_path, backup_dir, stamp, years)
+
+    result = {
+        "file": path,
+        "bytes": os.path.getsize(path),
+        "pages": stats["pages"],
+        "steps": stats["steps"],
+        "restarts": stats["restarts"],
+        "fallback": stats["fallback"],
+        "lock_total_ms": round(stats["lock_total"] * 1000, 1),
+        "lock_max_ms": round(stats["lock_max"] * 1000, 1),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "integrity": "ok",
+        "archives": archives,
+        "rotated": rotate(backup_dir, keep),
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    LAST_BACKUP = result
+    return result
+
+
+def _restore_file(backup_path: str, path: str) -> None:
+    src = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def restore(backup_path: str, db_path: str = DB_PATH) -> dict:
+    """
+    Tulis ulang db_path dari file backup (setelah diverifikasi), berikut file
+    arsip per tahun dari backup arsip terakhir sebelum / bersama backup itu.
+    File arsip yang belum ada waktu backup dibuat disisihkan ke .pre-restore
+    (bukan dihapus), supaya periode yang kembali ke DB utama tidak dobel.
+    Restore butuh lock tulis penuh di db_path; jalankan saat app sepi/mati.
+    """
+    backup_dir = os.path.dirname(backup_path)
+    stamp = _stamp(backup_path)
+    conn = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+    try:
+        years = _archive_years(conn)
+    finally:
+        conn.close()
+    have = list_archive_backups(backup_dir)
+    plan = {}
+    for year in years:
+        src = archive_backup_at(have.get(year, []), stamp)
+        if src is None:
+            raise RuntimeError(f"Backup arsip {year} untuk {os.path.basename(backup_path)} tidak ada.")
+        plan[year] = src
+    for path in [backup_path, *plan.values()]:
+        check = verify_backup(path)
+        if check != "ok":
+            raise RuntimeError(f"Backup {path} rusak: {check}")
+
+    t0 = time.perf_counter()
+    _restore_file(backup_path, db_path)
+    for year, src in plan.items():
+        _restore_file(src, archive.archive_path(db_path, year))
+    aside = []
+    for year in have:
+        path = archive.archive_path(db_path, year)
+        if year not in plan and os.path.exists(path):
+            os.replace(path, path + ".pre-restore")
+            aside.append(path + ".pre-restore")
+    return {"file": backup_path, "archives": list(plan.values()), "aside": aside,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+def main(argv):
+    cmd = argv[1] if len(argv) > 1 else "now"
+    if cmd == "now":
+        r = backup_once()
+        print(f"Backup {r['file']} ({r['bytes']} byte, {r['pages']} halaman, {r['steps']} langkah)")
+        print(f"Lock: total {r['lock_total_ms']} ms, max {r['lock_max_ms']} ms, durasi {r['elapsed_ms']} ms")
+        if r["restarts"]:
+            print(f"Diulang {r['restarts']}x karena ada commit" + (", lalu disalin sekali jalan" if r["fallback"] else ""))
+        for path in r["archives"]:
+            print(f"Backup arsip: {path}")
+        for path in r["rotated"]:
+            print(f"Hapus backup lama: {path}")
+    elif cmd == "list":
+        for path in list_backups():
+            print(f"{path}\t{os.path.getsize(path)}")
+        for backups in list_archive_backups().values():
+            for path in backups:
+                print(f"{path}\t{os.path.getsize(path)}")
+    elif cmd == "verify" and len(argv) > 2:
+        print(verify_backup(argv[2]))
+    elif cmd == "restore" and len(argv) > 2:
+        r = restore(argv[2])
+        print(f"Restore dari {r['file']} selesai ({r['elapsed_ms']} ms).")
+        for path in r["archives"]:
+            print(f"Arsip dari {path}")
+        for path in r["aside"]:
+            print(f"Arsip yang lebih baru disisihkan: {path}")
+    else:
+        print("Pakai: python backup.py [now | list | verify FILE | restore FILE]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
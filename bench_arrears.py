@@ -0,0 +1,92 @@
+"""
+Benchmark laporan tunggakan.
+
+    python bench_arrears.py [CUSTOMERS] [PERIODS]     # default 100000 x 36
+
+Membuat DB sementara, isi invoice acak (sebagian pelanggan menunggak
+beberapa bulan terakhir), lalu ukur: query penuh (cold), query penuh kedua,
+dan arrears() dengan periode lama dari cache + periode berjalan live.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import arrears
+from bench_common import SCHEMA
+
+
+def periods(n):
+    y, m = 2023, 1
+    out = []
+    for _ in range(n):
+        out.append(f"{y:04d}-{m:02d}")
+        m += 1
+        if m > 12:
+            y, m = y + 1, 1
+    return out
+
+
+def build(path, n_cust, n_per):
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO customers VALUES (?,?,?,?,1)",
+        ((str(i), f"Pelanggan {i}", "winduaji", 150000) for i in range(1, n_cust + 1)),
+    )
+    pers = periods(n_per)
+    for i in range(1, n_cust + 1):
+        # ~10% pelanggan berhenti bayar di suatu titik, sisanya sesekali telat
+        stop = rnd.randrange(n_per) if rnd.random() < 0.1 else n_per
+        conn.executemany(
+            "INSERT INTO invoices(period, customer_id, amount, status) VALUES (?,?,?,?)",
+            ((p, str(i), 150000,
+              "UNPAID" if (k >= stop or rnd.random() < 0.03) else "PAID")
+             for k, p in enumerate(pers)),
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return pers
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    print(f"{label:<40} {(time.perf_counter() - t0) * 1000:10.1f} ms")
+    return out
+
+
+def main(argv):
+    n_cust = int(argv[1]) if len(argv) > 1 else 100000
+    n_per = int(argv[2]) if len(argv) > 2 else 36
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        pers = timed(f"build {n_cust} x {n_per}", lambda: build(path, n_cust, n_per))
+        current = pers[-1]
+        conn = sqlite3.connect(path)
+
+        print("plan:")
+        for r in conn.execute("EXPLAIN QUERY PLAN " + arrears.ARREARS_SQL, (current,)):
+            print("   ", r[-1])
+
+        timed("summarize semua periode (cold)", lambda: arrears.summarize(conn, "9999-99"))
+        timed("summarize semua periode (warm)", lambda: arrears.summarize(conn, "9999-99"))
+        arrears.invalidate()
+        timed("arrears() cache kosong", lambda: arrears.arrears(conn, path, current))
+        data = timed("arrears() periode lama dari cache", lambda: arrears.arrears(conn, path, current))
+
+        late = sum(1 for v in data.values() if v[0] >= 3)
+        print(f"pelanggan nunggak >= 3 bulan: {late}")
+        conn.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,18 @@
+"""
+Bagian bersama skrip benchmark (bench_*.py): schema minimal customers + invoices
+yang cocok dengan tabel di app.py (tanpa tabel lain yang tidak diukur).
+"""
+
+SCHEMA = """
+CREATE TABLE customers (id TEXT PRIMARY KEY, name TEXT NOT NULL, address TEXT,
+                        monthly_fee INTEGER NOT NULL, active INTEGER NOT NULL DEFAULT 1);
+CREATE TABLE invoices (
+  id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT NOT NULL, customer_id TEXT NOT NULL,
+  amount INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'UNPAID', method TEXT, paid_at TEXT,
+  collector TEXT, cash_verified INTEGER NOT NULL DEFAULT 0, cash_batch_id INTEGER,
+  locked INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE(period, customer_id)
+);
+CREATE INDEX idx_invoices_period_status ON invoices(period, status);
+CREATE INDEX idx_invoices_customer_period ON invoices(customer_id, period, status, amount);
+"""
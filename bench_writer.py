@@ -0,0 +1,107 @@
+"""
+Benchmark tandai bayar: commit per tap vs group commit (writer.GroupWriter).
+
+    python bench_writer.py [COLLECTORS] [PAYS_PER_COLLECTOR]     # default 12 x 200
+
+Membuat DB sementara (schema invoice + invoice_events), lalu COLLECTORS thread
+menandai lunas bersamaan, masing-masing PAYS_PER_COLLECTOR invoice:
+  - langsung: tiap tap UPDATE + audit + COMMIT sendiri (seperti exec1 dulu)
+  - group:    tap dikirim ke satu thread penulis, digabung per WINDOW
+Output: bayar/detik, commit/detik, rata-rata tap per commit.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import audit
+import writer
+from bench_common import SCHEMA
+
+PAY_SQL = """
+  UPDATE invoices
+  SET status='PAID', method='CASH', paid_at=datetime('now','localtime'),
+      collector=?, cash_verified=0, locked=0
+  WHERE period=? AND customer_id=? AND status='UNPAID' AND locked=0
+"""
+PERIOD = "2025-01"
+
+
+def build(path, n):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    audit.ensure_schema(conn)
+    conn.executemany("INSERT INTO customers VALUES (?,?,?,?,1)",
+                     ((str(i), f"Pelanggan {i}", "", 150000) for i in range(n)))
+    conn.executemany("INSERT INTO invoices(period, customer_id, amount) VALUES (?,?,?)",
+                     ((PERIOD, str(i), 150000) for i in range(n)))
+    conn.commit()
+    conn.close()
+
+
+def pay(conn, collector, customer_id):
+    rows = conn.execute(PAY_SQL + audit.RETURNING, (collector, PERIOD, customer_id)).fetchall()
+    if len(rows) != 1:
+        return False
+    audit.write(conn, audit.from_rows("PAY", rows, collector))
+    return True
+
+
+def run(n_coll, worker):
+    """worker(k) -> jumlah sukses; return (detik, sukses)."""
+    ok = [0] * n_coll
+    threads = [threading.Thread(target=lambda k=k: ok.__setitem__(k, worker(k))) for k in range(n_coll)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, sum(ok)
+
+
+def report(label, secs, ok, commits):
+    print(f"{label:<10} {ok:6d} bayar {secs:7.2f} s  {ok / secs:8.1f} bayar/s  "
+          f"{commits / secs:8.1f} commit/s  {ok / commits if commits else 0:5.1f} bayar/commit")
+
+
+def main(argv):
+    n_coll = int(argv[1]) if len(argv) > 1 else 12
+    per = int(argv[2]) if len(argv) > 2 else 200
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        build(path, n_coll * per * 2)
+
+        # 1) langsung: satu koneksi per petugas, commit per tap
+        def direct(k):
+            conn = sqlite3.connect(path, timeout=60)
+            n = 0
+            for i in range(per):
+                n += pay(conn, f"p{k}", str(k * per + i))
+                conn.commit()
+            conn.close()
+            return n
+        secs, ok = run(n_coll, direct)
+        report("langsung", secs, ok, ok)
+
+        # 2) group commit: bagian invoice kedua, lewat satu penulis
+        w = writer.GroupWriter(path)
+        base = n_coll * per
+        def grouped(k):
+            return sum(bool(w.submit(pay, f"p{k}", str(base + k * per + i))) for i in range(per))
+        secs, ok = run(n_coll, grouped)
+        st = w.stats()
+        report("group", secs, ok, st["commits"])
+        print(f"batch terbesar: {st['max_batch']}, job gagal: {st['failed']}")
+
+        # tap ulang invoice yang sudah lunas tetap dapat hasil sendiri (False)
+        assert w.submit(pay, "p0", str(base)) is False
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
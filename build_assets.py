@@ -0,0 +1,98 @@
+"""
+Build CSS Tailwind sekali (bukan JIT di browser tiap buka halaman).
+
+    python build_assets.py            # butuh binary tailwindcss (standalone CLI)
+
+Class di-scan dari template di app.py, hasil minify ditulis ke
+assets/app.<hash>.css + .gz (+ .br kalau modul brotli ada), lalu
+assets/manifest.json memetakan "app.css" -> nama ber-hash untuk asset_url().
+"""
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # opsional; tanpa brotli cukup .gz
+    brotli = None
+
+TAILWIND_BIN = os.environ.get("TAILWIND_BIN", "tailwindcss")
+ASSET_DIR = "assets"
+SOURCES = ["app.py"]          # semua template (PETUGAS_HTML, ADMIN_HTML, ...) ada di sini
+
+INPUT_CSS = """
+@tailwind base;
+@tailwind components;
+@tailwind utilities;
+"""
+
+# dipakai template lewat class; kalau tidak disebut, tailwind membuangnya
+CONFIG_JS = """
+module.exports = {
+  content: %s,
+  theme: { extend: {} },
+  plugins: [],
+};
+"""
+
+
+def build_css(sources) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "input.css")
+        cfg = os.path.join(tmp, "tailwind.config.js")
+        out = os.path.join(tmp, "app.css")
+        with open(src, "w") as f:
+            f.write(INPUT_CSS)
+        with open(cfg, "w") as f:
+            f.write(CONFIG_JS % json.dumps([os.path.abspath(s) for s in sources]))
+        subprocess.run([TAILWIND_BIN, "-c", cfg, "-i", src, "-o", out, "--minify"], check=True)
+        with open(out, "rb") as f:
+            return f.read()
+
+
+def write_variants(path: str, data: bytes) -> list[str]:
+    """File asli + pre-compressed (.gz / .br), ditulis atomik."""
+    variants = [(path, data), (path + ".gz", gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((path + ".br", brotli.compress(data, quality=11)))
+    for p, body in variants:
+        tmp = p + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, p)
+    return [p for p, _ in variants]
+
+
+def prune(asset_dir: str, keep: set[str]) -> None:
+    """Hapus hasil build lama (nama ber-hash yang tidak dipakai manifest)."""
+    for name in os.listdir(asset_dir):
+        if name.startswith("app.") and ".css" in name and name.split(".css")[0] + ".css" not in keep:
+            os.remove(os.path.join(asset_dir, name))
+
+
+def main(argv) -> int:
+    asset_dir = argv[1] if len(argv) > 1 else ASSET_DIR
+    os.makedirs(asset_dir, exist_ok=True)
+
+    css = build_css(SOURCES)
+    name = f"app.{hashlib.sha256(css).hexdigest()[:12]}.css"
+    files = write_variants(os.path.join(asset_dir, name), css)
+
+    manifest = {"app.css": name}
+    tmp = os.path.join(asset_dir, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(asset_dir, "manifest.json"))
+    prune(asset_dir, set(manifest.values()))
+
+    for p in files:
+        print(f"{p:<50} {os.path.getsize(p):>8} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
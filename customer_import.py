@@ -0,0 +1,238 @@
+"""
+Import / update pelanggan massal dari CSV.
+
+    python customer_import.py FILE.csv [DB_PATH]
+
+Baris dibaca satu per satu, divalidasi di Python sesuai CHECK tabel customers,
+lalu ditulis per potongan CHUNK baris (executemany, satu transaksi per potongan).
+Kolom kosong = nilai lama dipertahankan (untuk pelanggan yang sudah ada).
+Tarif / paket yang berubah ikut memperbarui invoice UNPAID mulai periode berjalan.
+Baris yang salah dicatat (nomor baris + alasan) tanpa menggagalkan seluruh file.
+"""
+import csv
+import json
+import sqlite3
+import sys
+from datetime import date
+
+import audit
+import plans
+import reports
+from reconcile import parse_amount
+
+CHUNK = 500
+MAX_ERRORS = 1000      # error yang disimpan untuk laporan (hitungan tetap semua)
+
+_COLS = {
+    "id": ("id", "customer_id", "kode", "no pelanggan"),
+    "name": ("nama", "name", "username", "user"),
+    "address": ("alamat", "address"),
+    "monthly_fee": ("tarif", "iuran", "monthly_fee", "fee", "biaya"),
+    "active": ("aktif", "active", "status"),
+    "plan": ("paket", "plan"),
+}
+_ACTIVE = {
+    "1": 1, "ya": 1, "y": 1, "aktif": 1, "true": 1, "on": 1,
+    "0": 0, "tidak": 0, "t": 0, "n": 0, "nonaktif": 0, "false": 0, "off": 0,
+}
+
+
+def _columns(header):
+    names = [h.strip().lower() for h in header]
+    out = {}
+    for key, wants in _COLS.items():
+        for want in wants:
+            if want in names:
+                out[key] = names.index(want)
+                break
+    if "id" not in out:
+        raise ValueError("Kolom id pelanggan tidak ditemukan di header CSV.")
+    if len(out) == 1:
+        raise ValueError("Tidak ada kolom yang bisa diupdate (nama / alamat / tarif / aktif / paket).")
+    return out
+
+
+def parse_row(row, cols):
+    """Baris CSV -> dict (None = kosong / tidak diubah). ValueError kalau melanggar aturan tabel."""
+    def cell(key):
+        i = cols.get(key)
+        if i is None or i >= len(row):
+            return None
+        v = row[i].strip()
+        return v or None
+
+    cid = cell("id")
+    if not cid:
+        raise ValueError("id kosong")
+    out = {"id": cid, "name": cell("name"), "address": cell("address"), "monthly_fee": None,
+           "active": None, "plan": cell("plan")}
+
+    fee = cell("monthly_fee")
+    if fee is not None:
+        out["monthly_fee"] = parse_amount(fee)
+        if out["monthly_fee"] is None:
+            raise ValueError(f"tarif tidak valid: {fee!r}")
+        if out["monthly_fee"] < 0:
+            raise ValueError("tarif tidak boleh negatif")
+
+    active = cell("active")
+    if active is not None:
+        if active.lower() not in _ACTIVE:
+            raise ValueError(f"aktif harus 1/0 (ya/tidak): {active!r}")
+        out["active"] = _ACTIVE[active.lower()]
+    return out
+
+
+INSERT_SQL = """
+  INSERT INTO customers (id, name, address, monthly_fee, active, plan)
+  VALUES (:id, :name, :address, COALESCE(:monthly_fee, 0), COALESCE(:active, 1), :plan)
+"""
+
+UPDATE_SQL = """
+  UPDATE customers SET
+    name        = COALESCE(:name, name),
+    address     = COALESCE(:address, address),
+    monthly_fee = COALESCE(:monthly_fee, monthly_fee),
+    active      = COALESCE(:active, active),
+    plan        = COALESCE(:plan, plan)
+  WHERE id = :id
+"""
+
+def _flush(conn, batch, period, result, names, known_plans):
+    """Tulis satu potongan: cek id/nama yang sudah ada, lalu INSERT baru + UPDATE lama."""
+    ids = json.dumps([r["id"] for _, r in batch])
+    existing = {cid: (fee, plan, nm) for cid, fee, plan, nm in conn.execute(
+        "SELECT id, monthly_fee, plan, name FROM customers WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+    )}
+    want_names = json.dumps([r["name"] for _, r in batch if r["name"]])
+    owners = dict(conn.execute(
+        "SELECT name, id FROM customers WHERE name IN (SELECT value FROM json_each(?))", (want_names,)
+    ))
+
+    ops = []            # (line, sql, row, tarif berubah?) urut sesuai file
+    renamed = set()     # nama lama ada di laporan beku
+    for line, r in batch:
+        cid, name = r["id"], r["name"]
+        # nama unik (ux_customers_name dari sinkron.py): pemilik di DB atau di file ini
+        owner = (names.get(name) or owners.get(name)) if name else None
+        if owner and owner != cid:
+            _error(result, line, f"nama {name!r} sudah dipakai id {owner}")
+            continue
+        if r["plan"] is not None and r["plan"] not in known_plans:
+            _error(result, line, f"paket {r['plan']!r} tidak ada")
+            continue
+        if cid in existing:
+            fee, plan, old_name = existing[cid]
+            if name and name != old_name:
+                renamed.add(cid)
+            changed = (r["monthly_fee"] is not None and r["monthly_fee"] != fee) or \
+                      (r["plan"] is not None and r["plan"] != plan)
+            ops.append((line, UPDATE_SQL, r, changed))
+        else:
+            if not name or (r["monthly_fee"] is None and r["plan"] is None):
+                _error(result, line, "pelanggan baru wajib punya nama dan tarif / paket")
+                continue
+            ops.append((line, INSERT_SQL, r, False))
+        if name:
+            names[name] = cid
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        try:
+            conn.execute("SAVEPOINT chunk")
+            conn.executemany(INSERT_SQL, [r for _, sql, r, _ in ops if sql is INSERT_SQL])
+            conn.executemany(UPDATE_SQL, [r for _, sql, r, _ in ops if sql is UPDATE_SQL])
+            done = ops
+        except sqlite3.IntegrityError:
+            # ada baris yang melanggar constraint: ulang satu per satu, sisanya tetap masuk
+            conn.execute("ROLLBACK TO chunk")
+            done = []
+            for op in ops:
+                line, sql, r, _ = op
+                try:
+                    conn.execute(sql, r)
+                    done.append(op)
+                except sqlite3.IntegrityError as e:
+                    _error(result, line, f"ditolak database: {e}")
+        conn.execute("RELEASE chunk")
+        changed = [r["id"] for _, _, r, ch in done if ch]
+        repriced = plans.reprice(conn, period, customer_ids=changed) if changed else []
+        audit.write(conn, audit.from_rows("REPRICE", repriced, "import"))
+        reports.drop(conn, (r[1] for r in repriced))
+        reports.drop_customers(conn, {r["id"] for _, sql, r, _ in done if r["id"] in renamed})
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    result["inserted"] += sum(1 for _, sql, _, _ in done if sql is INSERT_SQL)
+    result["updated"] += sum(1 for _, sql, _, _ in done if sql is UPDATE_SQL)
+    result["invoices_repriced"] += len(repriced)
+
+
+def _error(result, line, msg):
+    result["error_count"] += 1
+    if len(result["errors"]) < MAX_ERRORS:
+        result["errors"].append((line, msg))
+
+
+def import_csv(conn, lines, period: str | None = None, chunk: int = CHUNK) -> dict:
+    """
+    Import CSV pelanggan. conn harus autocommit (isolation_level=None) karena
+    transaksi per potongan diatur sendiri. Return ringkasan + daftar error per baris.
+    """
+    period = period or date.today().strftime("%Y-%m")
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise ValueError("File CSV kosong.")
+    cols = _columns(header)
+    known_plans = {r[0] for r in conn.execute("SELECT DISTINCT name FROM plans")} if "plan" in cols else set()
+
+    result = {"rows": 0, "inserted": 0, "updated": 0, "invoices_repriced": 0, "error_count": 0, "errors": []}
+    names = {}          # nama -> id yang sudah dipakai di file ini
+    seen = set()
+    batch = []
+    for line, row in enumerate(reader, start=2):
+        if not any(c.strip() for c in row):
+            continue
+        result["rows"] += 1
+        try:
+            r = parse_row(row, cols)
+        except ValueError as e:
+            _error(result, line, str(e))
+            continue
+        if r["id"] in seen:
+            _error(result, line, f"id {r['id']} muncul dua kali di file")
+            continue
+        seen.add(r["id"])
+        batch.append((line, r))
+        if len(batch) >= chunk:
+            _flush(conn, batch, period, result, names, known_plans)
+            batch = []
+    if batch:
+        _flush(conn, batch, period, result, names, known_plans)
+    result["errors"].sort()
+    return result
+
+
+def main(argv) -> int:
+    if len(argv) < 2:
+        print(__doc__.strip())
+        return 2
+    db_path = argv[2] if len(argv) > 2 else "wifi.db"
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        with open(argv[1], newline="", encoding="utf-8-sig") as f:
+            r = import_csv(conn, f)
+    finally:
+        conn.close()
+    print(f"{r['rows']} baris: {r['inserted']} baru, {r['updated']} diupdate, "
+          f"{r['invoices_repriced']} invoice ikut tarif baru, {r['error_count']} error")
+    for line, msg in r["errors"]:
+        print(f"  baris {line}: {msg}")
+    return 1 if r["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,82 @@
+"""
+Struk ESC/POS mentah untuk printer thermal 58mm (font A = 32 karakter/baris).
+Byte-nya bisa langsung dikirim ke printer Bluetooth (mis. lewat RawBT)
+tanpa render HTML di browser.
+"""
+
+WIDTH = 32
+
+ESC = b"\x1b"
+GS = b"\x1d"
+
+INIT = ESC + b"@"
+LEFT = ESC + b"a\x00"
+CENTER = ESC + b"a\x01"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+BIG = GS + b"!\x11"          # tinggi & lebar x2
+NORMAL = GS + b"!\x00"
+RULE = b"-" * WIDTH + b"\n"
+CUT = ESC + b"d\x04" + GS + b"V\x41\x00"   # feed 4 baris + partial cut (diabaikan printer tanpa cutter)
+
+
+def text(s) -> bytes:
+    # printer murah cuma aman dengan ASCII; karakter lain jadi "?"
+    return str(s if s is not None else "-").encode("ascii", "replace")
+
+
+# layout tetap dihitung sekali saat import
+HEADER = (
+    CENTER + BOLD_ON + BIG + b"WIFI BULANAN\n" + NORMAL + BOLD_OFF
+    + b"PEMBAYARAN\n" + LEFT + RULE
+)
+FOOTER = CENTER + b"Terima kasih\n"
+
+
+def field(label: str, value) -> bytes:
+    """'Label   : nilai' dibungkus ke lebar kertas."""
+    prefix = f"{label:<8}: "
+    value = text(value)
+    room = WIDTH - len(prefix)
+    out = prefix.encode("ascii") + value[:room] + b"\n"
+    for i in range(room, len(value), room):
+        out += b" " * len(prefix) + value[i:i + room] + b"\n"
+    return out
+
+
+def qr(data: str, size: int = 5) -> bytes:
+    """QR model 2 (GS ( k), error correction M."""
+    payload = data.encode("ascii", "replace")
+    n = len(payload) + 3
+    return (
+        CENTER
+        + GS + b"(k\x04\x00\x31\x41\x32\x00"                 # model 2
+        + GS + b"(k\x03\x00\x31\x43" + bytes([size])         # ukuran modul
+        + GS + b"(k\x03\x00\x31\x45\x31"                     # ECC M
+        + GS + b"(k" + bytes([n % 256, n // 256]) + b"\x31\x50\x30" + payload
+        + GS + b"(k\x03\x00\x31\x51\x30"                     # print
+        + b"\n" + LEFT
+    )
+
+
+def receipt(inv, amount: str, qr_payload: str | None = None) -> bytes:
+    """Satu struk (tanpa INIT, supaya bisa digabung dalam satu job)."""
+    out = (
+        HEADER
+        + field("Periode", inv["period"])
+        + field("ID/Nama", f"{inv['customer_id']} - {inv['name']}")
+        + field("Metode", inv["method"])
+        + field("Waktu", inv["paid_at"])
+        + field("Petugas", inv["collector"] or "-")
+        + RULE
+        + BOLD_ON + BIG + CENTER + text(amount) + b"\n" + NORMAL + BOLD_OFF + LEFT
+        + RULE
+    )
+    if qr_payload:
+        out += qr(qr_payload)
+    return out + FOOTER + CUT
+
+
+def job(parts) -> bytes:
+    """Gabung beberapa struk jadi satu byte stream siap kirim ke printer."""
+    return INIT + b"".join(parts)
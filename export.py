@@ -0,0 +1,140 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+FLUSH_ROWS = 500   # baris per potongan yang dikirim ke client
+
+# karakter kontrol tidak boleh ada di XML
+_XML_BAD = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def csv_stream(header, rows):
+    """
+    Generator byte CSV (UTF-8 + BOM supaya Excel baca benar).
+    `rows` boleh cursor SQLite: dibaca satu per satu, memori tetap kecil.
+    """
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")
+    w.writerow(header)
+    yield buf.getvalue().encode("utf-8")
+
+    n = 0
+    buf.seek(0)
+    buf.truncate()
+    for row in rows:
+        w.writerow(tuple(row))
+        n += 1
+        if n % FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _Sink:
+    """File-like tanpa seek: zipfile otomatis pakai data descriptor (streaming)."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(v):
+    if v is None:
+        return "<c/>"
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return f"<c><v>{v}</v></c>"
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_BAD.sub("", str(v)))}</t></is></c>'
+
+
+def _xml_row(values):
+    return "<row>" + "".join(_cell(v) for v in values) + "</row>"
+
+
+def xlsx_stream(sheet, header, rows):
+    """
+    Generator byte XLSX minimal (inline string, tanpa style).
+    Sheet ditulis baris demi baris ke entri zip yang di-deflate on the fly,
+    jadi byte pertama langsung keluar dan memori tidak ikut jumlah baris.
+    """
+    sink = _Sink()
+    zf = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+
+    for name, body in _XLSX_STATIC.items():
+        zf.writestr(name, body)
+    zf.writestr("xl/workbook.xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ))
+    yield sink.drain()
+
+    with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as f:
+        f.write((
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            + _xml_row(header)
+        ).encode("utf-8"))
+        n = 0
+        for row in rows:
+            f.write(_xml_row(tuple(row)).encode("utf-8"))
+            n += 1
+            if n % FLUSH_ROWS == 0:
+                yield sink.drain()
+        f.write(b"</sheetData></worksheet>")
+    zf.close()
+    yield sink.drain()
+
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+def stream(fmt, sheet, header, rows):
+    if fmt == "xlsx":
+        return xlsx_stream(sheet, header, rows)
+    return csv_stream(header, rows)
@@ -0,0 +1,14 @@
+# Konfigurasi gunicorn (dipakai CMD di Dockerfile).
+# Worker baru menjalankan warmup() dulu sebelum accept koneksi, jadi tunnel
+# Cloudflare tidak pernah diarahkan ke worker yang masih dingin.
+bind = "0.0.0.0:5500"
+worker_class = "eventlet"  # Flask-SocketIO paling aman pakai eventlet
+workers = 1                # SQLite + cache in-process: satu worker
+
+
+def post_worker_init(worker):
+    import app  # modul yang sama dengan yang sudah di-load worker
+
+    st = app.warmup()
+    worker.log.info("worker %s siap dalam %.1f ms (import %.1f ms)",
+                    worker.pid, st["total_ms"], st["import_ms"] or 0)
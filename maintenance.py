@@ -0,0 +1,278 @@
+"""
+Perawatan DB terjadwal di jam sepi: statistik planner, kembalikan halaman
+kosong (freelist), checkpoint WAL. Tiap putaran dibatasi BUDGET detik.
+
+    python maintenance.py [DB_PATH] [stats | run [--force] | convert]
+      --force: abaikan jam sepi
+      convert: sekali saja, VACUUM penuh ke auto_vacuum INCREMENTAL (lock eksklusif)
+
+Urutan satu putaran (langkah berikutnya dilewati kalau budget habis):
+  1. ANALYZE dengan PRAGMA analysis_limit (sqlite_stat1 untuk query planner)
+  2. incremental_vacuum per VACUUM_STEP halaman dengan jeda, jadi /pay tetap
+     dapat giliran. DB lama (auto_vacuum NONE) dilewati: konversinya VACUUM penuh
+     yang mengunci seluruh DB dan tidak bisa dipotong budget, jadi hanya lewat
+     perintah `convert` oleh admin
+  3. wal_checkpoint(TRUNCATE), hanya kalau journal_mode = wal
+
+Statistik halaman sebelum & sesudah (page_count, freelist, fragmentasi) disimpan
+ke tabel maintenance_runs. Putaran yang belum tuntas (budget habis) diulang di
+pengecekan berikutnya selama masih jam sepi.
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = "wifi.db"
+QUIET_HOURS = (1, 5)   # jam mulai (inklusif) - selesai (eksklusif), boleh lewat tengah malam mis. (23, 4)
+BUDGET = 60            # detik maksimal satu putaran
+MIN_GAP = 12 * 3600    # detik: putaran tuntas tidak diulang sebelum ini
+ANALYSIS_LIMIT = 1000  # baris per index yang dibaca ANALYZE
+VACUUM_STEP = 256      # halaman per PRAGMA incremental_vacuum (satu transaksi)
+VACUUM_PAUSE = 0.05    # jeda antar langkah (detik)
+
+LAST = {}              # db_path -> hasil putaran terakhir (dibaca /admin/maintenance)
+_lock = threading.Lock()
+
+AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+
+# byte kosong di halaman b-tree + halaman leaf yang tidak bersebelahan dengan
+# leaf sebelumnya di index/tabel yang sama (urut path = urutan scan)
+FRAG_SQL = """
+  SELECT COUNT(*), SUM(unused), SUM(pgsize),
+         SUM(pagetype = 'leaf' AND prev IS NOT NULL AND pageno <> prev + 1),
+         SUM(pagetype = 'leaf')
+  FROM (SELECT pageno, pagetype, unused, pgsize,
+               LAG(pageno) OVER (PARTITION BY name, pagetype ORDER BY path) AS prev
+        FROM dbstat)
+"""
+
+
+def ensure_schema(conn) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+      id          INTEGER PRIMARY KEY AUTOINCREMENT,
+      started_at  TEXT NOT NULL,
+      elapsed_ms  REAL NOT NULL,
+      forced      INTEGER NOT NULL DEFAULT 0,
+      complete    INTEGER NOT NULL,
+      before      TEXT NOT NULL,     -- JSON page_stats
+      after       TEXT NOT NULL,     -- JSON page_stats
+      steps       TEXT NOT NULL      -- JSON [{step, ms, ...}]
+    )
+    """)
+
+
+def page_stats(conn, deep: bool = True) -> dict:
+    """Jumlah halaman + freelist; deep=True ikut hitung fragmentasi lewat dbstat (scan seluruh file)."""
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    size = conn.execute("PRAGMA page_size").fetchone()[0]
+    out = {
+        "page_count": pages,
+        "freelist_count": free,
+        "page_size": size,
+        "bytes": pages * size,
+        "free_pct": round(100 * free / pages, 1) if pages else 0,
+        "auto_vacuum": AUTO_VACUUM.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0]),
+        "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0],
+    }
+    if deep:
+        try:
+            n, unused, pgsize, scattered, leaves = conn.execute(FRAG_SQL).fetchone()
+        except sqlite3.OperationalError:
+            n = 0      # SQLite tanpa SQLITE_ENABLE_DBSTAT_VTAB
+        if n:
+            out["unused_pct"] = round(100 * unused / pgsize, 1)
+            out["scattered_pct"] = round(100 * scattered / leaves, 1) if leaves else 0
+    return out
+
+
+def in_quiet_hours(now: datetime | None = None) -> bool:
+    h = (now or datetime.now()).hour
+    start, end = QUIET_HOURS
+    return start <= h < end if start <= end else h >= start or h < end
+
+
+def due(conn, now: datetime | None = None) -> bool:
+    """Jam sepi dan (belum pernah / putaran terakhir belum tuntas / tuntas > MIN_GAP lalu)."""
+    now = now or datetime.now()
+    if not in_quiet_hours(now):
+        return False
+    r = conn.execute("SELECT started_at, complete FROM maintenance_runs ORDER BY id DESC LIMIT 1").fetchone()
+    if r is None or not r[1]:
+        return True
+    return datetime.strptime(r[0], "%Y-%m-%d %H:%M:%S") <= now - timedelta(seconds=MIN_GAP)
+
+
+def history(conn, limit: int = 10) -> list[dict]:
+    out = []
+    for r in conn.execute("""
+      SELECT id, started_at, elapsed_ms, forced, complete, before, after, steps
+      FROM maintenance_runs ORDER BY id DESC LIMIT ?
+    """, (limit,)):
+        out.append({
+            "id": r[0], "started_at": r[1], "elapsed_ms": r[2], "forced": bool(r[3]),
+            "complete": bool(r[4]), "before": json.loads(r[5]), "after": json.loads(r[6]),
+            "steps": json.loads(r[7]),
+        })
+    return out
+
+
+def _analyze(conn) -> dict:
+    conn.execute(f"PRAGMA analysis_limit = {int(ANALYSIS_LIMIT)}")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    return {}
+
+
+def _vacuum(conn, deadline: float) -> dict:
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode == 1:
+        return {"skipped": "auto_vacuum full"}
+    if mode == 0:
+        return {"skipped": "auto_vacuum none, jalankan: python maintenance.py convert"}
+
+    released = rounds = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            return {"released": released, "rounds": rounds}
+        if time.monotonic() >= deadline:
+            return {"released": released, "rounds": rounds, "left": free, "complete": False}
+        n = min(free, VACUUM_STEP)
+        # execute() hanya step sekali (= satu halaman); executescript jalan sampai selesai
+        conn.executescript(f"PRAGMA incremental_vacuum({n});")
+        released += n
+        rounds += 1
+        time.sleep(VACUUM_PAUSE)
+
+
+def convert(db_path: str = DB_PATH) -> dict:
+    """
+    Sekali saja: VACUUM penuh supaya header DB pindah ke auto_vacuum INCREMENTAL.
+    Menulis ulang seluruh file di bawah lock eksklusif; jalankan saat app sepi/mati.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        before = page_stats(conn, deep=False)
+        if before["auto_vacuum"] == "incremental":
+            return {"skipped": "sudah incremental", "before": before, "after": before}
+        t0 = time.monotonic()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return {"elapsed_ms": round((time.monotonic() - t0) * 1000, 1),
+                "before": before, "after": page_stats(conn, deep=False)}
+    finally:
+        conn.close()
+
+
+def _checkpoint(conn) -> dict:
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        return {"skipped": "bukan WAL"}
+    busy, log, done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return {"busy": busy, "log_frames": log, "checkpointed": done, "complete": not busy}
+
+
+def run(db_path: str = DB_PATH, force: bool = False, budget: float = BUDGET) -> dict | None:
+    """
+    Satu putaran perawatan. None kalau tidak jatuh tempo (lihat due) atau
+    putaran lain masih berjalan. force=True mengabaikan jadwal.
+    """
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        try:
+            ensure_schema(conn)
+            if not force and not due(conn):
+                return None
+            return _run(conn, db_path, force, budget)
+        finally:
+            conn.close()
+    finally:
+        _lock.release()
+
+
+def _run(conn, db_path, force, budget) -> dict:
+    started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    t0 = time.monotonic()
+    deadline = t0 + budget
+    before = page_stats(conn)
+
+    steps, complete = [], True
+    for name, fn in (("analyze", _analyze),
+                     ("vacuum", lambda c: _vacuum(c, deadline)),
+                     ("checkpoint", _checkpoint)):
+        if time.monotonic() >= deadline:
+            steps.append({"step": name, "skipped": "budget habis"})
+            complete = False
+            continue
+        ts = time.monotonic()
+        info = fn(conn)
+        complete = complete and info.pop("complete", True)
+        steps.append({"step": name, "ms": round((time.monotonic() - ts) * 1000, 1), **info})
+
+    after = page_stats(conn)
+    elapsed = round((time.monotonic() - t0) * 1000, 1)
+    conn.execute("""
+      INSERT INTO maintenance_runs (started_at, elapsed_ms, forced, complete, before, after, steps)
+      VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (started, elapsed, int(force), int(complete),
+          json.dumps(before), json.dumps(after), json.dumps(steps)))
+
+    result = {"started_at": started, "elapsed_ms": elapsed, "forced": force, "complete": complete,
+              "before": before, "after": after, "steps": steps}
+    LAST[db_path] = result
+    return result
+
+
+def describe(r: dict) -> str:
+    """Ringkasan satu baris untuk log."""
+    b, a = r["before"], r["after"]
+    line = (f"halaman {b['page_count']} -> {a['page_count']}, "
+            f"freelist {b['freelist_count']} -> {a['freelist_count']}")
+    if "unused_pct" in b and "unused_pct" in a:
+        line += (f", kosong {b['unused_pct']}% -> {a['unused_pct']}%"
+                 f", tersebar {b['scattered_pct']}% -> {a['scattered_pct']}%")
+    line += f", {r['elapsed_ms']} ms" + ("" if r["complete"] else " (belum tuntas)")
+    return line
+
+
+def main(argv):
+    args = [a for a in argv[1:] if a != "--force"]
+    db_path = args.pop(0) if args and args[0] not in ("stats", "run", "convert") else DB_PATH
+    cmd = args[0] if args else "stats"
+    if cmd == "stats":
+        conn = sqlite3.connect(db_path)
+        try:
+            for k, v in page_stats(conn).items():
+                print(f"{k:<15} {v}")
+        finally:
+            conn.close()
+    elif cmd == "run":
+        r = run(db_path, force="--force" in argv)
+        if r is None:
+            print(f"Belum jatuh tempo (jam sepi {QUIET_HOURS[0]:02d}-{QUIET_HOURS[1]:02d}); pakai --force.")
+            return 1
+        for s in r["steps"]:
+            print("  " + ", ".join(f"{k}={v}" for k, v in s.items()))
+        print(describe(r))
+    elif cmd == "convert":
+        r = convert(db_path)
+        b, a = r["before"], r["after"]
+        if "skipped" in r:
+            print(f"Dilewati: {r['skipped']}.")
+        else:
+            print(f"auto_vacuum {b['auto_vacuum']} -> {a['auto_vacuum']}, "
+                  f"halaman {b['page_count']} -> {a['page_count']}, {r['elapsed_ms']} ms")
+    else:
+        print("Pakai: python maintenance.py [DB_PATH] [stats | run [--force] | convert]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,156 @@
+"""
+Paket tarif: satu baris per (nama paket, berlaku mulai periode). customers.plan
+menunjuk nama paket; tarif pelanggan untuk periode P = baris paket dengan
+effective_from terbesar yang <= P. Pelanggan tanpa paket tetap pakai monthly_fee.
+
+Riwayat paket dibaca sekali ke memori (fees_for), jadi generate invoice cukup
+dapat {paket: tarif} periode itu sebagai JSON, tidak join riwayat per baris.
+"""
+import json
+import threading
+from datetime import datetime
+
+import audit
+import reports
+
+_cache = {}          # db_path -> {nama paket: [(effective_from, fee), ...] urut naik}
+_cache_lock = threading.Lock()
+
+
+def ensure_schema(conn) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS plans (
+      id             INTEGER PRIMARY KEY AUTOINCREMENT,
+      name           TEXT NOT NULL,
+      fee            INTEGER NOT NULL CHECK(fee >= 0),
+      effective_from TEXT NOT NULL,                   -- YYYY-MM
+      UNIQUE(name, effective_from)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_plan ON customers(plan)")
+
+
+def invalidate() -> None:
+    """Panggil setelah tabel plans berubah."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def history(conn, db_path: str) -> dict:
+    with _cache_lock:
+        h = _cache.get(db_path)
+    if h is None:
+        h = {}
+        for name, eff, fee in conn.execute("SELECT name, effective_from, fee FROM plans ORDER BY name, effective_from"):
+            h.setdefault(name, []).append((eff, fee))
+        with _cache_lock:
+            _cache[db_path] = h
+    return h
+
+
+def fees_for(conn, db_path: str, period: str) -> str:
+    """JSON {nama paket: tarif yang berlaku di `period`} untuk parameter :fees di SQL."""
+    out = {}
+    for name, rows in history(conn, db_path).items():
+        fee = None
+        for eff, f in rows:
+            if eff > period:
+                break
+            fee = f
+        if fee is not None:
+            out[name] = fee
+    return json.dumps(out)
+
+
+# tarif pelanggan c untuk periode :period, dari peta :fees (lihat fees_for)
+FEE_SQL = "COALESCE((SELECT f.value FROM json_each(:fees) f WHERE f.key = c.plan), c.monthly_fee)"
+
+# satu UPDATE untuk semua invoice UNPAID yang belum terkunci mulai :from;
+# tarif dicari per periode invoice lewat index UNIQUE(name, effective_from)
+REPRICE_SQL = """
+  UPDATE invoices AS i
+  SET amount = t.fee
+  FROM (
+    SELECT i2.id AS invoice_id,
+           COALESCE((SELECT p.fee FROM plans p
+                     WHERE p.name = c.plan AND p.effective_from <= i2.period
+                     ORDER BY p.effective_from DESC LIMIT 1),
+                    c.monthly_fee) AS fee
+    FROM invoices i2
+    JOIN customers c ON c.id = i2.customer_id
+    WHERE i2.period >= :from AND i2.status = 'UNPAID' AND i2.locked = 0 {where}
+  ) AS t
+  WHERE i.id = t.invoice_id AND i.amount <> t.fee
+"""
+
+
+def reprice(conn, period_from: str, plan: str | None = None, customer_ids=None) -> list:
+    """
+    Hitung ulang amount invoice UNPAID (belum locked) periode >= period_from.
+    Batasi ke satu paket dan/atau daftar pelanggan. Tidak commit; return baris
+    invoice yang berubah (kolom audit.RETURNING, amount = tarif baru).
+    """
+    where, params = "", {"from": period_from}
+    if plan is not None:
+        where += " AND c.plan = :plan"
+        params["plan"] = plan
+    if customer_ids is not None:
+        where += " AND c.id IN (SELECT value FROM json_each(:ids))"
+        params["ids"] = json.dumps(list(customer_ids))
+    return conn.execute(REPRICE_SQL.format(where=where) + audit.RETURNING, params).fetchall()
+
+
+def set_fee(conn, name: str, fee: int, effective_from: str) -> list:
+    """Tambah/ubah tarif paket mulai periode tertentu + reprice invoice terbuka. Return invoice yang berubah."""
+    name = name.strip()
+    if not name:
+        raise ValueError("Nama paket wajib diisi.")
+    if fee < 0:
+        raise ValueError("Tarif tidak boleh negatif.")
+    try:
+        # strptime juga menerima "2025-1"; bandingkan balik supaya hanya YYYY-MM
+        ok = datetime.strptime(effective_from, "%Y-%m").strftime("%Y-%m") == effective_from
+    except ValueError:
+        ok = False
+    if not ok:
+        raise ValueError("Periode berlaku harus YYYY-MM.")
+    try:
+        conn.execute("""
+          INSERT INTO plans (name, fee, effective_from) VALUES (?, ?, ?)
+          ON CONFLICT(name, effective_from) DO UPDATE SET fee = excluded.fee
+        """, (name, fee, effective_from))
+        rows = reprice(conn, effective_from, plan=name)
+        reports.drop(conn, (r[1] for r in rows))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate()
+    return rows
+
+
+def remove(conn, plan_id) -> list:
+    """Hapus satu baris riwayat tarif; invoice terbuka mulai periode itu ikut tarif sebelumnya."""
+    r = conn.execute("SELECT name, effective_from FROM plans WHERE id = ?", (plan_id,)).fetchone()
+    if not r:
+        return []
+    try:
+        conn.execute("DELETE FROM plans WHERE id = ?", (plan_id,))
+        rows = reprice(conn, r[1], plan=r[0])
+        reports.drop(conn, (x[1] for x in rows))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate()
+    return rows
+
+
+def listing(conn):
+    """Semua baris tarif + jumlah pelanggan aktif per paket, urut nama lalu periode."""
+    return conn.execute("""
+      SELECT p.id, p.name, p.fee, p.effective_from,
+             (SELECT COUNT(*) FROM customers c WHERE c.plan = p.name AND c.active = 1) AS customers
+      FROM plans p
+      ORDER BY p.name, p.effective_from DESC
+    """).fetchall()
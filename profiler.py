@@ -0,0 +1,160 @@
+"""
+Profil satu request (cProfile), dipicu admin atau sampling, disimpan ke disk.
+
+Waktu dibagi eksklusif (tanpa dobel hitung):
+    sql_ms      = method sqlite3 (execute / fetch / iterasi cursor)
+    template_ms = kode template Jinja + runtime jinja2 / markupsafe
+    python_ms   = sisanya (view, helper, Flask)
+Response streaming ikut diprofil sampai chunk terakhir.
+
+Hanya satu profil aktif sekaligus (cProfile per thread). Di eventlet, green
+thread lain yang jalan bersamaan bisa ikut terekam; profil sebaiknya diambil
+saat sepi atau dibandingkan beberapa kali.
+
+File: <DIR>/<nama>.prof (pstats, buka dengan snakeviz / python -m pstats)
+      <DIR>/<nama>.json (ringkasan untuk halaman admin). Hanya KEEP terbaru disimpan.
+"""
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import threading
+import time
+
+KEEP = 50              # profil terbaru yang disimpan
+
+_lock = threading.Lock()
+_seq = itertools.count(1)
+
+_TEMPLATE_MARKS = ("<template>", f"{os.sep}jinja2{os.sep}", f"{os.sep}markupsafe{os.sep}")
+
+
+def breakdown(prof: cProfile.Profile, total_s: float) -> dict:
+    sql = tpl = 0.0
+    sql_calls = 0
+    for (filename, _, func), (_, nc, tt, _, _) in pstats.Stats(prof).stats.items():
+        if filename == "~" and "sqlite3." in func:
+            sql += tt
+            if "execute" in func:
+                sql_calls += nc
+        elif any(m in filename for m in _TEMPLATE_MARKS):
+            tpl += tt
+    return {
+        "total_ms": round(total_s * 1000, 1),
+        "sql_ms": round(sql * 1000, 1),
+        "sql_calls": sql_calls,
+        "template_ms": round(tpl * 1000, 1),
+        "python_ms": round(max(total_s - sql - tpl, 0) * 1000, 1),
+    }
+
+
+class RequestProfile:
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_seq):04d}"
+        self.prof = cProfile.Profile()
+        self.elapsed = 0.0
+        self._t = None
+
+    def resume(self):
+        self._t = time.perf_counter()
+        self.prof.enable()
+
+    def pause(self):
+        self.prof.disable()
+        self.elapsed += time.perf_counter() - self._t
+
+    def wrap(self, iterable):
+        """Body streaming ikut diprofil; disimpan saat chunk habis / client putus (close)."""
+        return _Stream(self, iterable)
+
+    def save(self) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, self.name)
+            self.prof.dump_stats(base + ".prof")
+            info = {**self.meta, "name": self.name, "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    **breakdown(self.prof, self.elapsed)}
+            with open(base + ".json", "w") as f:
+                json.dump(info, f)
+            prune(self.directory, KEEP)
+        finally:
+            _lock.release()
+
+    def discard(self) -> None:
+        self.prof.disable()
+        _lock.release()
+
+
+class _Stream:
+    def __init__(self, profile: RequestProfile, iterable):
+        self.profile = profile
+        self.it = iter(iterable)
+        self.done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.done:
+            raise StopIteration
+        self.profile.resume()
+        try:
+            chunk = next(self.it)
+        except BaseException:
+            self.profile.pause()
+            self.close()
+            raise
+        self.profile.pause()
+        return chunk
+
+    def close(self):
+        if not self.done:
+            self.done = True
+            close = getattr(self.it, "close", None)
+            if close:
+                close()
+            self.profile.save()
+
+
+def start(directory: str, meta: dict) -> RequestProfile | None:
+    """Mulai profil; None kalau masih ada profil lain yang berjalan."""
+    if not _lock.acquire(blocking=False):
+        return None
+    p = RequestProfile(directory, meta)
+    p.resume()
+    return p
+
+
+def listing(directory: str) -> list[dict]:
+    out = []
+    if not os.path.isdir(directory):
+        return out
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(out, key=lambda r: r["name"], reverse=True)
+
+
+def prune(directory: str, keep: int) -> None:
+    names = sorted((n[:-5] for n in os.listdir(directory) if n.endswith(".json")), reverse=True)
+    for name in names[keep:]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(directory, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def report(path: str, limit: int = 40) -> str:
+    """Teks pstats: fungsi teratas per waktu kumulatif."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,76 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import qrcode
+except ImportError:  # qrcode[pil] opsional; tanpa itu struk cuma tampil kode teks
+    qrcode = None
+
+QR_DIR = "qr_cache"
+QR_MEM_MAX = 500       # gambar di memori
+QR_DISK_MAX = 5000     # file di QR_DIR
+
+_mem = OrderedDict()
+_lock = threading.Lock()
+_writes = 0            # prune folder tiap 100 file baru, bukan tiap tulis
+
+
+def available() -> bool:
+    return qrcode is not None
+
+
+def _render(data: str) -> bytes:
+    img = qrcode.make(data, box_size=4, border=2)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _prune_disk(qr_dir: str) -> None:
+    names = [os.path.join(qr_dir, n) for n in os.listdir(qr_dir) if n.endswith(".png")]
+    if len(names) <= QR_DISK_MAX:
+        return
+    names.sort(key=os.path.getmtime)
+    for path in names[:len(names) - QR_DISK_MAX]:
+        os.remove(path)
+
+
+def png(data: str, cache: bool = True, qr_dir: str = QR_DIR) -> bytes:
+    """
+    PNG QR untuk `data`. Isi sama -> gambar sama, jadi key cache = hash isi.
+    cache=False untuk data yang masih bisa berubah (invoice belum locked).
+    """
+    global _writes
+    if not cache:
+        return _render(data)
+
+    key = hashlib.sha1(data.encode("utf-8")).hexdigest()
+    with _lock:
+        hit = _mem.get(key)
+        if hit:
+            _mem.move_to_end(key)
+            return hit
+
+    path = os.path.join(qr_dir, key + ".png")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            out = f.read()
+    else:
+        out = _render(data)
+        os.makedirs(qr_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(out)
+        os.replace(tmp, path)
+        _writes += 1
+        if _writes % 100 == 0:
+            _prune_disk(qr_dir)
+
+    with _lock:
+        _mem[key] = out
+        while len(_mem) > QR_MEM_MAX:
+            _mem.popitem(last=False)
+    return out
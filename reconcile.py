@@ -0,0 +1,238 @@
+"""
+Rekonsiliasi mutasi bank (CSV) ke invoice UNPAID satu periode.
+
+Pencocokan pakai index hash (nominal -> invoice, token -> pelanggan),
+jadi satu baris mutasi cuma menyentuh kandidat dengan nominal sama,
+bukan loop semua invoice x semua mutasi.
+"""
+import csv
+import hashlib
+import json
+import re
+from datetime import date, datetime, timedelta
+
+import audit
+
+REKON_COLLECTOR = "REKON"
+EARLY_DAYS = 7          # transfer boleh masuk sekian hari sebelum periode mulai
+
+_COLS = {
+    "date": ("tanggal", "tgl", "date", "tanggal transaksi", "trx date"),
+    "desc": ("keterangan", "deskripsi", "description", "berita", "uraian", "remark"),
+    "amount": ("jumlah", "nominal", "amount", "mutasi", "kredit", "credit"),
+    "type": ("cr/db", "db/cr", "type", "jenis", "dk", "d/k"),
+}
+_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def ensure_schema(conn) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bank_mutations (
+      hash        TEXT PRIMARY KEY,                 -- sidik jari baris, cegah import dobel
+      period      TEXT NOT NULL,
+      trx_date    TEXT NOT NULL,                    -- YYYY-MM-DD
+      description TEXT NOT NULL,
+      amount      INTEGER NOT NULL CHECK(amount >= 0),
+      status      TEXT NOT NULL CHECK(status IN ('MATCHED','REVIEW','IGNORED')),
+      invoice_id  INTEGER,
+      candidates  TEXT,                             -- JSON invoice id kandidat (REVIEW)
+      imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bank_mutations_status ON bank_mutations(period, status)")
+
+
+def tokens(text) -> set[str]:
+    return set(_WORD.findall(str(text or "").lower()))
+
+
+def parse_amount(raw) -> int | None:
+    """'Rp 150.000,00' / '150,000.00' / '150000' -> 150000. Desimal dibuang."""
+    s = re.sub(r"[^0-9,.\-]", "", str(raw or ""))
+    s = re.sub(r"[,.]\d{1,2}$", "", s)
+    s = s.replace(",", "").replace(".", "")
+    if not s or s == "-":
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        return None
+
+
+def parse_date(raw, period: str) -> str | None:
+    raw = str(raw or "").strip().split(" ")[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    # format BCA "dd/mm" tanpa tahun -> pakai tahun periode
+    m = re.fullmatch(r"(\d{1,2})/(\d{1,2})", raw)
+    if m:
+        try:
+            return date(int(period[:4]), int(m.group(2)), int(m.group(1))).strftime("%Y-%m-%d")
+        except ValueError:
+            return None
+    return None
+
+
+def _column(header, kind):
+    names = [h.strip().lower() for h in header]
+    for want in _COLS[kind]:
+        if want in names:
+            return names.index(want)
+    return None
+
+
+def read_credits(lines, period: str):
+    """
+    Baca CSV mutasi, yield (hash, trx_date, description, amount) untuk baris KREDIT.
+    Baris yang tidak bisa dibaca di-skip (header/saldo/footer bank).
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    c_date, c_desc = _column(header, "date"), _column(header, "desc")
+    c_amount, c_type = _column(header, "amount"), _column(header, "type")
+    if c_date is None or c_desc is None or c_amount is None:
+        raise ValueError("Kolom tanggal / keterangan / jumlah tidak ditemukan di header CSV.")
+
+    seen = {}
+    for row in reader:
+        if len(row) <= max(c_date, c_desc, c_amount):
+            continue
+        raw_amount = row[c_amount]
+        kind = (row[c_type] if c_type is not None and c_type < len(row) else raw_amount).upper()
+        if "DB" in kind or "DEBET" in kind or "DEBIT" in kind or raw_amount.strip().startswith("-"):
+            continue
+        amount = parse_amount(raw_amount)
+        trx_date = parse_date(row[c_date], period)
+        if not amount or not trx_date:
+            continue
+        desc = row[c_desc].strip()
+
+        # baris identik di file yang sama tetap dihitung terpisah
+        base = f"{trx_date}|{desc}|{amount}"
+        seen[base] = seen.get(base, 0) + 1
+        h = hashlib.sha1(f"{base}|{seen[base]}".encode("utf-8")).hexdigest()
+        yield h, trx_date, desc, amount
+
+
+class Matcher:
+    """Index invoice UNPAID satu periode: nominal -> invoice, token nama/ID -> pelanggan."""
+
+    def __init__(self, conn, period: str):
+        self.period = period
+        self.start = (datetime.strptime(period + "-01", "%Y-%m-%d") - timedelta(days=EARLY_DAYS)).strftime("%Y-%m-%d")
+        self.by_amount = {}
+        self.by_customer = {}
+        self.by_token = {}
+        self.name_tokens = {}
+        for inv_id, cid, amount, name in conn.execute("""
+          SELECT i.id, i.customer_id, i.amount, c.name
+          FROM invoices i JOIN customers c ON c.id = i.customer_id
+          WHERE i.period = ? AND i.status = 'UNPAID' AND i.locked = 0
+        """, (period,)):
+            self.by_amount.setdefault(amount, []).append((inv_id, cid))
+            self.by_customer.setdefault(cid, []).append((inv_id, amount))
+            words = {w for w in tokens(name) if len(w) >= 3}
+            self.name_tokens[cid] = words
+            for w in words | {f"id{cid.lower()}"}:
+                self.by_token.setdefault(w, set()).add(cid)
+        self.used = set()
+
+    def _mentioned(self, desc):
+        """Pelanggan yang disebut di keterangan: semua kata nama ada, atau 'ID<no>'."""
+        words = tokens(desc)
+        # "ID 12" / "id:12" -> "id12"
+        words |= {"id" + m for m in re.findall(r"\bid\W{0,2}([a-z0-9]+)", str(desc).lower())}
+        hits = set()
+        for w in words:
+            for cid in self.by_token.get(w, ()):
+                if w.startswith("id") and w == f"id{cid.lower()}":
+                    hits.add(cid)
+                elif self.name_tokens.get(cid) and self.name_tokens[cid] <= words:
+                    hits.add(cid)
+        return hits
+
+    def match(self, trx_date, desc, amount):
+        """
+        Return (invoice_id, []) kalau yakin, atau (None, [kandidat...]) untuk review.
+        Yakin = nominal sama persis + tepat satu pelanggan yang disebut + tanggal masuk akal.
+        """
+        mentioned = self._mentioned(desc)
+        mine = [(i, a) for c in mentioned for i, a in self.by_customer.get(c, ()) if i not in self.used]
+        both = [i for i, a in mine if a == amount]
+
+        if len(both) == 1 and trx_date >= self.start:
+            self.used.add(both[0])
+            return both[0], []
+
+        if both:
+            return None, both
+        if mine:
+            # nama cocok tapi nominal beda -> kandidat invoice pelanggan itu
+            return None, [i for i, _ in mine]
+        # tidak ada nama/ID: kandidat = nominal sama (dibatasi, cuma untuk bantu review)
+        out = []
+        for i, _ in self.by_amount.get(amount, ()):
+            if i not in self.used:
+                out.append(i)
+                if len(out) == 20:
+                    break
+        return None, out
+
+
+def import_csv(conn, lines, period: str, paid_time: str = "12:00:00") -> dict:
+    """
+    Import + cocokkan + terapkan dalam satu transaksi.
+    Yang yakin langsung PAID TRANSFER (locked, tidak bisa di-undo petugas),
+    sisanya masuk antrian REVIEW di bank_mutations.
+    """
+    ensure_schema(conn)
+    matcher = Matcher(conn, period)
+    result = {"matched": 0, "review": 0, "skipped": 0}
+
+    conn.execute("BEGIN")
+    try:
+        for h, trx_date, desc, amount in read_credits(lines, period):
+            # hash unik lintas periode: mutasi yang sama diimport di periode lain
+            # (atau dobel di file ini) sudah diproses, jangan dibayar dua kali
+            if conn.execute("SELECT 1 FROM bank_mutations WHERE hash = ?", (h,)).fetchone():
+                result["skipped"] += 1
+                continue
+
+            inv_id, candidates = matcher.match(trx_date, desc, amount)
+            if inv_id is not None and apply_payment(conn, inv_id, f"{trx_date} {paid_time}"):
+                status = "MATCHED"
+                result["matched"] += 1
+            else:
+                status = "REVIEW"
+                if inv_id is not None:
+                    candidates = [inv_id]
+                result["review"] += 1
+
+            conn.execute("""
+              INSERT INTO bank_mutations (hash, period, trx_date, description, amount, status, invoice_id, candidates)
+              VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (h, period, trx_date, desc, amount, status,
+                  inv_id if status == "MATCHED" else None,
+                  json.dumps(candidates) if status == "REVIEW" else None))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+def apply_payment(conn, invoice_id, paid_at) -> bool:
+    rows = conn.execute("""
+      UPDATE invoices
+      SET status='PAID', method='TRANSFER', paid_at=?, collector=?,
+          cash_verified=1, locked=1, cash_batch_id=NULL
+      WHERE id=? AND status='UNPAID' AND locked=0
+    """ + audit.RETURNING, (paid_at, REKON_COLLECTOR, invoice_id)).fetchall()
+    audit.write(conn, audit.from_rows("PAY", rows, REKON_COLLECTOR, paid_at=paid_at))
+    return len(rows) == 1
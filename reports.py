@@ -0,0 +1,100 @@
+"""
+Laporan beku untuk periode yang sudah final: tidak ada invoice UNPAID, tidak ada
+tarikan PENDING, tidak ada CASH yang belum masuk tarikan. Angkanya tidak bisa
+berubah lagi, jadi disimpan sekali sebagai JSON dan admin() tidak perlu agregat.
+
+    kind='summary', key=''          -> ringkasan bulan + approved per tanggal
+    kind='date',    key=YYYY-MM-DD  -> total + baris detail per tanggal
+
+Dibekukan hanya oleh job rollover (app.freeze_final), bukan saat laporan dibuka.
+Semua jalur yang bisa mengubah angka / nama di periode beku membuang laporannya:
+/undo (thaw), reprice tarif paket (drop) dan import pelanggan (drop, drop_customers).
+Laporan dibekukan ulang di putaran job berikutnya kalau periodenya final lagi.
+"""
+import json
+
+
+def ensure_schema(conn) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS period_reports (
+      period    TEXT NOT NULL,
+      kind      TEXT NOT NULL CHECK(kind IN ('summary','date')),
+      key       TEXT NOT NULL DEFAULT '',
+      data      TEXT NOT NULL,                      -- JSON
+      frozen_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (period, kind, key)
+    ) WITHOUT ROWID
+    """)
+
+
+def is_final(conn, schema: str, period: str) -> bool:
+    """Periode (schema "main" / arsip) tidak punya UNPAID, PENDING, atau CASH di luar tarikan."""
+    open_invoice = conn.execute(f"""
+      SELECT 1 FROM {schema}.invoices
+      WHERE period = ?
+        AND (status = 'UNPAID' OR (method = 'CASH' AND cash_verified = 0))
+      LIMIT 1
+    """, (period,)).fetchone()
+    if open_invoice:
+        return False
+    pending = conn.execute(
+        f"SELECT 1 FROM {schema}.cash_batches WHERE period = ? AND status = 'PENDING' LIMIT 1", (period,)
+    ).fetchone()
+    return pending is None
+
+
+def is_frozen(conn, period: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM period_reports WHERE period = ? AND kind = 'summary'", (period,)
+    ).fetchone() is not None
+
+
+def load(conn, period: str, kind: str = "summary", key: str = ""):
+    r = conn.execute(
+        "SELECT data FROM period_reports WHERE period = ? AND kind = ? AND key = ?", (period, kind, key)
+    ).fetchone()
+    return json.loads(r[0]) if r else None
+
+
+def freeze(conn, period: str, summary: dict, dates: dict) -> None:
+    """Simpan ringkasan + detail semua tanggal dalam satu transaksi (ganti yang lama)."""
+    try:
+        conn.execute("DELETE FROM period_reports WHERE period = ?", (period,))
+        conn.execute(
+            "INSERT INTO period_reports (period, kind, key, data) VALUES (?, 'summary', '', ?)",
+            (period, json.dumps(summary, separators=(",", ":"))),
+        )
+        conn.executemany(
+            "INSERT INTO period_reports (period, kind, key, data) VALUES (?, 'date', ?, ?)",
+            ((period, d, json.dumps(v, separators=(",", ":"))) for d, v in dates.items()),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def thaw(conn, period: str) -> None:
+    conn.execute("DELETE FROM period_reports WHERE period = ?", (period,))
+    conn.commit()
+
+
+def drop(conn, periods) -> None:
+    """Seperti thaw() untuk beberapa periode, di dalam transaksi pemanggil (tidak commit)."""
+    periods = sorted(set(periods))
+    if periods:
+        conn.execute(
+            "DELETE FROM period_reports WHERE period IN (SELECT value FROM json_each(?))",
+            (json.dumps(periods),),
+        )
+
+
+def drop_customers(conn, customer_ids) -> None:
+    """Buang laporan beku periode yang memuat invoice pelanggan ini (mis. nama berubah). Tidak commit."""
+    ids = sorted(set(customer_ids))
+    if ids:
+        conn.execute("""
+          DELETE FROM period_reports WHERE period IN (
+            SELECT DISTINCT period FROM invoices WHERE customer_id IN (SELECT value FROM json_each(?))
+          )
+        """, (json.dumps(ids),))
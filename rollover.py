@@ -0,0 +1,145 @@
+"""
+Generate invoice periode berjalan / bulan depan di background, per potongan
+pelanggan (keyset on customers.id), supaya pergantian bulan tidak jatuh ke
+request petugas pertama.
+
+invoices.arrears = berapa bulan berturut-turut belum bayar SEBELUM periode ini,
+dibawa maju dari invoice periode sebelumnya.
+
+Invoice bulan depan dibuat sejak ROLLOVER_DAY; pelanggan yang dinonaktifkan
+sesudahnya tidak boleh tetap ditagih. Tiap putaran membuang invoice UNPAID
+yang dibuat SEBELUM periodenya mulai untuk pelanggan yang sekarang nonaktif
+(termasuk putaran pertama di tanggal 1). Invoice yang dibuat di dalam
+periodenya tetap ada: pelanggan berhenti di tengah bulan masih berutang.
+"""
+import sqlite3
+import time
+from datetime import date, datetime
+
+import plans
+
+CHUNK = 500            # pelanggan per transaksi
+PAUSE = 0.05           # jeda antar potongan (detik), beri giliran ke /pay
+ROLLOVER_DAY = 25      # mulai tanggal ini, invoice bulan depan ikut dibuat
+
+STATUS = {}            # db_path -> {period -> progress terakhir} (dibaca /admin/rollover)
+
+CARRY_SQL = """
+  COALESCE((SELECT CASE WHEN p.status = 'UNPAID' THEN p.arrears + 1 ELSE 0 END
+            FROM invoices p
+            WHERE p.period = :prev AND p.customer_id = c.id), 0)
+"""
+
+
+def prev_period(period: str) -> str:
+    y, m = int(period[:4]), int(period[5:7])
+    return f"{y - 1:04d}-12" if m == 1 else f"{y:04d}-{m - 1:02d}"
+
+
+def next_period(period: str) -> str:
+    y, m = int(period[:4]), int(period[5:7])
+    return f"{y + 1:04d}-01" if m == 12 else f"{y:04d}-{m + 1:02d}"
+
+
+def insert_sql(where: str = "") -> str:
+    """
+    INSERT OR IGNORE invoice periode :period untuk pelanggan aktif (+ filter tambahan).
+    Param: period, prev, fees (plans.fees_for).
+    """
+    return f"""
+      INSERT OR IGNORE INTO invoices(period, customer_id, amount, arrears)
+      SELECT :period, c.id, {plans.FEE_SQL}, {CARRY_SQL}
+      FROM customers c
+      WHERE c.active = 1 {where}
+    """
+
+
+# created_at disimpan UTC (CURRENT_TIMESTAMP), awal periode dalam waktu lokal
+PRUNE_SQL = """
+  DELETE FROM invoices
+  WHERE period = :period AND status = 'UNPAID' AND locked = 0 AND cash_batch_id IS NULL
+    AND datetime(created_at, 'localtime') < :start
+    AND customer_id IN (SELECT id FROM customers WHERE active = 0)
+"""
+
+
+REFRESH_SQL = """
+  UPDATE invoices AS i
+  SET arrears = COALESCE((SELECT CASE WHEN p.status = 'UNPAID' THEN p.arrears + 1 ELSE 0 END
+                          FROM invoices p
+                          WHERE p.period = :prev AND p.customer_id = i.customer_id), 0)
+  WHERE i.period = :period AND i.status = 'UNPAID'
+    AND i.customer_id > :lo AND i.customer_id <= :hi
+"""
+
+
+def generate(conn: sqlite3.Connection, db_path: str, period: str,
+             chunk: int = CHUNK, pause: float = PAUSE) -> dict:
+    """
+    Buang invoice pra-generate pelanggan yang sudah nonaktif (PRUNE_SQL), lalu buat
+    invoice `period` untuk semua pelanggan aktif + segarkan flag tunggakan
+    invoice UNPAID, `chunk` pelanggan per transaksi. conn harus autocommit
+    (isolation_level=None) karena BEGIN/COMMIT diatur sendiri.
+    """
+    total = conn.execute("SELECT COUNT(*) FROM customers WHERE active = 1").fetchone()[0]
+    st = {
+        "period": period, "state": "RUNNING", "total": total, "done": 0, "inserted": 0, "dropped": 0,
+        "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "finished_at": None,
+    }
+    STATUS.setdefault(db_path, {})[period] = st
+    params = {"period": period, "prev": prev_period(period), "fees": plans.fees_for(conn, db_path, period)}
+
+    last = ""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            st["dropped"] = conn.execute(PRUNE_SQL, {"period": period, "start": period + "-01"}).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        while True:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM customers WHERE active = 1 AND id > ? ORDER BY id LIMIT ?", (last, chunk)
+            )]
+            if not ids:
+                break
+            rng = {**params, "lo": last, "hi": ids[-1]}
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = conn.execute(insert_sql("AND c.id > :lo AND c.id <= :hi"), rng)
+                st["inserted"] += cur.rowcount
+                conn.execute(REFRESH_SQL, rng)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            st["done"] += len(ids)
+            last = ids[-1]
+            time.sleep(pause)
+    except Exception as e:
+        st["state"] = f"ERROR: {e}"
+        raise
+
+    st["state"] = "DONE"
+    st["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return st
+
+
+def targets(today: date | None = None) -> list[str]:
+    today = today or date.today()
+    current = today.strftime("%Y-%m")
+    out = [current]
+    if today.day >= ROLLOVER_DAY:
+        out.append(next_period(current))
+    return out
+
+
+def run(db_path: str) -> list[dict]:
+    """Satu putaran job: periode berjalan (+ bulan depan kalau sudah dekat akhir bulan)."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        return [generate(conn, db_path, p) for p in targets()]
+    finally:
+        conn.close()
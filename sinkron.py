@@ -1,7 +1,11 @@
 import sqlite3
+import sys
+
 import requests
 from requests.auth import HTTPBasicAuth
 
+import tenants
+
 ROUTER_BASE_URL = "https://localhost/"   # ganti
 ROUTER_USER = "admin"                 # ganti
 ROUTER_PASS = "rahasi"              # ganti
@@ -12,19 +16,24 @@ VERIFY_TLS = False  # True kalau sertifikat valid, False kalau self-signed (test
 DEFAULT_ADDRESS = "winduaji"
 DEFAULT_MONTHLY_FEE = 150000
 
+# multi-tenant: router, DB, dan default per tenant dibaca dari tenants.json
+# (lihat tenants.py); konstanta di atas dipakai kalau file itu tidak ada
 
-def fetch_ppp_active_names() -> set[str]:
+
+def fetch_ppp_active_names(router: dict | None = None) -> set[str]:
     """
     Ambil username PPP yang sedang aktif dari RouterOS v7 REST API.
+    router: {"base_url", "user", "password", "verify_tls"} per tenant (default konstanta di atas).
     """
-    url = f"{ROUTER_BASE_URL}/rest/ppp/active"
+    router = router or {}
+    url = f"{router.get('base_url', ROUTER_BASE_URL)}/rest/ppp/active"
     params = {".proplist": "name"}  # kita cuma butuh name
 
     r = requests.get(
         url,
         params=params,
-        auth=HTTPBasicAuth(ROUTER_USER, ROUTER_PASS),
-        verify=VERIFY_TLS,
+        auth=HTTPBasicAuth(router.get("user", ROUTER_USER), router.get("password", ROUTER_PASS)),
+        verify=router.get("verify_tls", VERIFY_TLS),
         timeout=15,
     )
     r.raise_for_status()
@@ -68,8 +77,10 @@ def get_next_id(conn: sqlite3.Connection) -> int:
     return int(max_id) + 1
 
 
-def sync_active_to_customers(active_names: set[str]) -> None:
-    conn = sqlite3.connect(SQLITE_DB_PATH)
+def sync_active_to_customers(active_names: set[str], db_path: str = SQLITE_DB_PATH,
+                             default_address: str = DEFAULT_ADDRESS,
+                             default_fee: int = DEFAULT_MONTHLY_FEE) -> None:
+    conn = sqlite3.connect(db_path)
     try:
         ensure_schema(conn)
         conn.execute("BEGIN")
@@ -94,7 +105,7 @@ def sync_active_to_customers(active_names: set[str]) -> None:
                     INSERT INTO customers (id, name, address, monthly_fee, active)
                     VALUES (?, ?, ?, ?, 1)
                     """,
-                    (str(next_id), name, DEFAULT_ADDRESS, DEFAULT_MONTHLY_FEE),
+                    (str(next_id), name, default_address, default_fee),
                 )
                 next_id += 1
 
@@ -107,13 +118,37 @@ def sync_active_to_customers(active_names: set[str]) -> None:
         conn.close()
 
 
-def main():
-    active_names = fetch_ppp_active_names()
-    print(f"PPP active users: {len(active_names)}")
-
-    sync_active_to_customers(active_names)
-    print("Sync selesai. address default, id urut, active ter-update.")
+def sync_tenant(t: tenants.Tenant) -> int:
+    active_names = fetch_ppp_active_names(t.router)
+    sync_active_to_customers(active_names, t.db_path, t.default_address, t.default_fee)
+    return len(active_names)
+
+
+def main(argv):
+    """python sinkron.py [TENANT ...]   (tanpa argumen: semua tenant)"""
+    routing, all_tenants = tenants.load(default_db=SQLITE_DB_PATH)
+    if routing is None:
+        # tanpa tenants.json: perilaku lama, konstanta modul ini
+        t = all_tenants[tenants.DEFAULT]
+        t.default_address, t.default_fee = DEFAULT_ADDRESS, DEFAULT_MONTHLY_FEE
+    names = argv[1:] or list(all_tenants)
+    unknown = [n for n in names if n not in all_tenants]
+    if unknown:
+        print(f"Tenant tidak dikenal: {', '.join(unknown)}")
+        return 2
+
+    failed = 0
+    for name in names:
+        try:
+            n = sync_tenant(all_tenants[name])
+        except Exception as e:
+            # satu router mati tidak menghentikan sinkron desa lain
+            print(f"[{name}] GAGAL: {e}")
+            failed += 1
+            continue
+        print(f"[{name}] PPP active users: {n}. Sync selesai.")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(sys.argv))
\ No newline at end of file
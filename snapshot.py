@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SNAPSHOT_PAGES = 64     # halaman per langkah backup
+SNAPSHOT_PAUSE = 0.01   # jeda antar langkah (detik), writer sempat masuk di sela-sela
+MAX_RESTARTS = 3        # commit dari koneksi lain mengulang backup dari halaman 1;
+                        # lebih dari ini -> salin sekali jalan (satu lock baca)
+
+
+class _Restarted(Exception):
+    pass
+
+
+def copy_online(src: sqlite3.Connection, dst: sqlite3.Connection,
+                pages: int = SNAPSHOT_PAGES, pause: float = SNAPSHOT_PAUSE,
+                max_restarts: int = MAX_RESTARTS) -> dict:
+    """
+    Salin src -> dst pakai backup API sedikit demi sedikit.
+    Lock baca di src hanya dipegang selama satu langkah (pages halaman),
+    di antara langkah kita tidur `pause` detik supaya /pay tidak antre lama.
+
+    Setiap commit dari koneksi lain di sela langkah membuat SQLite mengulang
+    dari halaman 1 (terlihat dari `remaining` yang naik lagi). Di trafik
+    terus-menerus DB besar bisa tidak pernah selesai, jadi setelah
+    max_restarts kali sisa salinan dikerjakan dalam satu langkah.
+    Return statistik: jumlah langkah, halaman, restart, total & max waktu lock.
+    """
+    stats = {"steps": 0, "pages": 0, "restarts": 0, "fallback": False,
+             "lock_total": 0.0, "lock_max": 0.0}
+    mark = [time.perf_counter()]
+    last = [None]
+
+    def held():
+        t = time.perf_counter() - mark[0]
+        stats["steps"] += 1
+        stats["lock_total"] += t
+        stats["lock_max"] = max(stats["lock_max"], t)
+
+    def progress(_status, remaining, total):
+        held()
+        stats["pages"] = total
+        if last[0] is not None and remaining >= last[0]:
+            stats["restarts"] += 1
+            if stats["restarts"] > max_restarts:
+                raise _Restarted()
+        last[0] = remaining
+        if remaining and pause:
+            time.sleep(pause)
+        mark[0] = time.perf_counter()
+
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    except _Restarted:
+        # satu langkah = satu transaksi baca: tidak bisa diulang lagi, tapi
+        # writer menunggu (busy timeout) selama salinan berjalan
+        stats["fallback"] = True
+        mark[0] = time.perf_counter()
+        src.backup(dst)
+        held()
+        stats["pages"] = src.execute("PRAGMA page_count").fetchone()[0]
+    return stats
+
+
+class Snapshot:
+    """
+    Salinan read-only wifi.db untuk laporan admin yang berat.
+    File di-refresh berkala (backup API ke file .tmp lalu os.replace),
+    jadi pembaca lama tetap pegang salinan lama sampai koneksinya ditutup.
+    """
+
+    def __init__(self, src_path: str, path: str):
+        self.src_path = src_path
+        self.path = path
+        self.last_stats = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> str:
+        with self._lock:
+            tmp = self.path + ".tmp"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+            src = sqlite3.connect(self.src_path)
+            dst = sqlite3.connect(tmp)
+            try:
+                # waktu diambil sebelum copy: data paling tidak se-baru ini
+                taken_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.last_stats = copy_online(src, dst)
+                dst.execute("CREATE TABLE IF NOT EXISTS snapshot_meta (taken_at TEXT NOT NULL)")
+                dst.execute("DELETE FROM snapshot_meta")
+                dst.execute("INSERT INTO snapshot_meta(taken_at) VALUES (?)", (taken_at,))
+                dst.commit()
+            finally:
+                dst.close()
+                src.close()
+
+            os.replace(tmp, self.path)
+            return taken_at
+
+    def connect(self):
+        """
+        Buka snapshot read-only. Kalau belum ada, buat dulu (sekali).
+        Return (conn, taken_at).
+        """
+        if not os.path.exists(self.path):
+            self.refresh()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT taken_at FROM snapshot_meta").fetchone()
+        return conn, (row["taken_at"] if row else None)
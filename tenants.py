@@ -0,0 +1,113 @@
+"""
+Multi-tenant: satu file SQLite per desa/jaringan (router + petugas sendiri),
+jadi data tumbuh per file, bukan satu wifi.db yang makin besar.
+
+tenants.json (lokasi dari env TENANTS_FILE):
+
+    {
+      "routing": "subdomain",
+      "tenants": {
+        "winduaji":  {"db": "data/winduaji.db",
+                      "router": {"base_url": "https://10.0.0.1/", "user": "admin",
+                                 "password": "...", "verify_tls": false},
+                      "default_address": "winduaji", "default_fee": 150000},
+        "sidamulya": {"db": "data/sidamulya.db", "router": {...}}
+      }
+    }
+
+routing "subdomain": label pertama host (winduaji.tagihan.example -> winduaji).
+routing "path":      /winduaji/admin -> tenant winduaji, path /admin; prefix
+                     dipindah ke SCRIPT_NAME supaya url_for / request.script_root ikut.
+Tanpa file: satu tenant "default" memakai DB_PATH app (perilaku lama).
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+TENANTS_FILE = os.environ.get("TENANTS_FILE", "tenants.json")
+DEFAULT = "default"
+ROUTINGS = ("subdomain", "path")
+NAME_RE = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+RESERVED = ("healthz", "assets")   # path per proses (mode path), bukan nama tenant
+
+
+class Tenant:
+    def __init__(self, name: str, db_path: str, router: dict | None = None,
+                 default_address: str = "", default_fee: int = 150000):
+        self.name = name
+        self.db_path = db_path
+        self.router = router or {}
+        self.default_address = default_address or name
+        self.default_fee = default_fee
+        # wifi.db -> wifi_snapshot.db, di folder yang sama dengan DB-nya
+        self.snapshot_path = os.path.splitext(db_path)[0] + "_snapshot.db"
+
+    def __repr__(self):
+        return f"Tenant({self.name!r}, {self.db_path!r})"
+
+
+def load(path: str = TENANTS_FILE, default_db: str = "wifi.db") -> tuple[str | None, dict]:
+    """(routing, {nama: Tenant}); routing None = mode satu tenant (file tidak ada)."""
+    if not os.path.exists(path):
+        return None, {DEFAULT: Tenant(DEFAULT, default_db)}
+    with open(path) as f:
+        conf = json.load(f)
+    routing = conf.get("routing", "subdomain")
+    if routing not in ROUTINGS:
+        raise ValueError(f"{path}: routing harus salah satu dari {ROUTINGS}")
+    out = {}
+    for name, t in (conf.get("tenants") or {}).items():
+        if not NAME_RE.match(name) or name in RESERVED:
+            raise ValueError(f"{path}: nama tenant tidak valid: {name!r}")
+        if not t.get("db"):
+            raise ValueError(f"{path}: tenant {name} tanpa 'db'")
+        out[name] = Tenant(name, t["db"], t.get("router"),
+                           t.get("default_address", ""), int(t.get("default_fee", 150000)))
+    if not out:
+        raise ValueError(f"{path}: daftar tenants kosong")
+    return routing, out
+
+
+def resolve(environ: dict, routing: str | None, tenants: dict) -> tuple[Tenant | None, str]:
+    """(tenant, prefix path) untuk request WSGI ini; tenant None = tidak dikenal."""
+    if routing is None:
+        return tenants[DEFAULT], ""
+    if routing == "subdomain":
+        host = environ.get("HTTP_HOST") or environ.get("SERVER_NAME", "")
+        return tenants.get(host.split(":")[0].split(".")[0].lower()), ""
+    name = environ.get("PATH_INFO", "").lstrip("/").split("/", 1)[0]
+    return tenants.get(name), "/" + name
+
+
+class LRU:
+    """
+    Urutan pemakaian tenant yang sedang memegang koneksi terbuka. touch() return
+    tenant yang terdorong keluar (lebih dari `size`) supaya koneksinya ditutup.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, key) -> list:
+        with self._lock:
+            if key in self._d:
+                self._d.move_to_end(key)
+                return []
+            self._d[key] = True
+            evicted = []
+            while len(self._d) > self.size:
+                evicted.append(self._d.popitem(last=False)[0])
+            return evicted
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._d
+
+    def keys(self) -> list:
+        """Paling lama dipakai dulu."""
+        with self._lock:
+            return list(self._d)
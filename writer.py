@@ -0,0 +1,142 @@
+"""
+Group commit: satu thread penulis + antrean. Permintaan tulis (/pay, /undo) yang
+datang hampir bersamaan (dalam WINDOW detik) digabung jadi satu transaksi, jadi
+satu COMMIT/fsync untuk banyak petugas, bukan satu per tap.
+
+Tiap job jalan di SAVEPOINT sendiri: job yang error di-rollback sendirian dan
+pemanggilnya dapat exception-nya, job lain di batch yang sama tetap commit.
+Pemanggil menunggu hasil job-nya sendiri (nilai return fn).
+
+close() menutup koneksi + thread setelah antrean habis (tenant keluar dari LRU
+koneksi terbuka); submit berikutnya membuka lagi.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+WINDOW = 0.003         # detik menunggu job lain setelah job pertama masuk
+MAX_BATCH = 64         # job per transaksi
+TIMEOUT = 30           # detik maksimal pemanggil menunggu hasil
+
+
+class GroupWriter:
+    def __init__(self, db_path: str, window: float = WINDOW, max_batch: int = MAX_BATCH, commit=None):
+        """commit(conn) dipanggil untuk menutup batch (default conn.commit), mis. audit.commit."""
+        self.db_path = db_path
+        self.window = window
+        self.max_batch = max_batch
+        self._commit = commit or (lambda conn: conn.commit())
+        self._q = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closing = False
+        self.commits = 0
+        self.jobs = 0
+        self.failed = 0
+        self.max_seen = 0
+
+    def submit(self, fn, *args):
+        """Jalankan fn(conn, *args) di transaksi penulis; blok sampai batch-nya commit."""
+        fut = Future()
+        # put + start di bawah lock yang sama dengan thread yang berhenti (_run),
+        # jadi job tidak pernah tertinggal di antrean tanpa thread
+        with self._start_lock:
+            self._q.put((fn, args, fut))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+                self._thread.start()
+        return fut.result(timeout=TIMEOUT)
+
+    def close(self):
+        """Hentikan thread + tutup koneksi setelah job yang sudah antre selesai."""
+        with self._start_lock:
+            if self._thread is not None:
+                self._q.put(None)
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "avg_batch": round(self.jobs / self.commits, 2) if self.commits else 0,
+            "max_batch": self.max_seen,
+            "queued": self._q.qsize(),
+            "running": self._thread is not None,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _take(self) -> list:
+        first = self._q.get()
+        if first is None:
+            self._closing = True
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            left = deadline - time.monotonic()
+            try:
+                item = self._q.get(timeout=left) if left > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._closing = True
+                break
+            batch.append(item)
+        return batch
+
+    def _stopped(self, conn) -> bool:
+        """Setelah close(): berhenti kalau antrean sudah kosong."""
+        if not self._closing:
+            return False
+        with self._start_lock:
+            if not self._q.empty():
+                return False
+            self._closing = False
+            self._thread = None
+        conn.close()
+        return True
+
+    def _run(self):
+        conn = self._connect()
+        while not self._stopped(conn):
+            batch = self._take()
+            if not batch:
+                continue
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for fn, args, fut in batch:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        results.append((fut, fn(conn, *args), None))
+                        conn.execute("RELEASE job")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        results.append((fut, None, e))
+                self._commit(conn)
+            except Exception as e:
+                # BEGIN / COMMIT gagal: seluruh batch gagal
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                self.failed += len(batch)
+                continue
+
+            self.commits += 1
+            self.jobs += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
+            for fut, value, err in results:
+                if err is None:
+                    fut.set_result(value)
+                else:
+                    self.failed += 1
+                    fut.set_exception(err)